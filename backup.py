@@ -0,0 +1,154 @@
+"""
+增量快照备份。
+备份按 “链” 组织：每条链以一份全量基准快照开头，之后的每次备份只写入一个增量文件，
+其中仅包含自上次备份以来发生变更的玩家记录（商店和活动数据体积很小，每次整份写入）。
+恢复到某个时间点时，读取该链的基准快照并依次应用到目标位置为止的增量即可；
+超出保留数量的旧链整条删除。
+
+目录结构:
+    backups/
+        chain_000012/
+            base.json.gz
+            delta_0001.json.gz
+            delta_0002.json.gz
+"""
+import gzip
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def _write_gz(path: Path, payload: str):
+    """先写临时文件再原子替换，避免中断时留下损坏的备份。"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(payload)
+    tmp_path.replace(path)
+
+
+def _read_gz(path: Path) -> Dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class BackupManager:
+    """管理备份链的创建、裁剪与恢复。"""
+
+    def __init__(self, directory: Path, deltas_per_base: int = 24, retained_chains: int = 3):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.deltas_per_base = deltas_per_base
+        self.retained_chains = retained_chains
+        self.dirty: set = set()
+        # 插件启动前的变更无从得知，因此启动后的第一次备份总是新开一条链
+        self.force_base = True
+
+    def configure(self, deltas_per_base: int, retained_chains: int):
+        """配置变更后调整链长与保留链数，下次写入全量快照时按新的保留数裁剪。"""
+        self.deltas_per_base = deltas_per_base
+        self.retained_chains = retained_chains
+
+    def mark(self, user_id: str):
+        """玩家记录发生变更，下次增量备份时写入。"""
+        self.dirty.add(user_id)
+
+    # ---------- 备份 ----------
+
+    def prepare(self, user_data: Dict, shop_data: Dict, active_event: Dict, full: bool = False) -> Tuple[str, str, bool]:
+        """
+        在持有数据锁时调用：决定本次备份类型并把需要写入的数据序列化为字符串，
+        返回 (备份类型, 序列化内容, 是否为全量)。序列化完成后即可释放锁，再调用 write 写盘。
+        """
+        chain = self._latest_chain()
+        need_base = full or self.force_base or chain is None or len(self._deltas(chain)) >= self.deltas_per_base
+        now = int(time.time())
+        if need_base:
+            payload = {"time": now, "users": user_data, "shop": shop_data, "event": active_event}
+        else:
+            changed = {uid: user_data[uid] for uid in self.dirty if uid in user_data}
+            removed = [uid for uid in self.dirty if uid not in user_data]
+            payload = {"time": now, "users": changed, "removed": removed, "shop": shop_data, "event": active_event}
+        self.dirty.clear()
+        self.force_base = False
+        return ("base" if need_base else "delta"), json.dumps(payload, ensure_ascii=False, separators=(",", ":")), need_base
+
+    def write(self, kind: str, payload: str) -> str:
+        """把 prepare 得到的内容写入磁盘，返回对应的恢复点编号。"""
+        if kind == "base":
+            chain = (self._latest_chain() or 0) + 1
+            chain_dir = self._chain_dir(chain)
+            chain_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                _write_gz(chain_dir / "base.json.gz", payload)
+            except Exception:
+                # 没有基准快照的空链会在裁剪时占用保留名额，挤掉仍然完整的旧链
+                shutil.rmtree(chain_dir, ignore_errors=True)
+                raise
+            self._prune()
+            return f"{chain}.0"
+        chain = self._latest_chain()
+        index = len(self._deltas(chain)) + 1
+        _write_gz(self._chain_dir(chain) / f"delta_{index:04d}.json.gz", payload)
+        return f"{chain}.{index}"
+
+    def _prune(self):
+        """只保留最近的若干条备份链。"""
+        for chain in self._chains()[:-self.retained_chains]:
+            shutil.rmtree(self._chain_dir(chain), ignore_errors=True)
+
+    # ---------- 查询与恢复 ----------
+
+    def list_points(self) -> List[Tuple[str, int, int, bool]]:
+        """列出所有恢复点，返回 (恢复点编号, 时间戳, 文件字节数, 是否为全量)，按时间从旧到新排列。"""
+        points = []
+        for chain in self._chains():
+            chain_dir = self._chain_dir(chain)
+            base_path = chain_dir / "base.json.gz"
+            if not base_path.exists():
+                continue
+            for index, path in enumerate([base_path] + self._deltas(chain)):
+                stat = path.stat()
+                points.append((f"{chain}.{index}", int(stat.st_mtime), stat.st_size, index == 0))
+        return points
+
+    def restore(self, point: str) -> Optional[Dict]:
+        """
+        重建指定恢复点的完整数据：读取基准快照后依次应用增量。
+        返回 {"users", "shop", "event", "time"}，恢复点不存在时返回 None。
+        """
+        try:
+            chain_str, index_str = point.split(".")
+            chain, index = int(chain_str), int(index_str)
+        except ValueError:
+            return None
+        base_path = self._chain_dir(chain) / "base.json.gz"
+        deltas = self._deltas(chain)
+        if not base_path.exists() or not 0 <= index <= len(deltas):
+            return None
+
+        state = _read_gz(base_path)
+        users = state["users"]
+        for path in deltas[:index]:
+            delta = _read_gz(path)
+            users.update(delta["users"])
+            for uid in delta.get("removed", ()):
+                users.pop(uid, None)
+            state["shop"], state["event"], state["time"] = delta["shop"], delta["event"], delta["time"]
+        return state
+
+    # ---------- 目录辅助 ----------
+
+    def _chain_dir(self, chain: int) -> Path:
+        return self.directory / f"chain_{chain:06d}"
+
+    def _chains(self) -> List[int]:
+        return sorted(int(p.name[len("chain_"):]) for p in self.directory.glob("chain_*") if p.is_dir())
+
+    def _latest_chain(self) -> Optional[int]:
+        chains = self._chains()
+        return chains[-1] if chains else None
+
+    def _deltas(self, chain: int) -> List[Path]:
+        return sorted(self._chain_dir(chain).glob("delta_*.json.gz"))
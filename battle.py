@@ -1,14 +1,50 @@
 import random
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 MAX_TURNS = 30
 K_CONSTANT = 100
+MAX_EXTRA_TURNS = 2
 
-def simulate_battle(p1_stats: Dict, p2_stats: Dict) -> Tuple[str, str]:
+# 战斗引擎实际读取的属性键，快照 / 跨进程传输时只需保留这些字段
+BATTLE_STAT_KEYS = ("HP", "ATK", "DEF", "SPD", "HIT", "EVD", "CRIT", "CRIT_MUL", "BLK", "BLK_MUL")
+
+
+# --- 战斗公式（模拟器与 win_solver 的精确求解共用） ---
+
+def hit_chance(attacker: Dict, defender: Dict) -> float:
+    """命中率 = 攻方命中 - 守方闪避，限制在 [5%, 100%]。"""
+    return max(min(attacker['HIT']['final'] - defender['EVD']['final'], 1.0), 0.05)
+
+
+def damage_reduction(defender: Dict) -> float:
+    """防御减伤比例，上限50%。"""
+    return min(defender['DEF']['final'] / (defender['DEF']['final'] + K_CONSTANT), 0.5)
+
+
+def hit_damage(attacker: Dict, defender: Dict, is_crit: bool, is_blocked: bool) -> float:
+    """一次命中造成的最终伤害，至少为1。"""
+    pre_damage = attacker['ATK']['final']
+    if is_crit:
+        pre_damage *= attacker['CRIT_MUL']['final']
+    if is_blocked:
+        pre_damage *= (1 - defender['BLK_MUL']['final'])
+    return max(pre_damage * (1 - damage_reduction(defender)), 1)
+
+
+def extra_turn_chance(attacker: Dict, defender: Dict, extra_turn_count: int) -> float:
+    """已追加 extra_turn_count 次后再触发追加回合的概率，每多追加一次减半。"""
+    base_add_rate = min((attacker['SPD']['final'] / (attacker['SPD']['final'] + defender['SPD']['final'])) * 0.25, 0.5)
+    return base_add_rate * (0.5 ** extra_turn_count)
+
+
+def simulate_battle(p1_stats: Dict, p2_stats: Dict, rng: Optional[random.Random] = None) -> Tuple[str, str]:
     """
     模拟两个玩家之间的战斗，返回胜利者名称和详细的战斗日志。
     此函数是PVP和未来PVE的核心，完全兼容。
+    传入以固定种子初始化的 rng 时，战斗过程完全可复现（用于战报回放）。
     """
+    if rng is None:
+        rng = random
     # --- 初始化战斗 ---
     log = ["\n❀✧⋆✦ ⚔️ 战斗开始 ⚔️ ✦⋆✧❀"]
     p1_hp = p1_stats['HP']['final']
@@ -24,7 +60,7 @@ def simulate_battle(p1_stats: Dict, p2_stats: Dict) -> Tuple[str, str]:
         attacker, defender = p2_stats, p1_stats
         attacker_hp, defender_hp = p2_hp, p1_hp
     else:
-        if random.randint(0, 100) <= 50:
+        if rng.randint(0, 100) <= 50:
             attacker, defender = p1_stats, p2_stats
             attacker_hp, defender_hp = p1_hp, p2_hp
         else:
@@ -43,26 +79,22 @@ def simulate_battle(p1_stats: Dict, p2_stats: Dict) -> Tuple[str, str]:
         log.append(f"【{attacker['name']}】 [HP: {int(attacker_hp)}]  -> 【{defender['name']}】 [HP: {int(defender_hp)}]")
 
         # 步骤2: 命中判定 (使用0-1小数进行计算)
-        hit_rate = max(min(attacker['HIT']['final'] - defender['EVD']['final'], 1.0), 0.05)
-        if random.random() > hit_rate:
+        hit_rate = hit_chance(attacker, defender)
+        if rng.random() > hit_rate:
             log.append(f"🍃 【{attacker['name']}】的攻击被【{defender['name']}】闪避了！ (命中率: {hit_rate:.1%})")
         else:
             # 步骤3: 暴击判定与基础伤害
-            is_crit = random.random() <= attacker['CRIT']['final']
-            pre_damage = attacker['ATK']['final']
+            is_crit = rng.random() <= attacker['CRIT']['final']
             if is_crit:
-                pre_damage *= attacker['CRIT_MUL']['final']
                 log.append(f"💥 【{attacker['name']}】打出了致命一击！ (暴击率: {attacker['CRIT']['final']:.1%})")
 
             # 步骤4-5: 格挡判定
-            is_blocked = random.random() <= defender['BLK']['final']
+            is_blocked = rng.random() <= defender['BLK']['final']
             if is_blocked:
-                pre_damage *= (1 - defender['BLK_MUL']['final'])
                 log.append(f"🛡️ 【{defender['name']}】成功格挡了部分伤害！ (格挡率: {defender['BLK']['final']:.1%})")
 
-            # 步骤6: 防御力结算最终伤害
-            dr_def = min(defender['DEF']['final'] / (defender['DEF']['final'] + K_CONSTANT), 0.5) # 防御上限50%
-            final_damage = max(pre_damage * (1 - dr_def), 1)
+            # 步骤6: 防御力结算最终伤害（防御上限50%）
+            final_damage = hit_damage(attacker, defender, is_crit, is_blocked)
             damage_stats[attacker['name']] += final_damage
             defender_hp -= final_damage
             log.append(f"💔 【{defender['name']}】受到[{int(final_damage)}]点伤害，剩余HP: [{max(0, int(defender_hp))}]")
@@ -71,10 +103,9 @@ def simulate_battle(p1_stats: Dict, p2_stats: Dict) -> Tuple[str, str]:
                 break # 战斗结束
 
         # 步骤7: 追加回合判定 (最大追加2次)
-        if extra_turn_count < 2:
-            base_add_rate = min((attacker['SPD']['final'] / (attacker['SPD']['final'] + defender['SPD']['final'])) * 0.25, 0.5)
-            current_add_rate = base_add_rate * (0.5 ** extra_turn_count)
-            if random.random() <= current_add_rate:
+        if extra_turn_count < MAX_EXTRA_TURNS:
+            current_add_rate = extra_turn_chance(attacker, defender, extra_turn_count)
+            if rng.random() <= current_add_rate:
                 extra_turn_count += 1
                 log.append(f"⚡ 【{attacker['name']}】凭借速度优势触发了追加回合！ (第{extra_turn_count}次追加,追加概率{current_add_rate:.1%})")
                 continue # 跳过回合交换，继续攻击
@@ -0,0 +1,44 @@
+"""
+有界的 LRU 缓存，用于缓存渲染好的面板文本和属性计算结果。
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """容量固定的最近最少使用缓存，超出容量时淘汰最久未访问的条目。"""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max(1, max_size)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def resize(self, max_size: int):
+        """调整容量，缩小时立即淘汰多出的条目。"""
+        self.max_size = max(1, max_size)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def items(self):
+        """按从旧到新的顺序遍历条目，不影响淘汰顺序。"""
+        return self._data.items()
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
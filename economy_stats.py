@@ -0,0 +1,130 @@
+"""
+增量维护的活跃度与经济聚合数据，供管理员数据概览在 O(1) 时间内读取。
+- 资源产出 / 消耗、强化、抽奖等流水类指标在各变更路径中直接累加；
+- 全服资源存量和平均能级等存量指标按玩家记录贡献值维护：
+  玩家记录变更时只标记为待更新，由后台任务分批重新计算这些玩家的贡献，查询时最多再补算少量玩家，无需全量扫描。
+"""
+import itertools
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+# 按日统计保留的天数
+DAILY_RETENTION_DAYS = 30
+
+# 玩家贡献值: (人品, 强化石, 抽奖券, 能级)
+PlayerSnapshot = Tuple[float, float, float, float]
+
+
+def empty_day() -> Dict:
+    return {"check_ins": 0, "new_players": 0, "minted": {}, "burned": {}}
+
+
+class EconomyStats:
+    """全服聚合统计。"""
+
+    def __init__(self):
+        self.daily: Dict[str, Dict] = {}
+        self.minted: Dict[str, float] = {}
+        self.burned: Dict[str, float] = {}
+        self.by_source: Dict[str, Dict[str, float]] = {}  # 来源指令 -> {资源: 净变动}
+        self.enhance: Dict[str, list] = {}  # 品级 -> [尝试次数, 成功次数]
+        self.lottery: Dict[str, int] = {}   # 奖励类型 -> 次数
+
+        # 存量指标不持久化，加载后由各玩家的贡献值重建
+        self.contributions: Dict[str, PlayerSnapshot] = {}
+        self.totals = [0.0, 0.0, 0.0, 0.0]
+        self.pending: set = set()
+
+    # ---------- 流水类指标 ----------
+
+    def _today(self) -> Dict:
+        today = date.today().isoformat()
+        day = self.daily.get(today)
+        if day is None:
+            day = self.daily[today] = empty_day()
+            # 新的一天开始时顺带清理过期的按日数据
+            for old_day in sorted(self.daily)[:-DAILY_RETENTION_DAYS]:
+                del self.daily[old_day]
+        return day
+
+    def record_check_in(self, is_new_player: bool):
+        day = self._today()
+        day["check_ins"] += 1
+        if is_new_player:
+            day["new_players"] += 1
+
+    def record_flow(self, source: str, resource: str, delta: float):
+        """记录一次资源变动，正数计入产出，负数计入消耗，同时按来源指令累计净变动。"""
+        if not delta:
+            return
+        source_bucket = self.by_source.setdefault(source, {})
+        source_bucket[resource] = source_bucket.get(resource, 0) + delta
+        bucket, day_bucket = (self.minted, "minted") if delta > 0 else (self.burned, "burned")
+        amount = abs(delta)
+        bucket[resource] = bucket.get(resource, 0) + amount
+        day = self._today()[day_bucket]
+        day[resource] = day.get(resource, 0) + amount
+
+    def record_enhance(self, grade: str, success: bool):
+        counter = self.enhance.setdefault(grade, [0, 0])
+        counter[0] += 1
+        if success:
+            counter[1] += 1
+
+    def record_lottery(self, outcome: str, count: int = 1):
+        self.lottery[outcome] = self.lottery.get(outcome, 0) + count
+
+    # ---------- 存量指标 ----------
+
+    def touch(self, user_id: str):
+        """玩家记录发生变更，待下次查询时重新计算其贡献值。"""
+        self.pending.add(user_id)
+
+    def flush(self, snapshot_fn: Callable[[str], Optional[PlayerSnapshot]], limit: Optional[int] = None) -> int:
+        """
+        重新计算至多 limit 名待更新玩家的贡献值（None 表示全部），并以差值方式更新全服总量。
+        返回仍待更新的玩家数。
+        """
+        if limit is None or limit >= len(self.pending):
+            batch, self.pending = self.pending, set()
+        else:
+            batch = set(itertools.islice(self.pending, limit))
+            self.pending -= batch
+        for user_id in batch:
+            old = self.contributions.pop(user_id, None)
+            if old:
+                for i, value in enumerate(old):
+                    self.totals[i] -= value
+            new = snapshot_fn(user_id)
+            if new:
+                self.contributions[user_id] = new
+                for i, value in enumerate(new):
+                    self.totals[i] += value
+        return len(self.pending)
+
+    @property
+    def player_count(self) -> int:
+        return len(self.contributions)
+
+    # ---------- 持久化 ----------
+
+    def to_dict(self) -> Dict:
+        return {
+            "daily": self.daily,
+            "minted": self.minted,
+            "burned": self.burned,
+            "by_source": self.by_source,
+            "enhance": self.enhance,
+            "lottery": self.lottery,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "EconomyStats":
+        stats = cls()
+        stats.daily = data.get("daily", {})
+        stats.minted = data.get("minted", {})
+        stats.burned = data.get("burned", {})
+        stats.by_source = data.get("by_source", {})
+        stats.enhance = data.get("enhance", {})
+        stats.lottery = data.get("lottery", {})
+        return stats
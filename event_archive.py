@@ -0,0 +1,131 @@
+"""
+已结算活动的归档。
+每个结算完的活动（伤害排名、奖励、Boss 信息）压缩成一条独立的记录，只追加写入 events.dat，之后不再改动；
+index.json 是一份很小的索引：每个活动的摘要及其在 events.dat 中的位置，以及每名玩家参加过的活动（名次、伤害）。
+查询活动列表或个人参与记录只读索引；查看某个活动的详情时按位置读取并解压这一条记录即可。
+
+目录结构:
+    event_archive/
+        events.dat    # 依次拼接的 zlib 压缩 JSON 记录
+        index.json
+
+共享存储模式下多个实例共用同一份归档：读写都在共享存储的文件锁内进行，索引文件被其他实例替换后重新读取。
+"""
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional
+
+
+class EventArchive:
+    """只追加的活动归档及其索引；读写都在线程池中调用，内部加锁。"""
+
+    def __init__(self, directory: Path, process_lock: Optional[Callable[[bool], ContextManager]] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / "events.dat"
+        self.index_path = self.directory / "index.json"
+        self._lock = threading.Lock()
+        self._process_lock = process_lock  # process_lock(exclusive) 返回进程间文件锁，单实例时为 None
+        self._index: Optional[Dict] = None
+        self._index_mtime: Optional[int] = None
+
+    @contextmanager
+    def _guard(self, exclusive: bool):
+        with self._lock:
+            with self._process_lock(exclusive) if self._process_lock else nullcontext():
+                yield
+
+    def _index_file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load_index(self) -> Dict:
+        # 单实例时索引只由本进程写入，常驻内存即可；共享模式下索引可能被其他实例替换过
+        if self._index is not None and (self._process_lock is None or self._index_file_mtime() == self._index_mtime):
+            return self._index
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+            self._index_mtime = self._index_file_mtime()
+        except FileNotFoundError:
+            self._index = {"next_id": 1, "events": [], "players": {}}
+            self._index_mtime = None
+        return self._index
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.index_path)
+        self._index_mtime = self._index_file_mtime()
+
+    def append(self, record: Dict) -> int:
+        """
+        归档一个活动，返回活动编号。record["participants"] 须已按伤害从高到低排列，每项为 [玩家ID, 昵称, 伤害, 奖励]。
+        先追加记录再替换索引：中途失败时索引中不会出现指向残缺数据的条目。
+        """
+        with self._guard(exclusive=True):
+            index = self._load_index()
+            event_id = index["next_id"]
+            record = dict(record, id=event_id)
+            blob = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode("utf-8"), 6)
+            with open(self.data_path, 'ab') as f:
+                offset = f.tell()
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+
+            index["next_id"] = event_id + 1
+            index["events"].append({
+                "id": event_id,
+                "name": record["event_name"],
+                "boss_name": record["boss_name"],
+                "ended_at": record["settled_at"],
+                "outcome": record["outcome"],
+                "participants": len(record["participants"]),
+                "offset": offset,
+                "length": len(blob),
+            })
+            for rank, (user_id, _nickname, damage, _rewards) in enumerate(record["participants"], start=1):
+                index["players"].setdefault(user_id, []).append([event_id, rank, damage])
+            self._write_index()
+            return event_id
+
+    def recent_events(self, count: int) -> List[Dict]:
+        """最近归档的 count 个活动摘要，从新到旧。"""
+        with self._guard(exclusive=False):
+            return list(reversed(self._load_index()["events"][-count:]))
+
+    def event_count(self) -> int:
+        with self._guard(exclusive=False):
+            return len(self._load_index()["events"])
+
+    def player_events(self, user_id: str) -> List[List]:
+        """玩家参加过的活动 [[活动编号, 名次, 伤害]]，从旧到新。"""
+        with self._guard(exclusive=False):
+            return list(self._load_index()["players"].get(user_id, []))
+
+    def summary(self, event_id: int) -> Optional[Dict]:
+        with self._guard(exclusive=False):
+            for entry in reversed(self._load_index()["events"]):
+                if entry["id"] == event_id:
+                    return entry
+        return None
+
+    def read(self, event_id: int) -> Optional[Dict]:
+        """读取并解压一个活动的完整记录，编号不存在时返回 None。"""
+        entry = self.summary(event_id)
+        if entry is None:
+            return None
+        with open(self.data_path, 'rb') as f:
+            f.seek(entry["offset"])
+            blob = f.read(entry["length"])
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
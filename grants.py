@@ -0,0 +1,144 @@
+"""
+管理员批量发放（补偿）。
+解析 /批量发放 的参数，按筛选条件选出玩家后在一次遍历中完成发放；
+调用方在同一次持锁内完成筛选、先追加写入一条审计记录再发放（审计写入失败则不发放），之后只保存一次。
+"""
+import json
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import utils
+
+RESOURCE_MAP = {"人品": "rp", "强化石": "enhancement_stones", "抽奖券": "draw_tickets"}
+ATTRIBUTE_MAP = {"力量": "strength", "敏捷": "agility", "体力": "stamina", "智力": "intelligence", "魅力": "charisma"}
+LEDGER_SOURCE = "admin_grant"
+
+USAGE = (
+    "用法: /批量发放 奖励=[人品:100,抽奖券:5,强化石:10,力量:0.5] [签到=天数] [职业=职业名] [段位=A 或 B-S] [原因=文本] [预览]\n"
+    "签到=7 表示最近7天内签到过的玩家；段位按能级段位筛选，可写单个段位或 “低-高” 区间；带上 预览 只统计人数不发放。"
+)
+
+
+@dataclass(frozen=True)
+class GrantRequest:
+    rewards: Dict[str, float]  # 资源或属性的内部键 -> 数量
+    checkin_days: Optional[int] = None
+    class_name: Optional[str] = None
+    rank_band: Optional[Tuple[int, int]] = None  # 段位下标闭区间，-1 为低于所有阈值的 F 级
+    rank_text: str = ""
+    reason: str = ""
+    dry_run: bool = False
+
+    def describe(self) -> str:
+        """筛选条件的简短描述，用于回复与审计。"""
+        parts = []
+        if self.checkin_days is not None:
+            parts.append(f"最近{self.checkin_days}天签到")
+        if self.class_name:
+            parts.append(f"职业{self.class_name}")
+        if self.rank_band:
+            parts.append(f"段位{self.rank_text}")
+        return "、".join(parts) or "全体玩家"
+
+
+def parse_rewards(text: str) -> Dict[str, float]:
+    """解析 “人品:100,力量:0.5” 形式的奖励，未知名称、无法解析或非有限正数时抛出 ValueError。"""
+    rewards = {}
+    for item in text.split(','):
+        name, _, value = item.partition(':')
+        name = name.strip()
+        key = RESOURCE_MAP.get(name) or ATTRIBUTE_MAP.get(name)
+        if not key:
+            raise ValueError(f"未知的奖励 “{name}”，可选: {', '.join([*RESOURCE_MAP, *ATTRIBUTE_MAP])}")
+        try:
+            amount = float(value) if key in ATTRIBUTE_MAP.values() else int(value)
+        except ValueError:
+            raise ValueError(f"奖励 “{name}” 的数量 “{value.strip()}” 不是有效的数字") from None
+        if not (math.isfinite(amount) and amount > 0):
+            raise ValueError(f"奖励 “{name}” 的数量必须为有限的正数")
+        rewards[key] = rewards.get(key, 0) + amount
+    return rewards
+
+
+def _parse_rank_band(text: str, rank_names: List[str]) -> Tuple[int, int]:
+    """
+    rank_names 按阈值从低到高排列，下标 -1 表示低于所有阈值（显示为默认段位）。
+    返回段位下标闭区间；默认段位同时出现在配置中时，两个下标都计入。
+    """
+    displayed = [(-1, utils.DEFAULT_RANK), *enumerate(rank_names)]
+    low, _, high = text.partition('-')
+    high = high or low
+    for name in (low, high):
+        if name not in {shown for _, shown in displayed}:
+            raise ValueError(f"未知的段位 “{name}”，可选: {', '.join(dict.fromkeys(shown for _, shown in displayed))}")
+    band = (min(i for i, shown in displayed if shown == low), max(i for i, shown in displayed if shown == high))
+    if band[0] > band[1]:
+        raise ValueError("段位区间应从低到高书写，例如 段位=B-S")
+    return band
+
+
+def parse_request(args_str: str, class_map: Dict[str, str], rank_names: List[str]) -> GrantRequest:
+    """解析 /批量发放 的参数串，格式错误时抛出 ValueError。"""
+    params, dry_run = {}, False
+    for token in args_str.split():
+        if token in ("预览", "dry-run"):
+            dry_run = True
+            continue
+        key, sep, value = token.partition('=')
+        if not sep or not value:
+            raise ValueError(f"无法识别的参数 “{token}”")
+        params[key] = value
+    unknown = set(params) - {"奖励", "签到", "职业", "段位", "原因"}
+    if unknown:
+        raise ValueError(f"未知的参数: {', '.join(sorted(unknown))}")
+    if "奖励" not in params:
+        raise ValueError("缺少 奖励=...")
+
+    class_name = None
+    if "职业" in params:
+        class_name = class_map.get(params["职业"])
+        if not class_name:
+            raise ValueError(f"未知的职业 “{params['职业']}”")
+    checkin_days = int(params["签到"]) if "签到" in params else None
+    if checkin_days is not None and checkin_days < 0:
+        raise ValueError("签到天数不能为负数")
+    return GrantRequest(
+        rewards=parse_rewards(params["奖励"]),
+        checkin_days=checkin_days,
+        class_name=class_name,
+        rank_band=_parse_rank_band(params["段位"], rank_names) if "段位" in params else None,
+        rank_text=params.get("段位", ""),
+        reason=params.get("原因", ""),
+        dry_run=dry_run,
+    )
+
+
+def matches(user: Dict, request: GrantRequest, today: date) -> bool:
+    """签到与职业条件（段位条件由调用方用列式镜像批量计算）。"""
+    if request.class_name and user["active_class"] != request.class_name:
+        return False
+    if request.checkin_days is not None:
+        last_date = user["check_in"]["last_date"]
+        if not last_date or date.fromisoformat(last_date) < today - timedelta(days=request.checkin_days):
+            return False
+    return True
+
+
+def apply(user: Dict, rewards: Dict[str, float]):
+    """把奖励加到一名玩家身上。"""
+    for key, amount in rewards.items():
+        if key == "rp":
+            user["rp"] += amount
+        elif key in RESOURCE_MAP.values():
+            user["resources"][key] += amount
+        else:
+            user["attributes"][key] = round(user["attributes"][key] + amount, 1)
+
+
+def append_audit(path: Path, entry: Dict):
+    """把一次批量发放追加为审计文件中的一行（单次写入，便于事后核对）。"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n")
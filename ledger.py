@@ -0,0 +1,87 @@
+"""
+追加写入的经济流水账本。
+每次人品 / 强化石 / 抽奖券的变动记录为一条紧凑事件 [时间戳, 玩家ID, 来源指令, 资源, 变动量, 变动后余额]，
+事件先缓存在内存中，攒够一批后一次性追加到 JSONL 文件（不做逐条 fsync），文件超过大小上限后轮转。
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+
+class EconomyLedger:
+    """带内存缓冲和文件轮转的流水账本。"""
+
+    def __init__(self, directory: Path, max_file_bytes: int = 8 * 1024 * 1024, max_files: int = 10, flush_batch_size: int = 200):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / "ledger.jsonl"
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_batch_size = flush_batch_size
+        self.buffer: List[list] = []
+
+    def configure(self, max_file_bytes: int, max_files: int, flush_batch_size: int):
+        """配置变更后调整轮转与攒批参数，从下一次写入开始生效。"""
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.flush_batch_size = flush_batch_size
+
+    def record(self, user_id: str, source: str, resource: str, delta: float, balance: float):
+        """记录一次余额变动，缓冲区满时自动批量落盘。"""
+        self.buffer.append([int(time.time()), user_id, source, resource, delta, balance])
+        if len(self.buffer) >= self.flush_batch_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区中的事件一次性追加到当前账本文件。"""
+        if not self.buffer:
+            return
+        lines = "".join(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in self.buffer)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.buffer.clear()
+        if self.path.stat().st_size >= self.max_file_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """ledger.jsonl -> ledger.1.jsonl -> ... -> ledger.N.jsonl，超出保留数量的最旧文件被删除。"""
+        oldest = self._rotated_path(self.max_files)
+        if oldest.exists():
+            oldest.unlink()
+        for index in range(self.max_files - 1, 0, -1):
+            src = self._rotated_path(index)
+            if src.exists():
+                os.replace(src, self._rotated_path(index + 1))
+        os.replace(self.path, self._rotated_path(1))
+
+    def _rotated_path(self, index: int) -> Path:
+        return self.directory / f"ledger.{index}.jsonl"
+
+    def iter_events(self, user_id: Optional[str] = None) -> Iterator[list]:
+        """按时间顺序遍历所有事件（含尚未落盘的缓冲区），可按玩家过滤。"""
+        files = [self._rotated_path(i) for i in range(self.max_files, 0, -1)] + [self.path]
+        needle = json.dumps(user_id, ensure_ascii=False) if user_id is not None else None
+        for path in files:
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # 按玩家过滤时先做子串预筛，避免解析无关行
+                    if needle is not None and needle not in line:
+                        continue
+                    event = json.loads(line)
+                    if user_id is None or event[1] == user_id:
+                        yield event
+        for event in list(self.buffer):
+            if user_id is None or event[1] == user_id:
+                yield event
+
+    def balance_history(self, user_id: str, resource: Optional[str] = None) -> List[list]:
+        """重建玩家的余额变动历史，返回 [时间戳, 来源指令, 资源, 变动量, 变动后余额] 列表。"""
+        return [
+            [ts, source, res, delta, balance]
+            for ts, _uid, source, res, delta, balance in self.iter_events(user_id)
+            if resource is None or res == resource
+        ]
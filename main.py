@@ -1,6 +1,8 @@
 import asyncio
+import functools
 import json
 import os
+import time
 from pathlib import Path
 from typing import Dict
 import random
@@ -13,18 +15,27 @@ from astrbot.api import AstrBotConfig
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register, StarTools
 from astrbot.api import logger # 使用 astrbot 提供的 logger 接口
-from . import utils, battle
+from . import utils, tournament, replay, cache, throttle, economy_stats, population, ledger, nickname_index, settings, rating_index, pvp_rating, backup, shared_store, startup, schema, transfer, grants, event_archive
+
+# 后台加载玩家数据时每批处理的玩家数，两批之间让出事件循环处理指令
+LOAD_BATCH_SIZE = 500
+# 后台重新计算玩家经济贡献值和能级索引的间隔（秒）与每批人数；/数据概览 查询时最多补算的人数
+ECONOMY_FLUSH_INTERVAL = 5
+ECONOMY_FLUSH_BATCH_SIZE = 200
+# /匹配 抽到的对手分值可能尚未同步，重新计算后不在区间内时最多重抽的次数
+MATCH_ATTEMPTS = 3
+DASHBOARD_FLUSH_LIMIT = 50
+
+EVENT_OUTCOME_CN = {"killed": "Boss被击败", "timeout": "超时结束", "no_participants": "无人参与", "no_damage": "未造成伤害"}
 
 
 @register("daily_checkin", "FoolFish", "一个QQ群签到成长系统", "2.0.1")
 class DailyCheckinPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
-        # 将初始属性硬编码为类常量
-        self.INITIAL_ATTRIBUTES = {
-            "strength": 1.0, "agility": 1.0, "stamina": 1.0,
-            "intelligence": 1.0, "charisma": 1.0
-        }
+        self.startup_timer = startup.PhaseTimer()
+        # 初始属性与玩家记录结构统一定义在 schema 模块
+        self.INITIAL_ATTRIBUTES = schema.INITIAL_ATTRIBUTES
         # 定义职业映射
         self.CLASS_MAP = {
             "1": "均衡使者", "均衡使者": "均衡使者",
@@ -33,35 +44,159 @@ class DailyCheckinPlugin(Star):
             "4": "迅捷术师", "迅捷术师": "迅捷术师"
         }
         self.config = config
+        # 配置一次性编译为经过校验的不可变快照，不合法的配置在此处直接拒绝加载
+        with self.startup_timer.phase("编译配置"):
+            self.settings = settings.compile_settings(config)
+        with self.startup_timer.phase("创建子系统"):
+            self._init_subsystems()
+        logger.info("签到插件已加载，配置已读取。")
+
+    def _init_subsystems(self):
+        """创建数据路径与各子系统；静态数据文件和由其派生的查找表改为首次使用时加载。"""
         plugin_data_dir = StarTools.get_data_dir("daily_checkin")
         self.user_data_path = plugin_data_dir / "user_data.json"
         self.shop_data_path = plugin_data_dir / "shop_data.json"
         self.event_data_path = plugin_data_dir / "active_event.json"
 
+        # 共享存储模式：多个实例共用数据目录时，通过文件锁和逐玩家修订号提交 / 载入变更
+        self.shared_store = shared_store.SharedStore(self.user_data_path, unique_key=lambda user: user.get("nickname")) if self.settings.system.storage_mode == "shared" else None
+        self.sync_task: Optional[asyncio.Task] = None
+        # 战报、统计、账本和备份只由本实例读写：共享模式下按实例分目录存放，避免互相覆盖或交错轮转
+        worker_dir = plugin_data_dir / "workers" / self.settings.system.worker_id if self.shared_store else plugin_data_dir
+        worker_dir.mkdir(parents=True, exist_ok=True)
+
+        self.replay_data_path = worker_dir / "replay_data.json"
+        self.economy_stats_path = worker_dir / "economy_stats.json"
+        self.export_dir = plugin_data_dir / "exports"
+        self.grant_audit_path = plugin_data_dir / "grant_audit.jsonl"
+        # 已结算活动的压缩归档与玩家参与索引，共享模式下所有实例在共享存储的文件锁下共同维护
+        self.event_archive = event_archive.EventArchive(
+            plugin_data_dir / "event_archive", process_lock=self.shared_store.locked if self.shared_store else None
+        )
+
+        # 经济流水账本：事件在内存中攒批后追加写入，文件按大小轮转
+        cfg_ledger = self.settings.ledger
+        self.ledger = ledger.EconomyLedger(
+            worker_dir / "ledger",
+            max_file_bytes=int(cfg_ledger.max_file_mb * 1024 * 1024),
+            max_files=cfg_ledger.max_files,
+            flush_batch_size=cfg_ledger.flush_batch_size,
+        )
+
         self.user_data: Dict = {}
         self.shop_data: Dict = {}
-        self.fortunes: Dict = {} # 存储签文
         self.active_event: Dict = {} #存储激活的活动
-        self.game_constants: Dict = {}    # 存储游戏预设
-        self.equipment_presets: Dict = {} # 存储装备预设
+        self.economy_stats = economy_stats.EconomyStats() # 增量维护的全服聚合统计
+        self.economy_task: Optional[asyncio.Task] = None # 后台分批更新存量指标
+        self.replay_store = replay.ReplayStore(self.settings.replay.max_replays_per_user) # 战报回放存储
 
         self.data_lock = asyncio.Lock()
+        self.transfer_lock = asyncio.Lock() # 同一时间只允许一个导出或导入任务
+        # 玩家数据在后台分批加载，完成前只服务已读到存档的玩家，并暂缓一切会写回玩家数据的操作
+        self.data_ready = asyncio.Event()
+        self.data_load_error: Optional[str] = None # 玩家数据加载失败的原因；失败后拒绝一切指令，也不再写回存档
+        self.load_task: Optional[asyncio.Task] = None
+        self._save_deferred = False
+
+        # 渲染缓存：玩家面板和属性计算结果按记录版本号缓存，记录变更时版本号递增
+        render_cache_size = self.settings.system.render_cache_size
+        self.record_versions: Dict[str, int] = {}
+        self.render_cache = cache.LRUCache(render_cache_size)
+        self.stats_cache = cache.LRUCache(render_cache_size)
+        self.shop_version = 0 # 商店每次刷新后递增，用于商店面板缓存
+
+        # 指令防刷：合并同一玩家重复的在途指令，并按指令类别进行令牌桶限流
+        self.command_guard = throttle.CommandGuard(
+            limits=self._throttle_limits(),
+            duplicate_window=self.settings.throttle.duplicate_window_seconds,
+            cache_size=render_cache_size,
+        )
+        self.command_guard.admission = self._admission_notice
         self.save_task: Optional[asyncio.Task] = None # 用于存放后台保存任务
 
-        # 加载所有静态数据文件
+        # 增量备份：定期写入全量基准快照，两次快照之间只备份发生变更的玩家
+        cfg_backup = self.settings.backup
+        self.backup = backup.BackupManager(
+            worker_dir / "backups",
+            deltas_per_base=cfg_backup.deltas_per_base,
+            retained_chains=cfg_backup.retained_chains,
+        )
+        self.backup_lock = asyncio.Lock()
+        self.backup_task: Optional[asyncio.Task] = None
+
+        # 锦标赛引擎 (进程池按需创建)
+        self.tournament_engine = tournament.TournamentEngine(max_workers=self.settings.tournament.max_workers)
+        self.tournament_running = False
+        self.boss_estimate_running = False # Boss预估与锦标赛共用进程池
+
+        # 签文、游戏常量和装备预设在首次使用时才解析（见下方的延迟属性）
+        self.nickname_index = nickname_index.NicknameIndex()
+        self.energy_index = rating_index.SortedScoreIndex() # 已注册玩家按能级排序，用于 /匹配
+        self.rating_index = rating_index.SortedScoreIndex() # 参与过PVP的玩家按天梯积分排序，积分变化时即时更新
+
+    def _throttle_limits(self) -> Dict[str, Tuple[float, float]]:
+        cfg_throttle = self.settings.throttle
+        return {
+            throttle.READ_ONLY: (cfg_throttle.read_rate_per_second, cfg_throttle.read_burst),
+            throttle.MUTATING: (cfg_throttle.mutate_rate_per_second, cfg_throttle.mutate_burst),
+        }
+
+    def _load_static_json(self, file_name: str) -> Dict:
+        """读取插件目录下的静态数据文件，读取失败时返回空字典。"""
+        started = time.perf_counter()
         try:
-            current_dir = Path(__file__).parent
-            with open(current_dir / "fortunes.json", 'r', encoding='utf-8') as f:
-                self.fortunes = json.load(f)
-            with open(current_dir / "game_constants.json", 'r', encoding='utf-8') as f:
-                self.game_constants = json.load(f)
-            with open(current_dir / "equipment_presets.json", 'r', encoding='utf-8') as f:
-                self.equipment_presets = json.load(f)
-            logger.info("所有静态数据 (fortunes, constants, presets) 加载成功。")
+            with open(Path(__file__).parent / file_name, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         except Exception as e:
-            logger.error(f"加载静态数据文件时发生错误: {e}")
-
-        logger.info("签到插件已加载，配置已读取。")
+            logger.error(f"加载静态数据文件 {file_name} 时发生错误: {e}")
+            return {}
+        logger.info(f"静态数据 {file_name} 加载成功 ({(time.perf_counter() - started) * 1000:.1f}ms)。")
+        return data
+
+    @functools.cached_property
+    def fortunes(self) -> Dict:
+        """签文，首次签到时加载。"""
+        return self._load_static_json("fortunes.json")
+
+    @functools.cached_property
+    def game_constants(self) -> Dict:
+        """游戏常量（品级、强化系数、职业加成等）。"""
+        return self._load_static_json("game_constants.json")
+
+    @functools.cached_property
+    def equipment_presets(self) -> Dict:
+        """各职业的装备预设。"""
+        return self._load_static_json("equipment_presets.json")
+
+    @functools.cached_property
+    def item_stat_table(self) -> Dict:
+        """预计算的装备属性表，首次计算玩家属性时生成。"""
+        return utils.build_item_stat_table(self.equipment_presets, self.game_constants)
+
+    @functools.cached_property
+    def item_delta_table(self) -> Dict:
+        return utils.build_item_delta_table(self.item_stat_table, self.game_constants)
+
+    @functools.cached_property
+    def record_class_names(self) -> Tuple[str, ...]:
+        """每条玩家记录都应具有装备栏的职业列表。"""
+        return tuple(self.game_constants.get("class_bonus_multipliers", {}))
+
+    @functools.cached_property
+    def population(self) -> "population.PopulationMirror":
+        """全服玩家的列式镜像，首次使用时创建并把已加载的玩家全部标记为待同步。"""
+        mirror = population.PopulationMirror(self.equipment_presets, self.game_constants, self.item_stat_table)
+        for user_id in self.user_data:
+            mirror.mark(user_id)
+        return mirror
+
+    def _admission_notice(self, user_id: str) -> Optional[str]:
+        """玩家数据加载失败，或仍在加载且该玩家的存档尚未读到时，返回提示文本（拒绝执行指令）。"""
+        if self.data_load_error is not None:
+            return "玩家数据加载失败，为保护存档插件已暂停服务，请联系管理员查看日志喵！"
+        if self.data_ready.is_set() or user_id in self.user_data:
+            return None
+        return "插件正在加载玩家数据，还没读到你的存档，请稍后再试喵~"
 
     # [新增] 获取品级和签文的辅助函数
     def _get_rp_grade_and_fortune(self, base_rp: int) -> Tuple[str, str]:
@@ -84,46 +219,273 @@ class DailyCheckinPlugin(Star):
 
         return grade, fortune
 
+    def _refresh_settings(self):
+        """配置内容发生变化时重新编译设置快照；新配置不合法时保留原设置。"""
+        if settings.fingerprint(self.config) == self.settings.fingerprint:
+            return
+        previous = self.settings
+        try:
+            self.settings = settings.compile_settings(self.config)
+        except ValueError as e:
+            logger.error(f"新的插件配置无效，继续使用原配置: {e}")
+            return
+        if (previous.system.storage_mode, previous.system.worker_id) != (self.settings.system.storage_mode, self.settings.system.worker_id):
+            logger.warning("存储模式和实例标识决定了数据文件的位置，需要重载插件后才会生效。")
+        self._apply_settings()
+        logger.info("检测到插件配置变更，已重新编译设置。")
+
+    def _apply_settings(self):
+        """把新编译的设置应用到在 _init_subsystems 中按旧设置创建的各个子系统。"""
+        cfg = self.settings
+        # 能级公式或等级表可能已变化，丢弃基于旧配置计算的缓存，并重新计算各玩家的能级相关统计
+        self.stats_cache.clear()
+        self.render_cache.clear()
+        self.stats_cache.resize(cfg.system.render_cache_size)
+        self.render_cache.resize(cfg.system.render_cache_size)
+        for user_id in self.user_data:
+            self.energy_index.mark(user_id)
+            self.economy_stats.touch(user_id)
+
+        self.command_guard.configure(self._throttle_limits(), cfg.throttle.duplicate_window_seconds, cfg.system.render_cache_size)
+        self.command_guard.reply_cache.clear()
+        self.ledger.configure(int(cfg.ledger.max_file_mb * 1024 * 1024), cfg.ledger.max_files, cfg.ledger.flush_batch_size)
+        self.replay_store.set_max_per_user(cfg.replay.max_replays_per_user)
+        self.tournament_engine.resize(cfg.tournament.max_workers)
+        self.backup.configure(cfg.backup.deltas_per_base, cfg.backup.retained_chains)
+        if cfg.backup.enabled and not self.backup_task:
+            self.backup_task = asyncio.create_task(self._periodic_backup())
+            logger.info("后台定时备份任务已启动。")
+        elif not cfg.backup.enabled and self.backup_task:
+            self.backup_task.cancel()
+            self.backup_task = None
+            logger.info("后台定时备份任务已停止。")
+
+    async def _wait_for_data(self):
+        """等待玩家数据全部载入；加载失败时抛出 RuntimeError，而不是让调用方一直等下去。"""
+        if not self.data_ready.is_set() and self.data_load_error is None:
+            if self.load_task:
+                # 加载任务无论成功还是失败都会结束
+                await asyncio.shield(self.load_task)
+            else:
+                await self.data_ready.wait()
+        if self.data_load_error is not None:
+            raise RuntimeError(f"玩家数据加载失败，插件已暂停写回存档: {self.data_load_error}")
+
+    def _mark_dirty(self, user_id: str):
+        """玩家记录发生变更后调用，使该玩家的所有缓存失效。"""
+        self.record_versions[user_id] = self.record_versions.get(user_id, 0) + 1
+        self.economy_stats.touch(user_id)
+        self.population.mark(user_id)
+        self.energy_index.mark(user_id)
+        self.backup.mark(user_id)
+        if self.shared_store:
+            self.shared_store.mark(user_id)
+
+    def _participant_name(self, user_id: str) -> str:
+        """活动排行与结算报告中显示的名字：未设置昵称时用ID尾号，已不存在的玩家显示为神秘玩家。"""
+        user = self.user_data.get(user_id)
+        if user is None:
+            return f"神秘玩家{user_id[-4:]}"
+        return user["nickname"] or f"玩家{user_id[-4:]}"
+
+    def _energy_score(self, user_id: str) -> Optional[float]:
+        """能级索引的分值：只有设置了昵称的玩家才能被匹配。"""
+        user = self.user_data.get(user_id)
+        if not user or not user["nickname"]:
+            return None
+        return self._get_player_stats(user_id)['energy_level']['value']
+
+    def _record_flow(self, user_id: str, source: str, resource: str, delta: float):
+        """
+        记录一次资源变动（resource 为 rp / enhancement_stones / draw_tickets）。
+        需在余额修改之后调用，账本会同时记下变动后的余额。
+        """
+        if not delta:
+            return
+        self.economy_stats.record_flow(source, resource, delta)
+        user = self.user_data[user_id]
+        balance = user["rp"] if resource == "rp" else user["resources"][resource]
+        self.ledger.record(user_id, source, resource, delta, balance)
+
+    def _nickname_not_found(self, target_nickname: str, exclude: Optional[str] = None) -> str:
+        """找不到昵称时的回复，附带模糊匹配到的相近昵称。"""
+        suggestions = self.nickname_index.suggest(target_nickname, exclude=exclude)
+        if not suggestions:
+            return f"找不到名为 “{target_nickname}” 的玩家，是不是打错了喵？"
+        names = "、".join(f"“{name}”" for name, _ in suggestions)
+        return f"找不到名为 “{target_nickname}” 的玩家，你是不是想找 {names} 喵？"
+
+    def _economy_snapshot(self, user_id: str) -> Optional[Tuple[float, float, float, float]]:
+        """计算单个玩家对全服存量指标的贡献值。"""
+        user = self.user_data.get(user_id)
+        if not user:
+            return None
+        resources = user["resources"]
+        energy = self._get_player_stats(user_id)['energy_level']['value']
+        return (user["rp"], resources["enhancement_stones"], resources["draw_tickets"], energy)
+
+    def _get_player_stats(self, user_id: str) -> Dict:
+        """
+        获取玩家的详细属性，结果按记录版本缓存。
+        返回的是共享的缓存对象，调用方如需修改（例如写入 name）请先复制。
+        """
+        version = self.record_versions.get(user_id, 0)
+        cached = self.stats_cache.get(user_id)
+        if cached and cached[0] == version:
+            return cached[1]
+        stats = utils.get_detailed_player_stats(self.user_data[user_id], self.equipment_presets, self.game_constants, self.settings.stats_config)
+        self.stats_cache.put(user_id, (version, stats))
+        return stats
+
 
     async def _load_data(self):
+        """加载商店、活动、战报和统计数据（体积都很小）；玩家数据由 _load_user_data 在后台加载。"""
         async with self.data_lock:
-            try:
-                with open(self.user_data_path, 'r', encoding='utf-8') as f:
-                    self.user_data = json.load(f)
-                logger.info("成功加载用户数据。")
-            except FileNotFoundError:
-                logger.info("未找到用户数据文件，将创建新文件。")
-                self.user_data = {}
+            if self.shared_store:
+                # 共享模式下商店和活动数据在文件锁内读取，并作为之后与其他实例合并的基准
+                self.shop_data = self.shared_store.load_blob(self.shop_data_path, merge=shared_store.merge_shop)
+                self.active_event = self.shared_store.load_blob(self.event_data_path, merge=shared_store.merge_event)
+                logger.info("成功加载共享的商店和活动数据。")
+            else:
+                self._load_blob_files()
 
             try:
-                with open(self.shop_data_path, 'r', encoding='utf-8') as f:
-                    self.shop_data = json.load(f)
-                logger.info("成功加载商店数据。")
+                with open(self.replay_data_path, 'r', encoding='utf-8') as f:
+                    self.replay_store = replay.ReplayStore.from_dict(json.load(f), self.settings.replay.max_replays_per_user)
+                logger.info("成功加载战报数据。")
             except FileNotFoundError:
-                logger.info("未找到商店数据文件，将创建新文件。")
-                self.shop_data = {}
+                logger.info("未找到战报数据文件，将创建新文件。")
 
             try:
-                with open(self.event_data_path, 'r', encoding='utf-8') as f:
-                    self.active_event = json.load(f)
-                logger.info("成功加载活动数据。")
+                with open(self.economy_stats_path, 'r', encoding='utf-8') as f:
+                    self.economy_stats = economy_stats.EconomyStats.from_dict(json.load(f))
+                logger.info("成功加载统计数据。")
             except FileNotFoundError:
-                logger.info("未找到活动数据文件，将创建新文件。")
-                self.active_event = {}
+                logger.info("未找到统计数据文件，将创建新文件。")
+
+    def _load_blob_files(self):
+        """单实例模式下直接读取商店和活动数据文件。"""
+        try:
+            with open(self.shop_data_path, 'r', encoding='utf-8') as f:
+                self.shop_data = json.load(f)
+            logger.info("成功加载商店数据。")
+        except FileNotFoundError:
+            logger.info("未找到商店数据文件，将创建新文件。")
+            self.shop_data = {}
+
+        try:
+            with open(self.event_data_path, 'r', encoding='utf-8') as f:
+                self.active_event = json.load(f)
+            logger.info("成功加载活动数据。")
+        except FileNotFoundError:
+            logger.info("未找到活动数据文件，将创建新文件。")
+            self.active_event = {}
+
+    async def _load_user_data(self):
+        """
+        [后台任务] 读取并分批解析玩家数据，每批载入后立即建立索引，已载入的玩家即可正常使用指令。
+        全部载入后才允许保存；解析失败时保持未就绪状态，避免用不完整的数据覆盖存档。
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            with self.startup_timer.phase("读取玩家数据"):
+                try:
+                    if self.shared_store:
+                        items = iter((await loop.run_in_executor(None, self.shared_store.load)).items())
+                    else:
+                        text = await loop.run_in_executor(None, self.user_data_path.read_text, "utf-8")
+                        items = startup.iter_object_items(text)
+                except FileNotFoundError:
+                    logger.info("未找到用户数据文件，将创建新文件。")
+                    items = iter(())
+
+            with self.startup_timer.phase("解析并索引玩家数据"):
+                upgraded = 0
+                while True:
+                    batch = await loop.run_in_executor(None, startup.take, items, LOAD_BATCH_SIZE)
+                    if not batch:
+                        break
+                    batch, count = await loop.run_in_executor(None, schema.upgrade_batch, batch, self.record_class_names)
+                    upgraded += count
+                    async with self.data_lock:
+                        for user_id, user in batch:
+                            self.user_data[user_id] = user
+                        self._index_loaded_users(batch)
+        except Exception as e:
+            self.data_load_error = str(e) or type(e).__name__
+            logger.error(f"加载用户数据失败，为保护存档，本次运行不会写回玩家数据，所有指令将被拒绝: {e}")
+            return
+
+        self.data_ready.set()
+        if upgraded:
+            # 迁移结果随下一次保存写回；共享模式下只有被再次修改的记录才会提交
+            logger.info(f"已将 {upgraded} 条玩家记录迁移到数据结构版本 {schema.SCHEMA_VERSION}。")
+        logger.info(f"成功加载用户数据，共 {len(self.user_data)} 名玩家。启动耗时: {self.startup_timer.summary()}")
+        if self._save_deferred:
+            await self._save_data()
+
+    def _index_loaded_users(self, batch):
+        """为新载入的一批玩家建立派生索引，与 _rebuild_indexes 的效果相同但只处理这一批。"""
+        for user_id, _user in batch:
+            self.economy_stats.touch(user_id)
+            self.energy_index.mark(user_id)
+        # 列式镜像尚未创建时无需标记，创建时会自动纳入所有已载入的玩家
+        if "population" in self.__dict__:
+            for user_id, _user in batch:
+                self.population.mark(user_id)
+        self.nickname_index.add_many((user_id, user["nickname"]) for user_id, user in batch if user.get("nickname"))
+        self.rating_index.update_many((user_id, user["pvp"]["rating"]) for user_id, user in batch if "pvp" in user)
+
+    def _rebuild_indexes(self, affected_user_ids):
+        """
+        整体替换 user_data 后（加载或恢复备份）重建各类派生索引。
+        存量指标与列式镜像不落盘，相关玩家标记为待更新，首次查询时统一计算。
+        """
+        for user_id in affected_user_ids:
+            self.economy_stats.touch(user_id)
+            self.population.mark(user_id)
+            self.energy_index.mark(user_id)
+        self.rating_index = rating_index.SortedScoreIndex()
+        for user_id, user in self.user_data.items():
+            if "pvp" in user:
+                self.rating_index.update(user_id, user["pvp"]["rating"])
+        self.nickname_index = nickname_index.NicknameIndex.build(self.user_data)
 
     async def _save_data(self):
+        if self.data_load_error is not None:
+            # 内存中只有部分玩家，写盘会用不完整的数据覆盖存档
+            logger.warning("玩家数据加载失败，跳过保存。")
+            return
+        if not self.data_ready.is_set():
+            # 玩家数据尚未加载完，此时写盘会用不完整的数据覆盖存档，推迟到加载完成后
+            self._save_deferred = True
+            return
         async with self.data_lock:
             try:
-                with open(self.user_data_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.user_data, f, ensure_ascii=False, indent=4)
-                    f.flush()
-                    os.fsync(f.fileno())
-                with open(self.shop_data_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.shop_data, f, ensure_ascii=False, indent=4)
+                self.ledger.flush()
+                if self.shared_store:
+                    # 共享模式下玩家数据按修订号合并提交，商店和活动数据在同一把锁内与其他实例的改动合并后写入
+                    self._shared_sync()
+                else:
+                    with open(self.user_data_path, 'w', encoding='utf-8') as f:
+                        json.dump(self.user_data, f, ensure_ascii=False, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    with open(self.shop_data_path, 'w', encoding='utf-8') as f:
+                        json.dump(self.shop_data, f, ensure_ascii=False, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    with open(self.event_data_path, 'w', encoding='utf-8') as f:
+                        json.dump(self.active_event, f, ensure_ascii=False, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                with open(self.replay_data_path, 'w', encoding='utf-8') as f:
+                    # 战报只含种子和属性快照，使用紧凑格式即可
+                    json.dump(self.replay_store.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
                     f.flush()
                     os.fsync(f.fileno())
-                with open(self.event_data_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.active_event, f, ensure_ascii=False, indent=4)
+                with open(self.economy_stats_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.economy_stats.to_dict(), f, ensure_ascii=False, indent=4)
                     f.flush()
                     os.fsync(f.fileno())
             except Exception as e:
@@ -132,37 +494,126 @@ class DailyCheckinPlugin(Star):
 
     async def _periodic_save(self):
         """后台循环任务，用于定时保存数据。"""
-        interval = self.config.get("system_settings", {}).get("auto_save_interval_seconds", 1800)
         while True:
+            interval = self.settings.system.auto_save_interval_seconds
             await asyncio.sleep(interval)
+            self._refresh_settings()
             logger.info(f"开始执行定时保存任务（间隔: {interval}秒）...")
             await self._save_data()
             logger.info("定时保存任务完成。")
 
 
+    def _shared_sync(self):
+        """
+        共享模式下提交本实例的变更并载入其他实例的变更，需在持有 data_lock 时调用。
+        被载入或被其他实例删除的玩家会刷新所有派生缓存和索引；商店和活动数据替换为与其他实例合并后的版本。
+        """
+        reloaded, rejected, blob_updates = self.shared_store.sync(
+            self.user_data, {self.shop_data_path: self.shop_data, self.event_data_path: self.active_event}
+        )
+        if self.shop_data_path in blob_updates:
+            self.shop_data = blob_updates[self.shop_data_path]
+            self.shop_version += 1
+        if self.event_data_path in blob_updates:
+            self.active_event = blob_updates[self.event_data_path]
+        for user_id in reloaded:
+            self._mark_dirty(user_id)
+            user = self.user_data.get(user_id)
+            if user is None:
+                # 已被其他实例删除（例如恢复了不含该玩家的备份）
+                self.nickname_index.remove(user_id)
+                self.rating_index.update(user_id, None)
+                continue
+            # 其他实例可能运行旧版插件，载入的记录同样需要迁移
+            schema.upgrade(user, self.record_class_names)
+            if user["nickname"]:
+                self.nickname_index.set(user_id, user["nickname"])
+            else:
+                self.nickname_index.remove(user_id)
+            self.rating_index.update(user_id, user["pvp"]["rating"] if "pvp" in user else None)
+        # 载入的记录来自磁盘，不需要再由本实例提交
+        self.shared_store.dirty.difference_update(reloaded)
+        if rejected:
+            logger.warning(f"共享存储冲突：以下玩家的改动与其他实例的提交冲突（同一玩家、成对的对战方或重复的昵称），本实例的改动被放弃: {', '.join(rejected)}")
+
+    async def _periodic_shared_sync(self):
+        """后台循环任务，共享模式下定期与其他实例同步玩家数据。"""
+        while True:
+            await asyncio.sleep(self.settings.system.shared_sync_interval_seconds)
+            if not self.data_ready.is_set():
+                continue
+            try:
+                async with self.data_lock:
+                    self._shared_sync()
+            except Exception as e:
+                logger.error(f"同步共享数据时发生错误: {e}")
+
+    async def _periodic_economy_flush(self):
+        """
+        后台循环任务：分批重新计算有变动玩家的经济贡献值和能级索引，每批之间释放数据锁，
+        /数据概览 和 /匹配 因此无需全量计算。
+        """
+        while True:
+            await asyncio.sleep(ECONOMY_FLUSH_INTERVAL)
+            try:
+                remaining = len(self.economy_stats.pending) + len(self.energy_index.pending)
+                while remaining:
+                    async with self.data_lock:
+                        remaining = self.economy_stats.flush(self._economy_snapshot, limit=ECONOMY_FLUSH_BATCH_SIZE)
+                        remaining += self.energy_index.sync(self._energy_score, limit=ECONOMY_FLUSH_BATCH_SIZE)
+                    await asyncio.sleep(0)
+            except Exception as e:
+                logger.error(f"更新经济统计时发生错误: {e}")
+
+    async def _run_backup(self, full: bool = False) -> str:
+        """执行一次备份，返回恢复点编号。只在序列化时持有数据锁，压缩和写盘放到线程池中进行。"""
+        await self._wait_for_data()
+        async with self.backup_lock:
+            async with self.data_lock:
+                kind, payload, _ = self.backup.prepare(self.user_data, self.shop_data, self.active_event, full=full)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self.backup.write, kind, payload)
+            except Exception:
+                # 本次的变更集已清空，写入失败时下次改做全量备份，保证备份链完整
+                self.backup.force_base = True
+                raise
+
+    async def _periodic_backup(self):
+        """后台循环任务，用于定时备份数据。"""
+        while True:
+            await asyncio.sleep(self.settings.backup.interval_seconds)
+            try:
+                point = await self._run_backup()
+                logger.info(f"定时备份完成，恢复点: {point}")
+            except Exception as e:
+                logger.error(f"定时备份时发生错误: {e}")
+
+
     async def _refresh_shop(self):
         """刷新商店的商品价格、购买次数以及抽奖券价格。"""
         async with self.data_lock:
             logger.info("开始每日刷新商店...")
-            cfg_shop = self.config.get("shop_settings", {})
+            cfg_shop = self.settings.shop
 
             # 刷新属性价格
-            base_price = cfg_shop.get("base_price", 50)
-            fluctuation = cfg_shop.get("price_fluctuation", 0.5)
+            base_price = cfg_shop.base_price
+            fluctuation = cfg_shop.price_fluctuation
             min_price = int(base_price * (1 - fluctuation))
             max_price = int(base_price * (1 + fluctuation))
             attribute_keys = self.INITIAL_ATTRIBUTES.keys()
             new_prices = {attr: random.randint(min_price, max_price) for attr in attribute_keys}
 
             # [新增] 刷新抽奖券价格
-            ticket_base_price = cfg_shop.get("draw_ticket_base_price", 300)
+            ticket_base_price = cfg_shop.draw_ticket_base_price
             min_ticket_price = int(ticket_base_price * (1 - fluctuation))
             max_ticket_price = int(ticket_base_price * (1 + fluctuation))
             new_ticket_price = random.randint(min_ticket_price, max_ticket_price)
 
+            self.shop_version += 1
             self.shop_data = {
                 "last_refresh_date": date.today().isoformat(),
-                "remaining_purchases": cfg_shop.get("daily_purchase_limit", 10),
+                "remaining_purchases": cfg_shop.daily_purchase_limit,
                 "prices": new_prices,
                 "draw_ticket_price": new_ticket_price
             }
@@ -175,38 +626,43 @@ class DailyCheckinPlugin(Star):
     async def initialize(self):
         """
         异步初始化。
-        - 加载数据
+        - 加载商店、活动等小型数据，玩家数据交给后台任务分批加载
         - 启动后台定时保存任务
         """
-        await self._load_data()
-        logger.info("数据加载完成。")
+        with self.startup_timer.phase("加载辅助数据"):
+            await self._load_data()
+        self.load_task = asyncio.create_task(self._load_user_data())
+        logger.info(f"插件已就绪，玩家数据正在后台加载。启动耗时: {self.startup_timer.summary()}")
 
         # 启动后台定时保存任务
         self.save_task = asyncio.create_task(self._periodic_save())
         logger.info("后台定时保存任务已启动。")
 
+        self.economy_task = asyncio.create_task(self._periodic_economy_flush())
+
+        if self.settings.backup.enabled:
+            self.backup_task = asyncio.create_task(self._periodic_backup())
+            logger.info("后台定时备份任务已启动。")
+
+        if self.shared_store:
+            self.sync_task = asyncio.create_task(self._periodic_shared_sync())
+            logger.info("共享存储模式已启用，后台同步任务已启动。")
+
         
 
 
 
     @filter.command("jrrp", alias={'签到', '今日人品'})
+    @throttle.guard_command(throttle.MUTATING)
     async def daily_check_in(self, event: AstrMessageEvent):
         """每日签到指令，获取人品和可能的彩蛋奖励。"""
         user_id = event.get_sender_id()
         today_str = date.today().isoformat()
 
         async with self.data_lock:
-            if user_id not in self.user_data:
-                class_names = self.game_constants.get("class_bonus_multipliers", {}).keys()
-                self.user_data[user_id] = {
-                    "nickname": None,
-                    "rp": 0,
-                    "resources": {"enhancement_stones": 0, "draw_tickets": 0},
-                    "attributes": self.INITIAL_ATTRIBUTES.copy(),
-                    "check_in": {"continuous_days": 0, "last_date": ""},
-                    "active_class": "均衡使者",
-                    "equipment_sets": {class_name: {} for class_name in class_names}
-                }
+            is_new_player = user_id not in self.user_data
+            if is_new_player:
+                self.user_data[user_id] = schema.new_player(self.record_class_names)
                 # 提示新用户设置昵称
                 yield event.plain_result("欢迎新朋友喵！已为你创建角色喵~请使用 `/设置昵称 [你的昵称]` 来完成注册哦喵！=￣ω￣=")
 
@@ -224,15 +680,14 @@ class DailyCheckinPlugin(Star):
             else:
                 check_in_info["continuous_days"] = 1
 
-            cfg_checkin = self.config.get("check_in_settings", {})
-            max_days = cfg_checkin.get("max_continuous_days", 15)
-            bonus_per_day = cfg_checkin.get("bonus_per_day", 0.02)
-            continuous_days = min(check_in_info["continuous_days"], max_days)
+            cfg_checkin = self.settings.check_in
+            continuous_days = min(check_in_info["continuous_days"], cfg_checkin.max_continuous_days)
 
-            base_rp = random.randint(cfg_checkin.get("base_rp_min", 1), cfg_checkin.get("base_rp_max", 100))
-            multiplier = 1 + (continuous_days - 1) * bonus_per_day
+            base_rp = random.randint(cfg_checkin.base_rp_min, cfg_checkin.base_rp_max)
+            multiplier = 1 + (continuous_days - 1) * cfg_checkin.bonus_per_day
             total_rp_gain = round(base_rp * multiplier)
             user["rp"] += total_rp_gain
+            self._record_flow(user_id, "jrrp", "rp", total_rp_gain)
 
             bonus_msg = ""
             ticket_bonus_msg = ""
@@ -246,9 +701,10 @@ class DailyCheckinPlugin(Star):
             if attributes_to_update:
                 # 增加抽奖券
                 user['resources']['draw_tickets'] += 1
+                self._record_flow(user_id, "jrrp", "draw_tickets", 1)
                 ticket_bonus_msg = "\n🎟️意外之喜！获得【抽奖券x1】"
                 
-                attribute_increment = self.config.get("shop_settings", {}).get("attribute_increment", 0.1)
+                attribute_increment = self.settings.shop.attribute_increment
                 bonus_parts = []
                 for attr in attributes_to_update:
                     user["attributes"][attr] = round(user["attributes"][attr] + attribute_increment, 1)
@@ -256,6 +712,8 @@ class DailyCheckinPlugin(Star):
                 bonus_msg = f"\n✨幸运暴击！获得 {', '.join(bonus_parts)}"
 
             check_in_info["last_date"] = today_str
+            self._mark_dirty(user_id)
+            self.economy_stats.record_check_in(is_new_player)
 
             # [修改] 使用新的格式生成回复
             grade, fortune = self._get_rp_grade_and_fortune(base_rp)
@@ -281,6 +739,7 @@ class DailyCheckinPlugin(Star):
         await self._save_data()     #立即保存一次数据
 
     @filter.command("设置昵称", alias={'set_nickname'})
+    @throttle.guard_command(throttle.MUTATING)
     async def set_nickname(self, event: AstrMessageEvent, nickname: str):
         """设置用户在机器人中的唯一昵称。"""
         user_id = event.get_sender_id()
@@ -289,21 +748,32 @@ class DailyCheckinPlugin(Star):
             if user_id not in self.user_data:
                 yield event.plain_result("你还没有角色哦，请先使用 /jrrp 签到创建角色喵！")
                 return
+            if not self.data_ready.is_set():
+                # 其他玩家的存档可能还没载入，此时无法保证昵称唯一
+                yield event.plain_result("插件正在加载玩家数据，请稍后再设置昵称喵~")
+                return
 
             # 检查昵称唯一性
-            for uid, udata in self.user_data.items():
-                if udata.get("nickname") == nickname and uid != user_id:
-                    yield event.plain_result(f"抱歉喵＞﹏＜，昵称 “{nickname}” 已经被其他玩家占用了，换一个吧！")
-                    return
+            owner_id = self.nickname_index.lookup(nickname)
+            if owner_id is not None and owner_id != user_id:
+                yield event.plain_result(f"抱歉喵＞﹏＜，昵称 “{nickname}” 已经被其他玩家占用了，换一个吧！")
+                return
 
             # 更新昵称
             self.user_data[user_id]['nickname'] = nickname
+            self.nickname_index.set(user_id, nickname)
+            self._mark_dirty(user_id)
 
         await self._save_data() # 立即保存重要变更
+        if self.user_data.get(user_id, {}).get("nickname") != nickname:
+            # 共享模式下另一个实例在本次提交之前把这个昵称分给了其他玩家
+            yield event.plain_result(f"抱歉喵＞﹏＜，昵称 “{nickname}” 刚刚被其他玩家抢先占用了，换一个吧！")
+            return
         yield event.plain_result(f"昵称设置成功！你的昵称现在是 “{nickname}” 啦！")
 
 
     @filter.command("切换职业", alias={'set_class'})
+    @throttle.guard_command(throttle.MUTATING)
     async def set_class(self, event: AstrMessageEvent, class_identifier: str):
         """切换当前激活的职业。"""
         user_id = event.get_sender_id()
@@ -333,13 +803,117 @@ class DailyCheckinPlugin(Star):
 
             # 更新激活职业
             self.user_data[user_id]['active_class'] = target_class
+            self._mark_dirty(user_id)
 
         await self._save_data() # 立即保存重要变更
         yield event.plain_result(f"职业切换成功喵！当前职业：【{target_class}】！")
 
 
 
+    def _render_status_panel(self, user_id: str) -> str:
+        """构建玩家的完整状态面板文本（调用方需持有 data_lock）。"""
+        user = self.user_data[user_id]
+
+        # 1. 调用核心引擎，获取所有最终计算数据
+        stats = self._get_player_stats(user_id)
+
+        nickname = user["nickname"] or "尚未设置"
+        divider = "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀"
+
+        # --- 2. 构建各大分栏 ---
+
+        # 分栏1: 资源
+        res = user["resources"]
+        res_lines = [
+            f"💰 人品: {user['rp']}",
+            f"🎟️ 抽奖券: {res['draw_tickets']}",
+            f"💎 强化石: {res['enhancement_stones']}",
+            f"📅 连续签到: {user['check_in']['continuous_days']} 天"
+        ]
+        resources_str = "\n".join(res_lines)
+
+        # 分栏2: 职业与装备
+        active_class = user["active_class"]
+        equipped_items = user["equipment_sets"][active_class]
+        equip_lines = [f"⚜️ 职业: {active_class}"]
+        slot_map_cn = {"head": "头部", "chest": "胸甲", "legs": "腿部", "feet": "脚部", "weapon": "武器"}
+        for slot_key, slot_name_cn in slot_map_cn.items():
+            item_info = equipped_items.get(slot_key)
+            if item_info:
+                grade = item_info['grade']
+                level = item_info['success_count']
+                item_name = self.equipment_presets[active_class][slot_key]['names'][grade]
+                equip_lines.append(f"  {slot_name_cn}: {grade}-{item_name}(+{level})")
+            else:
+                equip_lines.append(f"  {slot_name_cn}: 未装备")
+        equipment_str = "\n".join(equip_lines)
+
+        # 格式化函数，用于生成 "最终值 (+加成)" 的字符串
+        def format_stat(stat_dict, is_percent=False):
+            final = stat_dict['final']
+            bonus = stat_dict.get('bonus', stat_dict.get('bonus_percent', 0))
+            if is_percent:
+                return f"{final:.2%} (+{bonus:.2%})" if bonus else f"{final:.2%}"
+            else:
+                return f"{final:.1f} (+{bonus:.1f})" if bonus else f"{final:.1f}"
+            
+        # 实现五维属性中文显示
+        attr_chinese_name_map = {
+            "strength": "力量",
+            "agility": "敏捷",
+            "stamina": "体力",
+            "intelligence": "智力",
+            "charisma": "魅力"
+        }
+
+        # 分栏3: 五维属性
+        core_attrs_lines = []
+        for key, emoji in [("strength", "💪"), ("agility", "🏃"), ("stamina", "❤️"), ("intelligence", "🧠"), ("charisma", "✨")]:
+            s = stats[key]
+            chinese_name = attr_chinese_name_map[key]
+            bonus_str = f" (+{s['bonus']:.1f})" if s['bonus'] else ""
+            core_attrs_lines.append(f"{emoji} {chinese_name}: {s['final']:.1f}{bonus_str}")
+        core_attrs_str = "\n".join(core_attrs_lines)
+
+        # 分栏4: 衍生属性与能级
+        # 注意HP的格式化是整数
+        derivatives_lines = []
+        # (属性键, 中文名, emoji, 是否为纯百分比)
+        attr_map = [
+            ("HP", "生命值", "🩸", False), ("ATK", "攻击力", "💥", False), ("DEF", "防御力", "🛡️", False),
+            ("SPD", "速度", "⚡", False), ("HIT", "命中率", "🎯", True), ("EVD", "闪避率", "🍃", True),
+            ("CRIT", "暴击率", "💥", True), ("CRIT_MUL", "暴击倍率", "☠️", True),
+            ("BLK", "格挡率", "🛡️", True), ("BLK_MUL", "格挡减伤", "🩹", True)
+        ]
+        for key, name, emoji, is_pure_percent in attr_map:
+            s = stats[key]
+            bonus_str = f" (+{s['bonus_percent']:.2%})" if s['bonus_percent'] else ""
+            if is_pure_percent:
+                derivatives_lines.append(f"{emoji} {name}: {s['final']:.2%}{bonus_str}")
+            else:
+                final_val = int(s['final']) if key == "HP" else f"{s['final']:.1f}"
+                derivatives_lines.append(f"{emoji} {name}: {final_val}{bonus_str}")
+
+        energy = stats['energy_level']
+        derivatives_lines.append(f"🔮 能级: {energy['value']:.2f} ({energy['rank']})")
+        derivatives_str = "\n".join(derivatives_lines)
+
+        # --- 3. 组装最终回复 ---
+        reply = (
+            f"\n--- 💠 {nickname}的状态报告 💠 ---\n"
+            f"{resources_str}\n"
+            f"{divider}\n"
+            f"{equipment_str}\n"
+            f"{divider}\n"
+            f"{core_attrs_str}\n"
+            f"{divider}\n"
+            f"{derivatives_str}"
+        )
+        return reply
+
+
     @filter.command("状态", alias={'我的状态', 'status'})
+    @throttle.guard_command(throttle.READ_ONLY)
     async def show_status(self, event: AstrMessageEvent):
         """显示用户全面的、包含装备和详细属性的状态面板。"""
         user_id = event.get_sender_id()
@@ -349,115 +923,20 @@ class DailyCheckinPlugin(Star):
                 yield event.plain_result("你还没有签到过，没有状态信息哦。请先使用 /jrrp 进行签到。")
                 return
 
-            user = self.user_data[user_id]
-
-            # 1. 调用核心引擎，获取所有最终计算数据
-            stats = utils.get_detailed_player_stats(user, self.equipment_presets, self.game_constants, self.config)
-
-            nickname = user.get("nickname", "尚未设置")
-            divider = "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀"
-
-            # --- 2. 构建各大分栏 ---
-
-            # 分栏1: 资源
-            res = user.get("resources", {})
-            res_lines = [
-                f"💰 人品: {user.get('rp', 0)}",
-                f"🎟️ 抽奖券: {res.get('draw_tickets', 0)}",
-                f"💎 强化石: {res.get('enhancement_stones', 0)}",
-                f"📅 连续签到: {user.get('check_in', {}).get('continuous_days', 0)} 天"
-            ]
-            resources_str = "\n".join(res_lines)
-
-            # 分栏2: 职业与装备
-            active_class = user.get("active_class", "未知")
-            equipped_items = user.get("equipment_sets", {}).get(active_class, {})
-            equip_lines = [f"⚜️ 职业: {active_class}"]
-            slot_map_cn = {"head": "头部", "chest": "胸甲", "legs": "腿部", "feet": "脚部", "weapon": "武器"}
-            for slot_key, slot_name_cn in slot_map_cn.items():
-                item_info = equipped_items.get(slot_key)
-                if item_info:
-                    grade = item_info['grade']
-                    level = item_info['success_count']
-                    item_name = self.equipment_presets[active_class][slot_key]['names'][grade]
-                    equip_lines.append(f"  {slot_name_cn}: {grade}-{item_name}(+{level})")
-                else:
-                    equip_lines.append(f"  {slot_name_cn}: 未装备")
-            equipment_str = "\n".join(equip_lines)
-
-            # 格式化函数，用于生成 "最终值 (+加成)" 的字符串
-            def format_stat(stat_dict, is_percent=False):
-                final = stat_dict['final']
-                bonus = stat_dict.get('bonus', stat_dict.get('bonus_percent', 0))
-                if is_percent:
-                    return f"{final:.2%} (+{bonus:.2%})" if bonus else f"{final:.2%}"
-                else:
-                    return f"{final:.1f} (+{bonus:.1f})" if bonus else f"{final:.1f}"
-                
-            # 实现五维属性中文显示
-            attr_chinese_name_map = {
-                "strength": "力量",
-                "agility": "敏捷",
-                "stamina": "体力",
-                "intelligence": "智力",
-                "charisma": "魅力"
-            }
-
-            # 分栏3: 五维属性
-            core_attrs_lines = []
-            for key, emoji in [("strength", "💪"), ("agility", "🏃"), ("stamina", "❤️"), ("intelligence", "🧠"), ("charisma", "✨")]:
-                s = stats[key]
-                chinese_name = attr_chinese_name_map[key]
-                bonus_str = f" (+{s['bonus']:.1f})" if s['bonus'] else ""
-                core_attrs_lines.append(f"{emoji} {chinese_name}: {s['final']:.1f}{bonus_str}")
-            core_attrs_str = "\n".join(core_attrs_lines)
-
-            # 分栏4: 衍生属性与能级
-            # 注意HP的格式化是整数
-            derivatives_lines = []
-            # (属性键, 中文名, emoji, 是否为纯百分比)
-            attr_map = [
-                ("HP", "生命值", "🩸", False), ("ATK", "攻击力", "💥", False), ("DEF", "防御力", "🛡️", False),
-                ("SPD", "速度", "⚡", False), ("HIT", "命中率", "🎯", True), ("EVD", "闪避率", "🍃", True),
-                ("CRIT", "暴击率", "💥", True), ("CRIT_MUL", "暴击倍率", "☠️", True),
-                ("BLK", "格挡率", "🛡️", True), ("BLK_MUL", "格挡减伤", "🩹", True)
-            ]
-            for key, name, emoji, is_pure_percent in attr_map:
-                s = stats[key]
-                bonus_str = f" (+{s['bonus_percent']:.2%})" if s['bonus_percent'] else ""
-                if is_pure_percent:
-                    derivatives_lines.append(f"{emoji} {name}: {s['final']:.2%}{bonus_str}")
-                else:
-                    final_val = int(s['final']) if key == "HP" else f"{s['final']:.1f}"
-                    derivatives_lines.append(f"{emoji} {name}: {final_val}{bonus_str}")
-
-            energy = stats['energy_level']
-            derivatives_lines.append(f"🔮 能级: {energy['value']:.2f} ({energy['rank']})")
-            derivatives_str = "\n".join(derivatives_lines)
-
-            # --- 3. 组装最终回复 ---
-            reply = (
-                f"\n--- 💠 {nickname}的状态报告 💠 ---\n"
-                f"{resources_str}\n"
-                f"{divider}\n"
-                f"{equipment_str}\n"
-                f"{divider}\n"
-                f"{core_attrs_str}\n"
-                f"{divider}\n"
-                f"{derivatives_str}"
-            )
+            # 面板按玩家记录版本缓存，记录未变化时直接复用上次渲染结果
+            version = self.record_versions.get(user_id, 0)
+            cached = self.render_cache.get(("status", user_id))
+            if cached and cached[0] == version:
+                reply = cached[1]
+            else:
+                reply = self._render_status_panel(user_id)
+                self.render_cache.put(("status", user_id), (version, reply))
             yield event.plain_result(reply)
 
 
 
-    @filter.command("商店", alias={'shop'})
-    async def show_shop(self, event: AstrMessageEvent):
-        """显示当日商店的商品价格和剩余购买次数。"""
-        # 刷新商店
-        if self.shop_data.get("last_refresh_date") != date.today().isoformat():
-            await self._refresh_shop()
-
-        user_id = event.get_sender_id()
+    def _render_shop_panel(self) -> str:
+        """构建当日商店的价格面板。面板对所有玩家相同，每次刷新后只需渲染一次。"""
         prices = self.shop_data.get("prices", {})
         draw_ticket_price = self.shop_data.get("draw_ticket_price", 300)
 
@@ -489,22 +968,44 @@ class DailyCheckinPlugin(Star):
             else:
                 shop_items_str.append(f"   {icon} {name} - {price}")
 
+        # 使用不同的分隔线和表情符号增强视觉效果
+        return (
+            "\n📦 今日商店 📦\n"
+            "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀\n"
+            f"{'\n'.join(shop_items_str)}\n"
+            f"   🎟️ 抽奖券 - {draw_ticket_price}\n"
+            "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀"
+        )
+
+    @filter.command("商店", alias={'shop'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_shop(self, event: AstrMessageEvent):
+        """显示当日商店的商品价格和剩余购买次数。"""
+        # 刷新商店
+        if self.shop_data.get("last_refresh_date") != date.today().isoformat():
+            await self._refresh_shop()
+
+        user_id = event.get_sender_id()
+
+        # 价格面板每次刷新只渲染一次，之后只拼接少量与玩家相关的字段
+        cached = self.render_cache.get("shop")
+        if cached and cached[0] == self.shop_version:
+            shop_panel = cached[1]
+        else:
+            shop_panel = self._render_shop_panel()
+            self.render_cache.put("shop", (self.shop_version, shop_panel))
+
         # 获取用户人品，对新用户做兼容
         user_rp = self.user_data.get(user_id, {}).get("rp", 0)
         # 根据人品值添加不同的表情
         rp_emoji = "💯" if user_rp >= 80 else "👍" if user_rp >= 60 else "😐" if user_rp >= 30 else "⚠️"
 
         # 构建更美观的回复
-        daily_limit = self.config.get('shop_settings', {}).get('daily_purchase_limit', 10)
+        daily_limit = self.settings.shop.daily_purchase_limit
         remaining = self.shop_data.get('remaining_purchases', 0)
         
-        # 使用不同的分隔线和表情符号增强视觉效果
         reply = (
-            "\n📦 今日商店 📦\n"
-            "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀\n"
-            f"{'\n'.join(shop_items_str)}\n"
-            f"   🎟️ 抽奖券 - {draw_ticket_price}\n"
-            "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀\n"
+            f"{shop_panel}\n"
             f"🎯 剩余属性总购买次数: {remaining}/{daily_limit}\n"
             f"😉 你的人品值: {user_rp} {rp_emoji}\n"
             "💡 提示: 先到先得，机不可失失不再来~"
@@ -513,6 +1014,7 @@ class DailyCheckinPlugin(Star):
 
 
     @filter.command("购买", alias={'buy'})
+    @throttle.guard_command(throttle.MUTATING)
     async def buy_item(self, event: AstrMessageEvent, item_name: str, quantity: int = 1):
         """在商店中消耗人品购买属性或抽奖券。"""
         user_id = event.get_sender_id()
@@ -543,6 +1045,9 @@ class DailyCheckinPlugin(Star):
                     else:
                         user['rp'] -= total_cost
                         user['resources']['draw_tickets'] += quantity
+                        self._mark_dirty(user_id)
+                        self._record_flow(user_id, "buy", "rp", -total_cost)
+                        self._record_flow(user_id, "buy", "draw_tickets", quantity)
                         reply_message = (
                             f"\n✨ 购买成功啦！ ✨\n"
                             f"❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀\n"
@@ -574,10 +1079,12 @@ class DailyCheckinPlugin(Star):
                             else:
                                 shop['remaining_purchases'] -= quantity
                                 user['rp'] -= total_cost
-                                attribute_increment = self.config.get("shop_settings", {}).get("attribute_increment", 0.1)
+                                attribute_increment = self.settings.shop.attribute_increment
                                 total_increment = attribute_increment * quantity
                                 user['attributes'][internal_attr_key] = round(user['attributes'][internal_attr_key] + total_increment, 1)
                                 new_attribute_value = user['attributes'][internal_attr_key]
+                                self._mark_dirty(user_id)
+                                self._record_flow(user_id, "buy", "rp", -total_cost)
                                 reply_message = (
                                     f"\n✨ 购买成功啦！ ✨\n"
                                     f"❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀\n"
@@ -598,6 +1105,7 @@ class DailyCheckinPlugin(Star):
 
 
     @filter.command("抽奖", alias={'draw'})
+    @throttle.guard_command(throttle.MUTATING)
     async def draw_lottery(self, event: AstrMessageEvent, quantity: int = 1):
         """消耗抽奖券进行抽奖，支持批量。"""
         user_id = event.get_sender_id()
@@ -617,6 +1125,8 @@ class DailyCheckinPlugin(Star):
                 return
 
             user['resources']['draw_tickets'] -= quantity
+            self._mark_dirty(user_id)
+            self._record_flow(user_id, "draw", "draw_tickets", -quantity)
 
             # [核心修正] 初始化 results 字典，用于存放所有类型的奖励
             results = {
@@ -638,16 +1148,18 @@ class DailyCheckinPlugin(Star):
                     rp_gain = random.randint(chosen_reward[1], chosen_reward[2])
                     user['rp'] += rp_gain
                     results['rp'] += rp_gain
+                    self.economy_stats.record_lottery("rp")
 
                 elif reward_type == "stone":
                     stone_gain = chosen_reward[1]
                     user['resources']['enhancement_stones'] += stone_gain
                     results['stone'] += stone_gain
+                    self.economy_stats.record_lottery("stone")
 
                 elif reward_type == "equipment":
                     # [核心修正] 将装备获取结果存入 results 字典，而不是临时变量
                     all_possible_items = [(cls, slt) for cls, slts in self.equipment_presets.items() for slt in slts.keys()]
-                    user_owned_items = set((cls, slt) for cls, slts in user.get("equipment_sets", {}).items() for slt in slts.keys())
+                    user_owned_items = set((cls, slt) for cls, slts in user["equipment_sets"].items() for slt in slts.keys())
                     unowned_items = [item for item in all_possible_items if item not in user_owned_items]
 
                     if not unowned_items:
@@ -655,14 +1167,19 @@ class DailyCheckinPlugin(Star):
                         chosen_attr = random.choice(attr_keys)
                         user['attributes'][chosen_attr] = round(user['attributes'][chosen_attr] + 0.5, 1)
                         results['attribute_bonus'].append(f"⭐ 随机属性点: {chosen_attr.capitalize()} +0.5")
+                        self.economy_stats.record_lottery("attribute")
                     else:
-                        active_class = user.get("active_class", "均衡使者")
+                        active_class = user["active_class"]
                         preferred_unowned = [item for item in unowned_items if item[0] == active_class]
                         target_pool = preferred_unowned if random.random() < 0.5 and preferred_unowned else unowned_items
                         chosen_class, chosen_slot = random.choice(target_pool)
                         user['equipment_sets'][chosen_class][chosen_slot] = {"grade": "凡品", "success_count": 0}
                         item_name = self.equipment_presets[chosen_class][chosen_slot]["names"]["凡品"]
                         results['equipment'].append(f"🎊 【{item_name}】({chosen_class})")
+                        self.economy_stats.record_lottery("equipment")
+
+            self._record_flow(user_id, "draw", "rp", results['rp'])
+            self._record_flow(user_id, "draw", "enhancement_stones", results['stone'])
 
             # --- [核心修正] 构建能展示所有奖励的最终报告 ---
             summary_lines = [f"\n✧⋆✦❃ 抽奖 {quantity} 次 报告 ❃✦⋆✧"]
@@ -688,6 +1205,7 @@ class DailyCheckinPlugin(Star):
         yield event.plain_result(reply_msg)
 
     @filter.command("强化", alias={'enhance'})
+    @throttle.guard_command(throttle.MUTATING)
     async def enhance_item(self, event: AstrMessageEvent, slot_name: str):
         """消耗资源强化当前职业的指定槽位装备。"""
         user_id = event.get_sender_id()
@@ -729,9 +1247,13 @@ class DailyCheckinPlugin(Star):
             # 5. 扣除资源 (无论成功失败都扣)
             user['resources']['enhancement_stones'] -= costs['stones']
             user['rp'] -= costs['rp']
+            self._mark_dirty(user_id)
+            self._record_flow(user_id, "enhance", "enhancement_stones", -costs['stones'])
+            self._record_flow(user_id, "enhance", "rp", -costs['rp'])
 
             # 6. 进行强化判定
             roll = random.random()
+            self.economy_stats.record_enhance(item_info['grade'], roll <= success_rate)
             if roll <= success_rate:
                 # --- 强化成功 ---
                 item_info['success_count'] += 1
@@ -770,7 +1292,114 @@ class DailyCheckinPlugin(Star):
         await self._save_data()
         yield event.plain_result(reply_msg)
 
+    @filter.command("强化推荐", alias={'enhance_advice'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def enhance_advice(self, event: AstrMessageEvent):
+        """按 “每单位人品带来的能级提升” 给当前职业的各件装备排序，推荐下一次该强化哪个槽位。"""
+        user_id = event.get_sender_id()
+        slot_names = {"weapon": "武器", "head": "头盔", "chest": "胸甲", "legs": "腿甲", "feet": "脚部"}
+
+        async with self.data_lock:
+            user = self.user_data.get(user_id)
+            if not user:
+                yield event.plain_result("你还没有角色呢，请先使用 /jrrp 创建角色喵！")
+                return
+            active_class = user["active_class"]
+            equipped = user["equipment_sets"][active_class]
+            if not equipped:
+                yield event.plain_result(f"你当前职业【{active_class}】还没有任何装备喵，快去抽奖获取吧(●'◡'●)！")
+                return
+
+            # 当前总加成查表得到，每个候选只需叠加一次预计算的增量再重算五维与衍生属性
+            base_attrs = user["attributes"]
+            formula = self.settings.stats_config["level_formula"]
+            total_bonus = utils.total_bonus_from_table(self.item_stat_table, active_class, equipped)
+            current = utils.evaluate_stats(base_attrs, total_bonus, formula)
+
+            options = []
+            for slot, item_info in equipped.items():
+                grade, level = item_info.get("grade", "凡品"), item_info.get("success_count", 0)
+                deltas = self.item_delta_table.get((active_class, slot, grade))
+                if not deltas:
+                    continue
+                after_bonus = dict(total_bonus)
+                for stat, value in deltas[min(level, len(deltas) - 1)].items():
+                    after_bonus[stat] = after_bonus.get(stat, 0) + value
+                after = utils.evaluate_stats(base_attrs, after_bonus, formula)
+
+                # 失败也会扣除资源，期望消耗 = 单次消耗 / 成功率
+                costs = utils.get_enhancement_costs(level)
+                success_rate = utils.calculate_success_rate(level)
+                expected_rp = costs["rp"] / success_rate
+                energy_gain = after["energy"] - current["energy"]
+                options.append({
+                    "slot": slot_names.get(slot, slot), "grade": grade, "level": level, "success_rate": success_rate,
+                    "expected_rp": expected_rp, "expected_stones": costs["stones"] / success_rate,
+                    "energy_gain": energy_gain, "gain_per_100rp": energy_gain / expected_rp * 100,
+                    "stat_gains": {key: after["derived"][key] - current["derived"][key] for key in ("HP", "ATK", "DEF", "SPD")},
+                })
+
+        options.sort(key=lambda o: o["gain_per_100rp"], reverse=True)
+        lines = [f"\n--- 🔨 强化推荐【{active_class}】(当前能级 {current['energy']:.2f}) 🔨 ---"]
+        for i, o in enumerate(options, start=1):
+            stat_gains = " ".join(f"{key} {value:+.1f}" for key, value in o["stat_gains"].items())
+            lines.append(
+                f"{i}. {o['slot']} [{o['grade']}+{o['level']}] 成功率 {o['success_rate']:.1%}\n"
+                f"   能级 {o['energy_gain']:+.2f} | {stat_gains}\n"
+                f"   期望消耗: 人品 {o['expected_rp']:.0f} / 强化石 {o['expected_stones']:.1f} → 每100人品能级 {o['gain_per_100rp']:+.3f}"
+            )
+        if options:
+            lines.append(f"💡 性价比最高: /强化 {options[0]['slot']}")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("职业对比", alias={'class_compare'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def compare_classes(self, event: AstrMessageEvent):
+        """并排对比玩家在全部职业下的最终属性和能级，无需切换职业。"""
+        user_id = event.get_sender_id()
+
+        async with self.data_lock:
+            user = self.user_data.get(user_id)
+            if not user:
+                yield event.plain_result("你还没有角色呢，请先使用 /jrrp 创建角色喵！")
+                return
+            active_class = user["active_class"]
+            class_names = list(dict.fromkeys(self.CLASS_MAP.values()))
+            results = utils.evaluate_classes(
+                user["attributes"], self.item_stat_table, class_names,
+                user["equipment_sets"], self.settings.stats_config["level_formula"],
+            )
+
+        # (属性键, 中文名, 是否为纯百分比)
+        attr_map = [
+            ("HP", "生命值", False), ("ATK", "攻击力", False), ("DEF", "防御力", False), ("SPD", "速度", False),
+            ("HIT", "命中率", True), ("EVD", "闪避率", True), ("CRIT", "暴击率", True), ("CRIT_MUL", "暴击倍率", True),
+            ("BLK", "格挡率", True), ("BLK_MUL", "格挡减伤", True),
+        ]
+        core_map = [("S", "力量"), ("A", "敏捷"), ("T", "体力"), ("I", "智力"), ("C", "魅力")]
+
+        lines = ["\n--- ⚖️ 职业对比 ⚖️ ---"]
+        lines.append("职业: " + " | ".join(f"{'★' if name == active_class else ''}{name}" for name in class_names))
+        lines.append("❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀")
+        for key, name in core_map:
+            lines.append(f"{name}: " + " | ".join(f"{results[c]['core'][key]:.1f}" for c in class_names))
+        lines.append("❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀")
+        for key, name, is_pure_percent in attr_map:
+            if is_pure_percent:
+                values = [f"{results[c]['derived'][key]:.2%}" for c in class_names]
+            else:
+                values = [str(int(results[c]['derived'][key])) if key == "HP" else f"{results[c]['derived'][key]:.1f}" for c in class_names]
+            lines.append(f"{name}: " + " | ".join(values))
+        lines.append("❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀")
+        lines.append("能级: " + " | ".join(
+            f"{results[c]['energy']:.2f}({self.settings.ranks.rank_of(results[c]['energy'])})" for c in class_names
+        ))
+        best = max(class_names, key=lambda c: results[c]["energy"])
+        lines.append(f"💡 能级最高的职业: {best}" + ("（当前职业）" if best == active_class else f"，可使用 /切换职业 {best}"))
+        yield event.plain_result("\n".join(lines))
+
     @filter.command("PVP", alias={'挑战'})
+    @throttle.guard_command(throttle.MUTATING)
     async def pvp_challenge(self, event: AstrMessageEvent, target_nickname: str):
         """向指定昵称的玩家发起挑战。"""
         challenger_id = event.get_sender_id()
@@ -787,54 +1416,845 @@ class DailyCheckinPlugin(Star):
                 yield event.plain_result("不能挑战自己哦喵！")
                 return
 
-            defender_id = None
-            defender_data = None
-            for uid, udata in self.user_data.items():
-                if udata.get("nickname") == target_nickname:
-                    defender_id = uid
-                    defender_data = udata
+            defender_id = self.nickname_index.lookup(target_nickname)
+            defender_data = self.user_data.get(defender_id) if defender_id else None
+            if not defender_data:
+                yield event.plain_result(self._nickname_not_found(target_nickname, exclude=challenger_id))
+                return
+
+            reply = self._run_pvp(challenger_id, challenger_nickname, defender_id, target_nickname)
+
+        await self._save_data() # 天梯积分与战绩已变更，立即保存
+        yield event.plain_result(reply)
+
+    @filter.command("匹配", alias={'match'})
+    @throttle.guard_command(throttle.MUTATING)
+    async def pvp_matchmaking(self, event: AstrMessageEvent):
+        """在能级相近的玩家中随机匹配一名对手并发起挑战。"""
+        challenger_id = event.get_sender_id()
+
+        async with self.data_lock:
+            challenger_data = self.user_data.get(challenger_id)
+            if not challenger_data or not challenger_data.get("nickname"):
+                yield event.plain_result("你还没有设置昵称喵！请先使用 `/设置昵称` 来打响你的名号！")
+                return
+
+            # 能级索引由后台任务分批同步，这里只重算挑战者本人，随后在能级区间内二分查找并随机抽取
+            energy = self.energy_index.refresh(challenger_id, self._energy_score)
+            cfg_match = self.settings.matchmaking
+            band = max(energy * cfg_match.energy_band_ratio, cfg_match.min_energy_band)
+            match = None
+            for _ in range(MATCH_ATTEMPTS):
+                candidate = self.energy_index.random_in_range(energy - band, energy + band, exclude=challenger_id)
+                if not candidate:
+                    break
+                # 抽到的对手可能在上次同步后有变动，重算其分值确认仍在区间内
+                score = self.energy_index.refresh(candidate[1], self._energy_score)
+                if score is not None and energy - band <= score <= energy + band:
+                    match = (score, candidate[1])
                     break
+            if not match:
+                yield event.plain_result(f"暂时没有能级在 {energy - band:.2f} ~ {energy + band:.2f} 之间的对手喵，晚点再来试试吧~")
+                return
 
-            if not defender_data:
-                yield event.plain_result(f"找不到名为 “{target_nickname}” 的玩家，是不是打错了喵？")
+            defender_energy, defender_id = match
+            defender_nickname = self.user_data[defender_id]["nickname"]
+            reply = self._run_pvp(challenger_id, challenger_data["nickname"], defender_id, defender_nickname)
+
+        await self._save_data() # 天梯积分与战绩已变更，立即保存
+        yield event.plain_result(f"\n🎯 匹配成功！对手【{defender_nickname}】(能级 {defender_energy:.2f}，你的能级 {energy:.2f})" + reply)
+
+    def _run_pvp(self, challenger_id: str, challenger_nickname: str, defender_id: str, defender_nickname: str) -> str:
+        """
+        进行一场PVP对战并记录战报，返回战斗摘要。
+        需在持有 data_lock 时调用。
+        """
+        # 1. 为双方生成战斗属性
+        challenger_stats = dict(self._get_player_stats(challenger_id))
+        challenger_stats['name'] = challenger_nickname # 添加名字用于日志
+
+        defender_stats = dict(self._get_player_stats(defender_id))
+        defender_stats['name'] = defender_nickname
+
+        # 2. 使用可复现的随机种子调用战斗模拟器，只保存种子和属性快照
+        seed = replay.new_seed()
+        winner_name, _battle_log, damage_report = replay.run_battle(challenger_stats, defender_stats, seed)
+        replay_id = self.replay_store.add([challenger_id, defender_id], "pvp", seed, challenger_stats, defender_stats, winner_name)
+
+        # 3. 结算天梯积分并写入双方的战绩缓冲区
+        cfg_pvp = self.settings.pvp
+        challenger_record = self.user_data[challenger_id].setdefault("pvp", pvp_rating.new_record(cfg_pvp.initial_rating))
+        defender_record = self.user_data[defender_id].setdefault("pvp", pvp_rating.new_record(cfg_pvp.initial_rating))
+        if winner_name == "平局":
+            result = pvp_rating.RESULT_DRAW
+        else:
+            result = pvp_rating.RESULT_WIN if winner_name == challenger_nickname else pvp_rating.RESULT_LOSS
+        delta_c, delta_d = pvp_rating.apply_result(
+            challenger_record, defender_record, challenger_id, defender_id, result, cfg_pvp.k_factor, cfg_pvp.history_size
+        )
+        for uid, record in ((challenger_id, challenger_record), (defender_id, defender_record)):
+            self.rating_index.update(uid, record["rating"])
+            self._mark_dirty(uid)
+        if self.shared_store:
+            # 双方的积分变化要么一起提交，要么因冲突一起放弃
+            self.shared_store.link(challenger_id, defender_id)
+
+        # 4. 返回战斗摘要，完整战报按需通过 /战报 重新生成
+        return (
+            self._format_battle_summary(replay_id, challenger_nickname, defender_nickname, winner_name, damage_report)
+            + f"\n🏆 天梯积分: {challenger_nickname} {challenger_record['rating']:.0f} ({delta_c:+d}) / "
+            f"{defender_nickname} {defender_record['rating']:.0f} ({delta_d:+d})"
+        )
+
+    def _format_battle_summary(self, replay_id: str, p1_name: str, p2_name: str, winner_name: str, damage_report: Dict) -> str:
+        """生成简短的战斗摘要，替代直接发送完整战斗日志。"""
+        winner_line = "🤝 双方平局！" if winner_name == "平局" else f"👑 胜者: 【{winner_name}】"
+        return (
+            f"\n⚔️ 【{p1_name}】 vs 【{p2_name}】\n"
+            f"{winner_line}\n"
+            f"💥 造成伤害: {p1_name} {int(damage_report.get(p1_name, 0))} / {p2_name} {int(damage_report.get(p2_name, 0))}\n"
+            f"📜 完整战报: /战报 {replay_id}"
+        )
+
+    @filter.command("战绩", alias={'pvp_record'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_pvp_record(self, event: AstrMessageEvent, target_nickname: str = ""):
+        """查看自己（或指定昵称玩家）的天梯积分、胜率和近期战绩。"""
+        async with self.data_lock:
+            if target_nickname:
+                user_id = self.nickname_index.lookup(target_nickname)
+                if not user_id:
+                    yield event.plain_result(self._nickname_not_found(target_nickname))
+                    return
+            else:
+                user_id = event.get_sender_id()
+
+            user = self.user_data.get(user_id)
+            record = user.get("pvp") if user else None
+            if not record or not pvp_rating.games_played(record):
+                yield event.plain_result("还没有任何PVP战绩喵~ 使用 /匹配 或 /PVP 打一场吧！")
+                return
+
+            nickname = user["nickname"] or f"玩家{user_id[-4:]}"
+            played = pvp_rating.games_played(record)
+            recent = pvp_rating.recent_history(record)
+            result_cn = {pvp_rating.RESULT_WIN: "胜", pvp_rating.RESULT_LOSS: "负", pvp_rating.RESULT_DRAW: "平"}
+            lines = [
+                f"\n--- 🏆 {nickname} 的PVP战绩 🏆 ---",
+                f"天梯积分: {record['rating']:.0f} (第 {self.rating_index.rank_of(user_id)}/{len(self.rating_index)} 名)",
+                f"战绩: {record['wins']}胜 {record['losses']}负 {record['draws']}平 | 胜率: {record['wins'] / played:.1%}",
+                f"近期状态: {''.join(result_cn[entry[1]] for entry in recent)}",
+                "--- 最近对局 ---",
+            ]
+            for opponent_id, result, delta, ts in recent:
+                opponent = self.user_data.get(opponent_id, {}).get("nickname") or f"玩家{opponent_id[-4:]}"
+                when = datetime.fromtimestamp(ts).strftime("%m-%d %H:%M")
+                lines.append(f"{when} vs {opponent} {result_cn[result]} ({delta:+d})")
+
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("天梯", alias={'ladder'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_ladder(self, event: AstrMessageEvent, page: int = 1):
+        """按天梯积分从高到低分页显示排行榜。"""
+        page_size = self.settings.pvp.ladder_page_size
+        async with self.data_lock:
+            total = len(self.rating_index)
+            if not total:
+                yield event.plain_result("天梯上还没有任何玩家喵~ 使用 /匹配 或 /PVP 打响第一战吧！")
+                return
+            total_pages = (total + page_size - 1) // page_size
+            page = max(1, page)
+            if page > total_pages:
+                yield event.plain_result(f"页码超出范围啦，一共只有 {total_pages} 页喵~")
                 return
 
-            # 2. 为双方生成战斗属性
-            challenger_stats = utils.get_detailed_player_stats(challenger_data, self.equipment_presets, self.game_constants, self.config)
-            challenger_stats['name'] = challenger_nickname # 添加名字用于日志
+            start = (page - 1) * page_size
+            lines = [f"\n--- 🏆 PVP 天梯 (共{total}人) 🏆 ---"]
+            for rank, (rating, uid) in enumerate(self.rating_index.descending_slice(start, page_size), start=start + 1):
+                user = self.user_data.get(uid, {})
+                record = user.get("pvp", {})
+                nickname = user.get("nickname") or f"玩家{uid[-4:]}"
+                lines.append(f"No.{rank} {nickname} - {rating:.0f} ({record.get('wins', 0)}胜{record.get('losses', 0)}负{record.get('draws', 0)}平)")
+            lines.append(f"--- 第 {page}/{total_pages} 页 ---")
+
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("战报", alias={'replay'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_replay(self, event: AstrMessageEvent, replay_id: str = ""):
+        """按编号重新生成完整战报；不带编号时列出自己最近的战报。"""
+        user_id = event.get_sender_id()
 
-            defender_stats = utils.get_detailed_player_stats(defender_data, self.equipment_presets, self.game_constants, self.config)
-            defender_stats['name'] = target_nickname
+        if not replay_id:
+            entries = self.replay_store.list_for_user(user_id)
+            if not entries:
+                yield event.plain_result("你还没有任何战报记录喵~ 去 /PVP 或 /PVE 打一场吧！")
+                return
+            lines = ["\n--- 📜 我的最近战报 📜 ---"]
+            for rid, record in entries:
+                kind = "PVP" if record["kind"] == "pvp" else "PVE"
+                fought_at = datetime.fromtimestamp(record["time"]).strftime("%m-%d %H:%M")
+                lines.append(f"[{rid}] {kind} {record['p1'][0]} vs {record['p2'][0]} → {record['winner']} ({fought_at})")
+            lines.append("💡 使用 /战报 [编号] 查看完整战斗过程")
+            yield event.plain_result("\n".join(lines))
+            return
 
-            # 3. 调用战斗模拟器
-            winner_name, battle_log, _damage_report = battle.simulate_battle(challenger_stats, defender_stats)
+        record = self.replay_store.get(replay_id)
+        if not record:
+            yield event.plain_result(f"找不到编号为 “{replay_id}” 的战报，可能已经过期了喵~")
+            return
 
-            # 4. 发送战报
-            yield event.plain_result(battle_log)
+        _winner_name, battle_log, _damage_report = self.replay_store.regenerate(record)
+        yield event.plain_result(battle_log)
 
     @filter.command("显示昵称", alias={'昵称列表'})
-    async def show_all_nicknames(self, event: AstrMessageEvent):
-        """显示所有已设置昵称的玩家列表。"""
-        nicknames = []
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_all_nicknames(self, event: AstrMessageEvent, page_or_action: str = "1", prefix: str = "", search_page: int = 1):
+        """
+        分页显示已设置昵称的玩家列表，或按昵称前缀搜索。
+        用法: /显示昵称 [页码]  或  /显示昵称 搜索 [前缀] [可选: 页码]
+        """
+        cfg_sys = self.settings.system
+        page_size = cfg_sys.nickname_page_size
+
+        async with self.data_lock:
+            index = self.nickname_index
+            if page_or_action in ("搜索", "search"):
+                if not prefix:
+                    yield event.plain_result("请输入要搜索的昵称前缀喵！例如：/显示昵称 搜索 小")
+                    return
+                page = max(1, search_page)
+                total, entries = index.prefix_page(prefix, page, page_size)
+                if not total:
+                    yield event.plain_result(f"没有找到以 “{prefix}” 开头的昵称喵~")
+                    return
+                title = f"\n--- 🔍 以 “{prefix}” 开头的昵称 (共{total}人) ---"
+            else:
+                try:
+                    page = max(1, int(page_or_action))
+                except ValueError:
+                    yield event.plain_result("页码需要是数字喵！用法：/显示昵称 [页码] 或 /显示昵称 搜索 [前缀]")
+                    return
+                total = len(index.sorted_names)
+                if not total:
+                    yield event.plain_result("目前还没有玩家设置昵称哦~")
+                    return
+                entries = index.page(page, page_size)
+                title = f"\n--- 📝 玩家昵称列表 (共{total}人) 📝 ---"
+
+            total_pages = (total + page_size - 1) // page_size
+            if not entries:
+                yield event.plain_result(f"页码超出范围啦，一共只有 {total_pages} 页喵~")
+                return
+
+            # 职业和能级段位只为当前页的玩家读取（带缓存）
+            show_stats = cfg_sys.nickname_list_show_stats
+            offset = (page - 1) * page_size
+            formatted_list = []
+            for i, (name, uid) in enumerate(entries, start=offset + 1):
+                if show_stats and uid in self.user_data:
+                    rank = self._get_player_stats(uid)['energy_level']['rank']
+                    formatted_list.append(f"{i}. {name} [{self.user_data[uid]['active_class']} | {rank}]")
+                else:
+                    formatted_list.append(f"{i}. {name}")
+
+        reply_message = f"{title}\n" + "\n".join(formatted_list) + f"\n--- 第 {page}/{total_pages} 页 ---"
+        yield event.plain_result(reply_message)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("数据概览", alias={'dashboard'})
+    async def show_dashboard(self, event: AstrMessageEvent):
+        """[管理员] 查看全服活跃度与经济概览，数据由各变更路径增量维护。"""
+        async with self.data_lock:
+            stats = self.economy_stats
+            # 有变动的玩家由后台任务分批计算，这里最多补算少量刚变动的玩家，查询开销与玩家总数无关
+            pending = stats.flush(self._economy_snapshot, limit=DASHBOARD_FLUSH_LIMIT)
+
+            today = date.today().isoformat()
+            yesterday = (date.today() - timedelta(days=1)).isoformat()
+            today_stats = stats.daily.get(today, economy_stats.empty_day())
+            yesterday_stats = stats.daily.get(yesterday, economy_stats.empty_day())
+            player_count = stats.player_count
+            rp_total, stones_total, tickets_total, energy_total = stats.totals
+            avg_energy = energy_total / player_count if player_count else 0
+
+            resource_names = {"rp": "💰 人品", "enhancement_stones": "💎 强化石", "draw_tickets": "🎟️ 抽奖券"}
+            lines = [
+                "\n--- 📊 数据概览 📊 ---",
+                f"👥 玩家总数: {player_count}",
+                f"📅 今日签到: {today_stats['check_ins']} (新玩家 {today_stats['new_players']}) | 昨日: {yesterday_stats['check_ins']}",
+                f"💰 人品存量: {int(rp_total)}",
+                f"💎 强化石存量: {int(stones_total)}",
+                f"🎟️ 抽奖券存量: {int(tickets_total)}",
+                f"🔮 平均能级: {avg_energy:.2f}",
+            ]
+            if pending:
+                lines.append(f"⏳ 另有 {pending} 名玩家的存量数据正在后台更新")
+            lines.append("--- 💹 今日资源流水 (产出/消耗) ---")
+            for key, name in resource_names.items():
+                lines.append(f"{name}: +{int(today_stats['minted'].get(key, 0))} / -{int(today_stats['burned'].get(key, 0))}")
+
+            lines.append("--- 💹 累计资源流水 (产出/消耗) ---")
+            for key, name in resource_names.items():
+                lines.append(f"{name}: +{int(stats.minted.get(key, 0))} / -{int(stats.burned.get(key, 0))}")
+
+            lines.append("--- 🔨 强化统计 ---")
+            for grade in self.game_constants.get("grade_info", {}):
+                attempts, successes = stats.enhance.get(grade, [0, 0])
+                if attempts:
+                    lines.append(f"{grade}: 尝试 {attempts} 次, 成功率 {successes / attempts:.1%}")
+
+            lottery_total = sum(stats.lottery.values())
+            if lottery_total:
+                lottery_names = {"rp": "人品", "stone": "强化石", "equipment": "装备", "attribute": "属性点"}
+                lines.append(f"--- 🎰 抽奖结果分布 (共{lottery_total}次) ---")
+                lines.append(", ".join(f"{lottery_names.get(k, k)} {v / lottery_total:.1%}" for k, v in stats.lottery.items()))
+
+            counters = self.command_guard.counters
+            lines.append("--- 🛡️ 指令防刷 ---")
+            lines.append(f"合并: {counters['coalesced']} | 丢弃: {counters['dropped']} (其中限流 {counters['throttled']})")
+            if self.shared_store:
+                shared = self.shared_store.counters
+                lines.append("--- 🔗 共享存储 ---")
+                lines.append(f"提交: {shared['commits']} | 载入其他实例变更: {shared['reloaded']} | 冲突放弃: {shared['conflicts']}")
+
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("能级分布", alias={'energy_stats'})
+    async def show_energy_distribution(self, event: AstrMessageEvent, min_rank: str = ""):
+        """
+        [管理员] 查看全服能级段位分布与职业人数。
+        用法: /能级分布 [可选: 段位]，指定段位时额外列出达到该段位及以上的玩家。
+        """
+        async with self.data_lock:
+            mirror = self.population
+            mirror.sync(self.user_data)
+            levels = mirror.energy_levels(self.settings.stats_config["level_formula"])
+            rank_idx, rank_names = mirror.rank_indices(levels, self.settings.ranks)
+            class_counts = mirror.class_counts()
+
+            summary = mirror.level_summary(levels)
+            lines = [f"\n--- 🔮 能级分布 (共{mirror.player_count}人) 🔮 ---"]
+            if summary:
+                lines.append(f"平均: {summary[0]:.2f} | 中位数: {summary[1]:.2f} | 最高: {summary[2]:.2f}")
+
+            counts = mirror.rank_counts(rank_idx, len(rank_names))
+            for i in range(len(rank_names) - 1, -1, -1):
+                lines.append(f"{rank_names[i]}: {counts[i + 1]} 人")
+            if counts[0]:
+                lines.append(f"F: {counts[0]} 人")
+
+            lines.append("--- ⚜️ 职业人数 ---")
+            lines.extend(f"{name}: {count} 人" for name, count in class_counts.items())
+
+            if min_rank:
+                if min_rank not in rank_names:
+                    lines.append(f"❌ 未知的段位 “{min_rank}”，可选: {', '.join(reversed(rank_names))}")
+                else:
+                    selected = mirror.rows_at_or_above(rank_idx, rank_names.index(min_rank), levels)
+                    lines.append(f"--- 🏅 {min_rank} 及以上: {len(selected)} 人 ---")
+                    for row in selected[:20]:
+                        uid = mirror.user_id_at(row)
+                        nickname = self.user_data.get(uid, {}).get("nickname") or f"玩家{uid[-4:]}"
+                        lines.append(f"{nickname} - {levels[row]:.2f}")
+
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("账本", alias={'ledger'})
+    async def show_ledger(self, event: AstrMessageEvent, target_nickname: str, resource_name: str = ""):
+        """
+        [管理员] 查看指定玩家的资源流水与余额变化。
+        用法: /账本 [昵称] [可选: 人品/强化石/抽奖券]
+        """
+        resource_map = {"人品": "rp", "强化石": "enhancement_stones", "抽奖券": "draw_tickets"}
+        resource = resource_map.get(resource_name) if resource_name else None
+        if resource_name and not resource:
+            yield event.plain_result(f"未知的资源类型 “{resource_name}”，可选: {', '.join(resource_map.keys())}")
+            return
+
+        async with self.data_lock:
+            target_id = self.nickname_index.lookup(target_nickname)
+            if not target_id:
+                yield event.plain_result(self._nickname_not_found(target_nickname))
+                return
+
+        # 读取账本文件是磁盘 I/O，放到线程池中执行
+        loop = asyncio.get_running_loop()
+        history = await loop.run_in_executor(None, self.ledger.balance_history, target_id, resource)
+        if not history:
+            yield event.plain_result(f"玩家 “{target_nickname}” 暂无流水记录。")
+            return
+
+        resource_cn = {v: k for k, v in resource_map.items()}
+        lines = [f"\n--- 📒 {target_nickname} 的资源流水 (最近15条 / 共{len(history)}条) 📒 ---"]
+        for ts, source, res, delta, balance in history[-15:]:
+            when = datetime.fromtimestamp(ts).strftime("%m-%d %H:%M")
+            lines.append(f"{when} [{source}] {resource_cn.get(res, res)} {delta:+g} → {balance:g}")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("备份", alias={'backup'})
+    async def make_backup(self, event: AstrMessageEvent, mode: str = ""):
+        """
+        [管理员] 立即备份一次数据。
+        用法: /备份 [可选: 全量]，默认只备份自上次备份以来发生变更的玩家。
+        """
+        try:
+            point = await self._run_backup(full=mode in ("全量", "full"))
+        except Exception as e:
+            logger.error(f"手动备份时发生错误: {e}")
+            yield event.plain_result(f"备份失败了喵: {e}")
+            return
+        yield event.plain_result(f"备份完成喵！恢复点编号: {point}")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("备份列表", alias={'backups'})
+    async def list_backups(self, event: AstrMessageEvent):
+        """[管理员] 列出所有可用的恢复点。"""
+        points = self.backup.list_points()
+        if not points:
+            yield event.plain_result("目前还没有任何备份喵~")
+            return
+        lines = [f"\n--- 💾 恢复点列表 (最近20个 / 共{len(points)}个) 💾 ---"]
+        for point, ts, size, is_base in points[-20:]:
+            kind = "全量" if is_base else "增量"
+            lines.append(f"{point} | {datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')} | {kind} | {size / 1024:.1f}KB")
+        lines.append("使用 /恢复备份 [恢复点编号] 回滚到对应时间点")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("恢复备份", alias={'restore'})
+    async def restore_backup(self, event: AstrMessageEvent, point: str):
+        """
+        [管理员] 将玩家、商店和活动数据回滚到指定恢复点。
+        恢复前会先对当前数据做一次全量备份，误操作时可以再恢复回来。
+        """
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, self.backup.restore, point)
+        if state is None:
+            yield event.plain_result(f"找不到恢复点 “{point}” 喵，请使用 /备份列表 查看可用的恢复点。")
+            return
+
+        try:
+            safety_point = await self._run_backup(full=True)
+        except Exception as e:
+            logger.error(f"恢复备份前备份当前数据时发生错误: {e}")
+            yield event.plain_result(f"恢复前备份当前数据失败，已取消恢复喵: {e}")
+            return
         async with self.data_lock:
-            # 遍历所有用户数据，收集已设置的昵称
+            if self.shared_store:
+                # 先载入其他实例已提交的改动，恢复写入的版本才不会因修订号落后而被当作冲突放弃
+                self._shared_sync()
+            affected = set(self.user_data) | set(state["users"])
+            self.user_data = state["users"]
             for user in self.user_data.values():
-                nickname = user.get("nickname")
-                if nickname: # 确保昵称不为None或空字符串
-                    nicknames.append(nickname)
+                schema.upgrade(user, self.record_class_names)
+            self.shop_data = state["shop"]
+            self.active_event = state["event"]
+            for user_id in affected:
+                self.record_versions[user_id] = self.record_versions.get(user_id, 0) + 1
+            self._rebuild_indexes(affected)
+            self.render_cache.clear()
+            self.stats_cache.clear()
+            self.command_guard.reply_cache.clear()
+            self.shop_version += 1
+            # 恢复后的数据与最新备份链不再连续，下次备份需新开一条链
+            self.backup.force_base = True
+            if self.shared_store:
+                # 恢复点中没有的玩家也要提交，以墓碑的形式让其他实例一并删除
+                self.shared_store.dirty.update(affected)
+        await self._save_data()
+
+        restored_at = datetime.fromtimestamp(state["time"]).strftime("%Y-%m-%d %H:%M")
+        yield event.plain_result(
+            f"已恢复到 {point} ({restored_at}) 的数据喵，共 {len(self.user_data)} 名玩家。\n"
+            f"恢复前的数据已备份为 {safety_point}，如需撤销可使用 /恢复备份 {safety_point}"
+        )
 
-        if not nicknames:
-            yield event.plain_result("目前还没有玩家设置昵称哦~")
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("导出数据", alias={'export_data'})
+    async def export_players(self, event: AstrMessageEvent):
+        """
+        [管理员] 把全部玩家数据导出为 gzip 压缩的 JSONL 文件（每行一名玩家）。
+        每批玩家只在序列化时持有数据锁，压缩写盘在线程池中进行，导出期间其他指令照常响应。
+        """
+        if self.transfer_lock.locked():
+            yield event.plain_result("已有导出或导入任务正在进行，请稍后再试喵~")
+            return
+        try:
+            await self._wait_for_data()
+        except RuntimeError as e:
+            yield event.plain_result(f"❌ {e}")
             return
+        async with self.transfer_lock:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            writer = await loop.run_in_executor(None, transfer.ExportWriter, transfer.export_path(self.export_dir))
+            user_ids = list(self.user_data)
+            try:
+                for start in range(0, len(user_ids), transfer.BATCH_SIZE):
+                    async with self.data_lock:
+                        chunk = transfer.serialize_batch(self.user_data, user_ids[start:start + transfer.BATCH_SIZE])
+                    await loop.run_in_executor(None, writer.write, chunk)
+                size = await loop.run_in_executor(None, writer.close)
+            except Exception as e:
+                await loop.run_in_executor(None, writer.abort)
+                logger.error(f"导出玩家数据时发生错误: {e}")
+                yield event.plain_result(f"导出失败了喵: {e}")
+                return
 
-        # 格式化输出
-        title = "\n--- 📝 玩家昵称列表 📝 ---"
-        # 使用 enumerate 创建带编号的列表
-        formatted_list = [f"{i+1}. {name}" for i, name in enumerate(nicknames)]
+        yield event.plain_result(
+            f"导出完成喵！共 {len(user_ids)} 名玩家，文件 {writer.path.name} ({size / 1024:.1f}KB)，"
+            f"用时 {time.perf_counter() - started:.1f} 秒。\n使用 /导入数据 {writer.path.name} 可导入到本插件。"
+        )
 
-        reply_message = f"{title}\n" + "\n".join(formatted_list)
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("导入数据", alias={'import_data'})
+    async def import_players(self, event: AstrMessageEvent, file_name: str = ""):
+        """
+        [管理员] 从导出目录中的 JSONL 文件导入玩家数据，同 ID 的玩家整条覆盖，其余玩家保持不变。
+        用法: /导入数据 [文件名]，不带参数时列出可用的文件。
+        记录逐批读取、迁移并校验后再在锁内写入；导入前会先做一次全量备份。
+        """
+        path = transfer.resolve_export(self.export_dir, file_name) if file_name else None
+        if path is None:
+            files = transfer.list_exports(self.export_dir)
+            if not files:
+                yield event.plain_result(f"导出目录 {self.export_dir} 中还没有任何文件喵~")
+                return
+            lines = ["\n--- 📦 可导入的文件 (最近10个) 📦 ---"] if not file_name else [f"\n找不到文件 “{file_name}” 喵，可导入的文件有："]
+            for name, ts, size in files[-10:]:
+                lines.append(f"{name} | {datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')} | {size / 1024:.1f}KB")
+            yield event.plain_result("\n".join(lines))
+            return
+        if self.transfer_lock.locked():
+            yield event.plain_result("已有导出或导入任务正在进行，请稍后再试喵~")
+            return
 
-        yield event.plain_result(reply_message)
+        async with self.transfer_lock:
+            try:
+                safety_point = await self._run_backup(full=True)
+            except Exception as e:
+                logger.error(f"导入数据前备份当前数据时发生错误: {e}")
+                yield event.plain_result(f"导入前备份当前数据失败，已取消导入喵: {e}")
+                return
+            loop = asyncio.get_running_loop()
+            reader = await loop.run_in_executor(None, transfer.ImportReader, path, self.record_class_names, tuple(self.game_constants.get("grade_info", {})))
+            created = updated = conflicts = 0
+            try:
+                while True:
+                    batch = await loop.run_in_executor(None, reader.next_batch)
+                    if not batch:
+                        break
+                    async with self.data_lock:
+                        for user_id, record in batch:
+                            nickname = record["nickname"]
+                            owner_id = self.nickname_index.lookup(nickname) if nickname else None
+                            if owner_id is not None and owner_id != user_id:
+                                conflicts += 1
+                                continue
+                            if user_id in self.user_data:
+                                updated += 1
+                            else:
+                                created += 1
+                            self.user_data[user_id] = record
+                            if nickname:
+                                self.nickname_index.set(user_id, nickname)
+                            else:
+                                self.nickname_index.remove(user_id)
+                            self.rating_index.update(user_id, record["pvp"]["rating"] if "pvp" in record else None)
+                            self._mark_dirty(user_id)
+            except Exception as e:
+                logger.error(f"导入玩家数据时发生错误: {e}")
+                yield event.plain_result(f"导入中途出错了喵: {e}\n已写入的玩家会保留，如需撤销可使用 /恢复备份 {safety_point}")
+                return
+            finally:
+                await loop.run_in_executor(None, reader.close)
+            if created or updated:
+                # 状态面板等按记录版本缓存，已随 _mark_dirty 失效；排行、昵称等跨玩家的短时回复缓存需整体清空
+                self.command_guard.reply_cache.clear()
+
+        await self._save_data()
+        lines = [
+            f"导入完成喵！新增 {created} 名、覆盖 {updated} 名玩家。",
+            f"昵称与其他玩家冲突而跳过: {conflicts} 条 | 校验未通过: {reader.rejected} 条",
+        ]
+        lines.extend(reader.errors)
+        lines.append(f"导入前的数据已备份为 {safety_point}，如需撤销可使用 /恢复备份 {safety_point}")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("批量发放", alias={'bulk_grant'})
+    async def bulk_grant(self, event: AstrMessageEvent):
+        """
+        [管理员] 向全体或按条件筛选的玩家批量发放资源或属性（例如故障补偿）。
+        筛选、审计与发放在一次持锁中完成，审计记录先于发放写入，之后只保存一次，每名玩家的资源变动记入账本。
+        """
+        try:
+            args_str = event.message_str.split(' ', 1)[1]
+        except IndexError:
+            args_str = ""
+        try:
+            request = grants.parse_request(args_str, self.CLASS_MAP, list(self.settings.ranks.names))
+        except ValueError as e:
+            yield event.plain_result(f"❌ {e}\n{grants.USAGE}")
+            return
+        # 尚未载入的玩家会被漏发，等玩家数据全部载入后再筛选
+        try:
+            await self._wait_for_data()
+        except RuntimeError as e:
+            yield event.plain_result(f"❌ {e}")
+            return
+
+        today = date.today()
+        async with self.data_lock:
+            in_band = None
+            if request.rank_band:
+                mirror = self.population
+                mirror.sync(self.user_data)
+                levels = mirror.energy_levels(self.settings.stats_config["level_formula"])
+                rank_idx, _ = mirror.rank_indices(levels, self.settings.ranks)
+                in_band = {mirror.user_id_at(row) for row in mirror.rows_in_rank_band(rank_idx, *request.rank_band)}
+            targets = [
+                user_id for user_id, user in self.user_data.items()
+                if (in_band is None or user_id in in_band) and grants.matches(user, request, today)
+            ]
+            # 先落审计记录再发放：审计写入失败时整次发放不生效，不会出现没有审计记录的发放
+            audit_error = None
+            if not request.dry_run and targets:
+                entry = {
+                    "time": int(time.time()), "operator": event.get_sender_id(), "reason": request.reason,
+                    "filter": request.describe(), "rewards": request.rewards, "user_ids": targets,
+                }
+                try:
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, grants.append_audit, self.grant_audit_path, entry)
+                except Exception as e:
+                    logger.error(f"写入批量发放审计记录失败，本次发放已取消: {e}")
+                    audit_error = e
+                else:
+                    for user_id in targets:
+                        grants.apply(self.user_data[user_id], request.rewards)
+                        for key, amount in request.rewards.items():
+                            if key in grants.RESOURCE_MAP.values():
+                                self._record_flow(user_id, grants.LEDGER_SOURCE, key, amount)
+                        self._mark_dirty(user_id)
+                    self.command_guard.reply_cache.clear()
+
+        reward_names = {**{v: k for k, v in grants.RESOURCE_MAP.items()}, **{v: k for k, v in grants.ATTRIBUTE_MAP.items()}}
+        reward_text = "，".join(f"{reward_names[key]} +{amount:g}" for key, amount in request.rewards.items())
+        if request.dry_run:
+            yield event.plain_result(f"🔍 预览: 条件【{request.describe()}】匹配 {len(targets)} 名玩家，每人将获得 {reward_text}。\n去掉 “预览” 即可正式发放。")
+            return
+        if not targets:
+            yield event.plain_result(f"条件【{request.describe()}】没有匹配到任何玩家，未发放。")
+            return
+        if audit_error is not None:
+            yield event.plain_result(f"❌ 审计记录写入失败，本次发放已取消，未向任何玩家发放: {audit_error}")
+            return
+
+        logger.info(f"管理员 {entry['operator']} 批量发放: 条件【{entry['filter']}】{len(targets)} 人，{reward_text}，原因: {request.reason or '无'}")
+        await self._save_data()
+        yield event.plain_result(f"✅ 已向 {len(targets)} 名玩家发放 {reward_text}（条件: {request.describe()}）。")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("锦标赛", alias={'tournament'})
+    async def start_tournament(self, event: AstrMessageEvent, mode: str = "循环", entrant_limit: str = "全部", best_of: int = 3):
+        """
+        [管理员] 举办一次锦标赛。
+        用法: /锦标赛 [循环/淘汰] [参赛人数/全部] [每组局数]
+        参赛者按能级从高到低排序取前N名，所有战斗在进程池中并行模拟。
+        """
+        mode_map = {"循环": "round_robin", "循环赛": "round_robin", "淘汰": "elimination", "淘汰赛": "elimination"}
+        tournament_mode = mode_map.get(mode)
+        if not tournament_mode:
+            yield event.plain_result("无效的赛制喵！请输入 `循环` 或 `淘汰`。\n用法: /锦标赛 [循环/淘汰] [参赛人数/全部] [每组局数]")
+            return
+
+        if best_of <= 0 or best_of % 2 == 0:
+            yield event.plain_result("每组局数必须是正奇数哦（例如 1、3、5）。")
+            return
+
+        max_entrants = self.settings.tournament.max_entrants
+        if entrant_limit in ("全部", "all"):
+            limit = max_entrants
+        elif entrant_limit.isdigit() and int(entrant_limit) >= 2:
+            limit = min(int(entrant_limit), max_entrants)
+        else:
+            yield event.plain_result("参赛人数必须是不小于2的整数，或填写 `全部`。")
+            return
+
+        # Boss预估与锦标赛共用进程池，同一时间只运行其中一个
+        if self.tournament_running or self.boss_estimate_running:
+            yield event.plain_result("已有锦标赛或Boss预估正在进行中，请稍后再试喵！")
+            return
+
+        # 检查与置位之间不能有 await，否则两个并发请求都会通过检查
+        self.tournament_running = True
+        try:
+            # 尚未载入的玩家无法参赛，等玩家数据全部载入后再选拔
+            try:
+                await self._wait_for_data()
+            except RuntimeError as e:
+                yield event.plain_result(f"❌ {e}")
+                return
+
+            # 1. 在锁内一次性计算所有参赛者的战斗属性，整个赛事期间不再重复计算
+            async with self.data_lock:
+                candidates = []
+                for uid, udata in self.user_data.items():
+                    nickname = udata.get("nickname")
+                    if not nickname:
+                        continue
+                    stats = dict(self._get_player_stats(uid))
+                    stats['name'] = nickname
+                    candidates.append((stats['energy_level']['value'], stats))
+
+            if len(candidates) < 2:
+                yield event.plain_result("已注册的玩家不足2人，无法举办锦标赛喵~")
+                return
+
+            candidates.sort(key=lambda item: item[0], reverse=True)
+            entrants = [tournament.compact_stats(stats) for _energy, stats in candidates[:limit]]
+
+            try:
+                yield event.plain_result(f"🏟️ 锦标赛开始！赛制: {mode}，参赛人数: {len(entrants)}，每组 {best_of} 局，正在激烈对战中...")
+                if tournament_mode == "round_robin":
+                    result = await self.tournament_engine.run_round_robin(entrants, best_of)
+                else:
+                    result = await self.tournament_engine.run_elimination(entrants, best_of)
+            except Exception as e:
+                logger.error(f"锦标赛模拟时发生错误: {e}")
+                yield event.plain_result(f"❌ 锦标赛模拟失败: {e}")
+                return
+        finally:
+            self.tournament_running = False
+
+        divider = "❀✧⋆✦❃⋆❃✧❀✧❃⋆❃✦⋆✧❀"
+        lines = [f"\n--- 🏆 锦标赛结果 ({mode}, BO{best_of}) 🏆 ---"]
+        if tournament_mode == "round_robin":
+            lines.append("排名 | 选手 | 胜-平-负 | 积分 | 局数")
+            for rank, row in enumerate(result["standings"], start=1):
+                lines.append(f"{rank}. {row['name']} | {row['won']}-{row['drawn']}-{row['lost']} | {row['points']}分 | {row['games_for']}:{row['games_against']}")
+
+            # 参赛人数较少时附带紧凑的对阵结果表
+            order = result["order"]
+            if len(order) <= 8:
+                lines.append(divider)
+                lines.append("对阵表 (行选手对列选手的胜局比):")
+                lines.append("    " + " ".join(f"#{k+1:<3}" for k in range(len(order))))
+                for row_pos, i in enumerate(order):
+                    cells = []
+                    for j in order:
+                        cells.append(" -- " if i == j else "{}:{} ".format(*result["matrix"][(i, j)]))
+                    lines.append(f"#{row_pos+1:<3}" + " ".join(cells))
+        else:
+            for round_no, round_info in enumerate(result["rounds"], start=1):
+                lines.append(f"【第{round_no}轮】")
+                for match in round_info["matches"]:
+                    p1_name = entrants[match["p1"]]["name"]
+                    p2_name = entrants[match["p2"]]["name"]
+                    winner_name = entrants[match["winner"]]["name"]
+                    lines.append(f"  {p1_name} {match['score'][0]}:{match['score'][1]} {p2_name} → {winner_name}")
+                for bye in round_info["byes"]:
+                    lines.append(f"  {entrants[bye]['name']} 轮空晋级")
+            if result["champion"] is not None:
+                lines.append(divider)
+                lines.append(f"👑 冠军: 【{entrants[result['champion']]['name']}】")
+
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("Boss预估", alias={'boss_estimate'})
+    async def estimate_boss(self, event: AstrMessageEvent):
+        """
+        [管理员] 估算一个世界Boss的难度，辅助 /创建活动 选择五维。
+        用法: /Boss预估 五维=S:500,A:150,T:800,I:200,C:100 [名称=Boss名称] [参与率=0~1]
+        每名已注册玩家在进程池中对满血Boss各模拟若干场，得到单次挑战的期望伤害；只读取玩家数据，不改动当前活动。
+        """
+        try:
+            args_str = event.message_str.split(' ', 1)[1]
+        except IndexError:
+            args_str = ""
+        try:
+            params = dict(item.strip().split('=', 1) for item in args_str.split())
+            base_five_stats = {s.split(':')[0].strip().upper(): int(s.split(':')[1]) for s in params['五维'].split(',')}
+            boss_name = params.get('名称', "预估Boss")
+            participation = float(params.get('参与率', 1.0))
+            if not 0 < participation <= 1:
+                raise ValueError("参与率应在 0~1 之间")
+        except (ValueError, KeyError, IndexError) as e:
+            yield event.plain_result(
+                f"❌ 参数解析失败: `{e}`\n"
+                "模板: /Boss预估 五维=[S:1,A:1,T:1,I:1,C:1] 名称=[Boss名称可选] 参与率=[0~1，默认1]\n"
+                "五维格式示例: S:500,A:150,T:800,I:200,C:100"
+            )
+            return
+
+        if self.tournament_running or self.boss_estimate_running:
+            yield event.plain_result("已有锦标赛或Boss预估正在进行中，请稍后再试喵！")
+            return
+        # 检查与置位之间不能有 await，否则两个并发请求都会通过检查
+        self.boss_estimate_running = True
+        try:
+            boss_stats = utils.calculate_boss_stats(boss_name, base_five_stats)
+            boss_hp = boss_stats['HP']['final']
+            if boss_hp <= 0:
+                yield event.plain_result("Boss的生命值必须大于0，请提高 T/S/I 喵。")
+                return
+
+            # 尚未载入的玩家不会参与模拟，等玩家数据全部载入后再收集
+            try:
+                await self._wait_for_data()
+            except RuntimeError as e:
+                yield event.plain_result(f"❌ {e}")
+                return
+
+            # 玩家以编号命名，避免与Boss同名时伤害统计混淆
+            async with self.data_lock:
+                entrant_ids, entrants = [], []
+                for uid, udata in self.user_data.items():
+                    if not udata["nickname"]:
+                        continue
+                    stats = dict(self._get_player_stats(uid))
+                    stats['name'] = f"#{len(entrants)}"
+                    entrant_ids.append(uid)
+                    entrants.append(tournament.compact_stats(stats))
+            if not entrants:
+                yield event.plain_result("还没有已注册的玩家，无法预估喵~")
+                return
+
+            trials = self.settings.tournament.boss_estimate_trials
+            try:
+                yield event.plain_result(f"🧮 正在让 {len(entrants)} 名玩家各模拟挑战 {boss_name} {trials} 场，请稍候...")
+                damages = await self.tournament_engine.estimate_boss_damage(entrants, boss_stats, trials)
+            except Exception as e:
+                logger.error(f"Boss预估模拟时发生错误: {e}")
+                yield event.plain_result(f"❌ Boss预估失败: {e}")
+                return
+        finally:
+            self.boss_estimate_running = False
+
+        # 每名玩家每天只能挑战一次
+        total_damage = sum(damages)
+        daily_damage = total_damage * participation
+        ranked = sorted(range(len(damages)), key=lambda i: damages[i], reverse=True)
+        top_share = sum(damages[i] for i in ranked[:10]) / total_damage if total_damage > 0 else 0.0
+        lines = [
+            f"\n--- 🐲 Boss预估: {boss_name} 🐲 ---",
+            f"五维: {', '.join(f'{k}:{v}' for k, v in base_five_stats.items())} | 生命值: {boss_hp:,.0f}",
+            f"参与玩家: {len(entrants)} 人 × 参与率 {participation:.0%} | 每人模拟 {trials} 场",
+            f"预计每日总伤害: {daily_damage:,.0f} (占血量 {daily_damage / boss_hp:.2%})",
+            f"预计击杀所需: {boss_hp / daily_damage:.1f} 天" if daily_damage > 0 else "预计击杀所需: 无法击杀（玩家造成的伤害为0）",
+            f"前10名玩家伤害占比: {top_share:.1%}",
+            "--- 单次挑战期望伤害前5 ---",
+        ]
+        for i in ranked[:5]:
+            lines.append(f"{self.user_data.get(entrant_ids[i], {}).get('nickname') or entrant_ids[i]}: {damages[i]:,.0f}")
+        yield event.plain_result("\n".join(lines))
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("创建活动")
@@ -954,6 +2374,7 @@ class DailyCheckinPlugin(Star):
         yield event.plain_result(f"✅ 活动 “{event_name}” 已被强制删除。")
 
     @filter.command("活动状态")
+    @throttle.guard_command(throttle.READ_ONLY)
     async def show_event_status(self, event: AstrMessageEvent):
         """显示当前活动的状态，包括Boss信息和伤害排行榜。"""
         if not self.active_event.get("is_active"):
@@ -1010,12 +2431,10 @@ class DailyCheckinPlugin(Star):
             )
 
             ranking_lines = ["--- ⚔️ 伤害排行榜 ⚔️ ---"]
-            # 我们需要通过 user_id 查找昵称
-            id_to_nickname_map = {uid: udata.get("nickname", f"玩家{uid[-4:]}") for uid, udata in self.user_data.items()}
-
             for i, (user_id, data) in enumerate(sorted_participants[:10]): # 最多显示前10名
                 rank = i + 1
-                nickname = id_to_nickname_map.get(user_id, f"神秘玩家{user_id[-4:]}")
+                # 只为上榜的玩家查找昵称
+                nickname = self._participant_name(user_id)
                 damage = int(data.get("total_damage", 0))
                 ranking_lines.append(f"No.{rank} {nickname} - {damage} 伤害")
 
@@ -1048,7 +2467,78 @@ class DailyCheckinPlugin(Star):
             yield event.plain_result(reply)
 
 
+    @filter.command("活动历史", alias={'event_history'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_event_history(self, event: AstrMessageEvent, event_id: int = 0):
+        """
+        查看已结束的活动。
+        用法: /活动历史 列出最近的活动；/活动历史 [编号] 查看该活动的最终排名与奖励。
+        """
+        loop = asyncio.get_running_loop()
+        if not event_id:
+            recent, total = await loop.run_in_executor(None, lambda: (self.event_archive.recent_events(10), self.event_archive.event_count()))
+            if not recent:
+                yield event.plain_result("还没有已结束的活动喵~")
+                return
+            lines = [f"\n--- 📜 活动历史 (最近10个 / 共{total}个) 📜 ---"]
+            for entry in recent:
+                ended = datetime.fromisoformat(entry["ended_at"]).astimezone().strftime("%Y-%m-%d")
+                lines.append(f"#{entry['id']} {entry['name']} | {EVENT_OUTCOME_CN.get(entry['outcome'], entry['outcome'])} | {entry['participants']}人参与 | {ended}")
+            lines.append("使用 /活动历史 [编号] 查看详细排名")
+            yield event.plain_result("\n".join(lines))
+            return
+
+        record = await loop.run_in_executor(None, self.event_archive.read, event_id)
+        if record is None:
+            yield event.plain_result(f"找不到编号为 #{event_id} 的活动喵，请使用 /活动历史 查看。")
+            return
+        max_hp = record["boss_max_hp"] or 1
+        lines = [
+            f"\n--- 📜 #{record['id']} {record['event_name']} 📜 ---",
+            f"Boss: {record['boss_name']} | 结果: {EVENT_OUTCOME_CN.get(record['outcome'], record['outcome'])} | 伤害完成度: {1 - record['boss_final_hp'] / max_hp:.2%}",
+            f"时间: {datetime.fromisoformat(record['start_time']).astimezone().strftime('%m-%d %H:%M')} ~ {datetime.fromisoformat(record['settled_at']).astimezone().strftime('%m-%d %H:%M')}",
+            f"--- 🏆 最终排名 (前10 / 共{len(record['participants'])}人) 🏆 ---",
+        ]
+        for rank, (uid, nickname, damage, rewards) in enumerate(record["participants"][:10], start=1):
+            lines.append(f"No.{rank} {nickname or f'玩家{uid[-4:]}'} - {damage}伤害 [{self._format_event_rewards(rewards)}]")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("我的活动", alias={'my_events'})
+    @throttle.guard_command(throttle.READ_ONLY)
+    async def show_my_events(self, event: AstrMessageEvent):
+        """查看自己参加过的活动，以及最近一次活动获得的奖励。"""
+        user_id = event.get_sender_id()
+        loop = asyncio.get_running_loop()
+        joined = await loop.run_in_executor(None, self.event_archive.player_events, user_id)
+        if not joined:
+            yield event.plain_result("你还没有参加过已结束的活动喵，有活动时使用 /PVE 挑战Boss吧！")
+            return
+
+        # 列表只读索引；只有最近一次活动需要读取归档记录来取得奖励明细
+        latest_id = joined[-1][0]
+        summaries, latest = await loop.run_in_executor(
+            None, lambda: ({entry[0]: self.event_archive.summary(entry[0]) for entry in joined[-10:]}, self.event_archive.read(latest_id))
+        )
+        lines = [f"\n--- 🗂️ 我参加过的活动 (最近10个 / 共{len(joined)}个) 🗂️ ---"]
+        for event_id, rank, damage in reversed(joined[-10:]):
+            summary = summaries.get(event_id) or {}
+            lines.append(f"#{event_id} {summary.get('name', '未知活动')} | 第{rank}/{summary.get('participants', '?')}名 | {damage}伤害")
+        if latest:
+            rewards = next((entry[3] for entry in latest["participants"] if entry[0] == user_id), {})
+            lines.append(f"最近一次 #{latest_id} 获得: {self._format_event_rewards(rewards)}")
+        yield event.plain_result("\n".join(lines))
+
+    def _format_event_rewards(self, rewards: Dict) -> str:
+        parts = []
+        if "rp" in rewards: parts.append(f"人品+{rewards['rp']}")
+        if "draw_tickets" in rewards: parts.append(f"抽奖券+{rewards['draw_tickets']}")
+        if "enhancement_stones" in rewards: parts.append(f"强化石+{rewards['enhancement_stones']}")
+        if "attribute_points" in rewards:
+            parts.append(", ".join(f"{k.capitalize()}+{v:.1f}" for k, v in rewards["attribute_points"].items()))
+        return ", ".join(parts) if parts else "无"
+
     @filter.command("PVE")
+    @throttle.guard_command(throttle.MUTATING)
     async def attack_boss(self, event: AstrMessageEvent):
         """向当前活动的世界Boss发起挑战。"""
         user_id = event.get_sender_id()
@@ -1065,6 +2555,11 @@ class DailyCheckinPlugin(Star):
             return
 
         async with self.data_lock:
+            # 等锁期间活动可能已被结算，或被共享模式下其他实例的改动替换
+            if not self.active_event.get("is_active"):
+                yield event.plain_result("当前没有正在进行的活动哦~")
+                return
+
             # 1. 检查玩家数据和挑战资格
             player_data = self.user_data.get(user_id)
             if not player_data:
@@ -1084,7 +2579,7 @@ class DailyCheckinPlugin(Star):
             boss_name = event_details["boss_name"]
 
             # 2. 为玩家和Boss生成战斗属性
-            player_stats = utils.get_detailed_player_stats(player_data, self.equipment_presets, self.game_constants, self.config)
+            player_stats = dict(self._get_player_stats(user_id))
             player_stats['name'] = player_data.get("nickname", f"玩家{user_id[-4:]}")
 
             boss_base_stats = event_details["base_five_stats"]
@@ -1094,7 +2589,10 @@ class DailyCheckinPlugin(Star):
 
             # 3. 调用升级后的战斗模拟器
             # 玩家是挑战者 (challenger), Boss是被挑战者 (defender)
-            winner_name, battle_log, damage_report = battle.simulate_battle(player_stats, boss_stats)
+            seed = replay.new_seed()
+            winner_name, _battle_log, damage_report = replay.run_battle(player_stats, boss_stats, seed)
+            replay_id = self.replay_store.add([user_id], "pve", seed, player_stats, boss_stats, winner_name)
+            battle_log = self._format_battle_summary(replay_id, player_stats['name'], boss_name, winner_name, damage_report)
 
             # 4. 处理战斗结果，记录伤害
             player_damage_dealt = damage_report.get(player_stats['name'], 0)
@@ -1133,12 +2631,14 @@ class DailyCheckinPlugin(Star):
         reward_pool = details.get("reward_pool", {})
 
         if not participants:
+            await self._archive_event(event_data, "no_participants", {}, {})
             self.active_event = {} # 清空活动
             return f"活动 “{event_data.get('event_name')}” 已结束，但没有勇士参与，太遗憾了！"
 
         # 1. 计算总伤害
         total_damage_all = sum(p.get("total_damage", 0) for p in participants.values())
         if total_damage_all <= 0:
+            await self._archive_event(event_data, "no_damage", {}, {})
             self.active_event = {} # 清空活动
             return f"活动 “{event_data.get('event_name')}” 已结束，但未造成有效伤害，奖励无法分配。"
 
@@ -1164,15 +2664,17 @@ class DailyCheckinPlugin(Star):
             # [已修复] 1. 单独处理 'rp' 奖励
             rp_reward_amount = int(final_reward_pool.get("rp", 0) * damage_share)
             if rp_reward_amount > 0:
-                self.user_data[user_id]["rp"] = self.user_data[user_id].get("rp", 0) + rp_reward_amount
+                self.user_data[user_id]["rp"] += rp_reward_amount
                 player_rewards["rp"] = rp_reward_amount
+                self._record_flow(user_id, "event_reward", "rp", rp_reward_amount)
 
             # 2. 处理 'resources' 中的奖励
             for key in ["draw_tickets", "enhancement_stones"]:
                 reward_amount = int(final_reward_pool.get(key, 0) * damage_share)
                 if reward_amount > 0:
-                    self.user_data[user_id]["resources"][key] = self.user_data[user_id].get("resources", {}).get(key, 0) + reward_amount
+                    self.user_data[user_id]["resources"][key] += reward_amount
                     player_rewards[key] = reward_amount
+                    self._record_flow(user_id, "event_reward", key, reward_amount)
 
 
             # [已重构] 分配属性点 (按0.1粒度多次随机分配)
@@ -1190,7 +2692,7 @@ class DailyCheckinPlugin(Star):
                     # 每次都随机选择一个属性
                     chosen_attr = random.choice(attr_keys)
                     self.user_data[user_id]["attributes"][chosen_attr] = round(self.user_data[user_id]["attributes"][chosen_attr] + 0.1, 1)
-                    gained_attr_summary[chosen_attr] = gained_attr_summary.get(chosen_attr, 0) + 0.1
+                    gained_attr_summary[chosen_attr] = round(gained_attr_summary.get(chosen_attr, 0) + 0.1, 1)
 
                 # 将汇总后的结果存入奖励报告
                 player_rewards["attribute_points"] = gained_attr_summary
@@ -1198,14 +2700,14 @@ class DailyCheckinPlugin(Star):
 
             if player_rewards:
                 distributed_rewards_summary[user_id] = player_rewards
+                self._mark_dirty(user_id)
 
         # 4. 生成结算报告
-        id_to_nickname = {uid: udata.get("nickname", f"玩家{uid[-4:]}") for uid, udata in self.user_data.items()}
         sorted_participants = sorted(participants.items(), key=lambda i: i[1].get("total_damage", 0), reverse=True)
 
         report_lines = [f"\n--- 🎉 活动 “{event_data.get('event_name')}” 结算报告 🎉 ---", settlement_reason, "\n--- 🏆 最终贡献排名 & 奖励 🏆 ---"]
         for i, (uid, data) in enumerate(sorted_participants[:5]): # 公布前5名
-            nickname = id_to_nickname.get(uid, f"神秘玩家{uid[-4:]}")
+            nickname = self._participant_name(uid)
             damage = int(data.get("total_damage", 0))
             rewards_str_parts = []
             player_rewards = distributed_rewards_summary.get(uid, {})
@@ -1222,9 +2724,39 @@ class DailyCheckinPlugin(Star):
             rewards_str = ", ".join(rewards_str_parts) if rewards_str_parts else "无"
             report_lines.append(f"No.{i+1} {nickname} - {damage}伤害 [{rewards_str}]")
 
-        # 5. 清空当前活动
+        # 5. 归档并清空当前活动
+        await self._archive_event(event_data, "killed" if boss_current_hp <= 0 else "timeout", final_reward_pool, distributed_rewards_summary)
         self.active_event = {}
         return "\n".join(report_lines)
+
+    async def _archive_event(self, event_data: Dict, outcome: str, final_reward_pool: Dict, distributed: Dict):
+        """把结算完的活动写入归档（调用方持有 data_lock）。归档失败只记录日志，不影响结算本身。"""
+        details = event_data.get("event_details", {})
+        ranked = sorted(event_data.get("participants", {}).items(), key=lambda i: i[1].get("total_damage", 0), reverse=True)
+        record = {
+            "event_name": event_data.get("event_name"),
+            "event_type": event_data.get("event_type"),
+            "boss_name": details.get("boss_name"),
+            "base_five_stats": details.get("base_five_stats", {}),
+            "boss_max_hp": details.get("derived_stats", {}).get("HP", 0),
+            "boss_final_hp": max(details.get("current_hp", 0), 0),
+            "start_time": event_data.get("start_time"),
+            "end_time": event_data.get("end_time"),
+            "settled_at": datetime.now(timezone.utc).isoformat(),
+            "outcome": outcome,
+            "reward_pool": details.get("reward_pool", {}),
+            "final_reward_pool": final_reward_pool,
+            "participants": [
+                [uid, self.user_data.get(uid, {}).get("nickname"), int(data.get("total_damage", 0)), distributed.get(uid, {})]
+                for uid, data in ranked
+            ],
+        }
+        try:
+            loop = asyncio.get_running_loop()
+            event_id = await loop.run_in_executor(None, self.event_archive.append, record)
+            logger.info(f"活动 “{record['event_name']}” 已归档，编号 #{event_id}。")
+        except Exception as e:
+            logger.error(f"归档活动 “{record['event_name']}” 时发生错误: {e}")
     
 
     @filter.permission_type(filter.PermissionType.ADMIN)
@@ -1253,9 +2785,20 @@ class DailyCheckinPlugin(Star):
         - 取消后台任务
         - 执行最终的数据保存
         """
+        if self.load_task and not self.load_task.done():
+            self.load_task.cancel()
+            logger.warning("玩家数据尚未加载完成，本次卸载不会写回玩家数据。")
         if self.save_task:
             self.save_task.cancel()
             logger.info("后台定时保存任务已取消。")
+        if self.backup_task:
+            self.backup_task.cancel()
+        if self.sync_task:
+            self.sync_task.cancel()
+        if self.economy_task:
+            self.economy_task.cancel()
+
+        self.tournament_engine.shutdown()
 
         await self._save_data()
         logger.info("数据已成功保存。")
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+昵称索引。
+- 精确索引：昵称 -> 玩家ID，用于昵称唯一性检查和按昵称查找玩家；
+- 有序索引：按昵称排序的列表，用于分页浏览和前缀搜索（二分定位，O(log n + 每页条数)）；
+- 模糊索引：对规范化后的昵称切分字符 n-gram（单字、二元组以及带首尾标记的三元组）建立倒排表，
+  查找时只访问与输入共享 n-gram 的候选昵称，再按 Dice 系数打分，用于给打错的昵称提供 “你是不是想找…” 的建议。
+中文昵称通常只有两三个字，单靠三元组几乎无法产生重叠，因此同时索引单字和二元组。
+常用字（如 “小”“喵”）的单字倒排表可能覆盖相当比例的玩家，因此候选只从二元组、三元组的倒排表中产生
+（输入只有一个字时才使用单字），并按倒排表从短到长访问、最多收集 MAX_CANDIDATES 名候选，
+单次查询的开销与玩家总数无关；候选的相似度仍按完整的 n-gram 集合精确计算。
+"""
+import bisect
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+# 首尾标记，让 “以某字开头 / 结尾” 也成为可匹配的特征
+_BEGIN = "\x02"
+_END = "\x03"
+
+# 单次模糊查询最多打分的候选人数
+MAX_CANDIDATES = 200
+
+
+def normalize(nickname: str) -> str:
+    """NFKC 规范化（全角转半角等）并忽略大小写与空白。"""
+    return "".join(unicodedata.normalize("NFKC", nickname).casefold().split())
+
+
+def ngrams(nickname: str) -> Set[str]:
+    """提取昵称的字符 n-gram 集合。"""
+    text = normalize(nickname)
+    if not text:
+        return set()
+    grams = set(text)
+    padded = _BEGIN + text + _END
+    for size in (2, 3):
+        grams.update(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return grams
+
+
+class NicknameIndex:
+    """随玩家改名增量维护的昵称索引，单次改名只需更新该昵称的少量 n-gram。"""
+
+    def __init__(self):
+        self.exact: Dict[str, str] = {}          # 昵称 -> 玩家ID
+        self.names: Dict[str, str] = {}          # 玩家ID -> 昵称
+        self.grams: Dict[str, Set[str]] = {}     # 玩家ID -> n-gram 集合
+        self.postings: Dict[str, Set[str]] = {}  # n-gram -> 玩家ID 集合
+        self.sorted_names: List[str] = []        # 按字符串顺序排列的昵称
+
+    @classmethod
+    def build(cls, user_data: Dict) -> "NicknameIndex":
+        index = cls()
+        for user_id, record in user_data.items():
+            nickname = record.get("nickname")
+            if nickname:
+                index._add(user_id, nickname)
+        # 批量构建时最后统一排序，避免逐个插入
+        index.sorted_names = sorted(index.exact)
+        return index
+
+    def add_many(self, items):
+        """批量加入尚未索引的 (玩家ID, 昵称)，最后统一合并到有序列表（用于分批加载玩家数据）。"""
+        added = []
+        for user_id, nickname in items:
+            if nickname not in self.exact:
+                added.append(nickname)
+            self._add(user_id, nickname)
+        self.sorted_names.extend(added)
+        self.sorted_names.sort()
+
+    def set(self, user_id: str, nickname: str):
+        """设置（或更新）玩家的昵称。"""
+        self.remove(user_id)
+        if nickname not in self.exact:
+            bisect.insort(self.sorted_names, nickname)
+        self._add(user_id, nickname)
+
+    def _add(self, user_id: str, nickname: str):
+        grams = ngrams(nickname)
+        self.exact[nickname] = user_id
+        self.names[user_id] = nickname
+        self.grams[user_id] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(user_id)
+
+    def remove(self, user_id: str):
+        nickname = self.names.pop(user_id, None)
+        if nickname is None:
+            return
+        if self.exact.get(nickname) == user_id:
+            del self.exact[nickname]
+            pos = bisect.bisect_left(self.sorted_names, nickname)
+            if pos < len(self.sorted_names) and self.sorted_names[pos] == nickname:
+                del self.sorted_names[pos]
+        for gram in self.grams.pop(user_id, ()):
+            holders = self.postings.get(gram)
+            if holders is not None:
+                holders.discard(user_id)
+                if not holders:
+                    del self.postings[gram]
+
+    def lookup(self, nickname: str) -> Optional[str]:
+        """按昵称精确查找玩家ID。"""
+        return self.exact.get(nickname)
+
+    def page(self, page: int, page_size: int) -> List[Tuple[str, str]]:
+        """按昵称顺序返回第 page 页（从1开始）的 (昵称, 玩家ID) 列表。"""
+        start = (page - 1) * page_size
+        return [(name, self.exact[name]) for name in self.sorted_names[start:start + page_size]]
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """返回以 prefix 开头的昵称在有序列表中的 [起点, 终点) 下标。"""
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        end = bisect.bisect_left(self.sorted_names, prefix + chr(0x10FFFF), lo=start)
+        return start, end
+
+    def prefix_page(self, prefix: str, page: int, page_size: int) -> Tuple[int, List[Tuple[str, str]]]:
+        """前缀搜索，返回匹配总数以及第 page 页的 (昵称, 玩家ID) 列表。"""
+        start, end = self.prefix_range(prefix)
+        lo = start + (page - 1) * page_size
+        names = self.sorted_names[lo:min(lo + page_size, end)]
+        return end - start, [(name, self.exact[name]) for name in names]
+
+    def suggest(self, query: str, limit: int = 3, min_score: float = 0.3, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        返回与输入最相近的昵称及其相似度（Dice 系数，0~1），按相似度从高到低排列。
+        exclude 可排除某名玩家（例如发起指令的玩家自己）。
+        """
+        query_grams = ngrams(query)
+        if not query_grams:
+            return []
+
+        scored = []
+        for user_id in self._candidates(query_grams, single_char=len(normalize(query)) == 1):
+            if user_id == exclude:
+                continue
+            count = len(query_grams & self.grams[user_id])
+            score = 2 * count / (len(query_grams) + len(self.grams[user_id]))
+            if score >= min_score:
+                scored.append((score, self.names[user_id]))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(name, round(score, 2)) for score, name in scored[:limit]]
+
+    def _candidates(self, query_grams: Set[str], single_char: bool) -> Set[str]:
+        """从最短的倒排表开始收集候选玩家，至多 MAX_CANDIDATES 名。"""
+        grams = [gram for gram in query_grams if len(gram) > 1 or single_char]
+        candidates: Set[str] = set()
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            for user_id in self.postings.get(gram, ()):
+                candidates.add(user_id)
+                if len(candidates) >= MAX_CANDIDATES:
+                    return candidates
+        return candidates
+
+    def __len__(self) -> int:
+        return len(self.names)
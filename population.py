@@ -0,0 +1,172 @@
+"""
+玩家属性的列式 NumPy 镜像。
+每名玩家分配一个稠密编号，五维、资源、当前职业以及各槽位的品级 / 强化等级存放在连续数组中，
+能级、能级段位和筛选条件可以对全服玩家一次性向量化计算，无需逐个遍历字典。
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import utils
+
+ATTR_KEYS = ("strength", "stamina", "agility", "charisma", "intelligence")
+CORE_KEYS = ("S", "T", "A", "C", "I")  # 与 ATTR_KEYS 一一对应
+RESOURCE_KEYS = ("rp", "enhancement_stones", "draw_tickets")
+SLOT_KEYS = ("weapon", "head", "chest", "legs", "feet")
+
+
+class PopulationMirror:
+    """按列存储的全服玩家数据，玩家记录变更后只标记待同步，查询前再批量刷新。"""
+
+    def __init__(self, presets: Dict, constants: Dict, item_table: Dict, initial_capacity: int = 256):
+        self.classes: List[str] = list(constants.get("class_bonus_multipliers", {}).keys())
+        self.grades: List[str] = list(constants.get("grade_info", {}).keys())
+        self._class_index = {name: i for i, name in enumerate(self.classes)}
+        self._grade_index = {name: i for i, name in enumerate(self.grades)}
+
+        # 装备五维加成查找表: [职业, 槽位, 品级, 强化等级, 五维]
+        max_level = utils.ITEM_TABLE_MAX_LEVEL
+        self.core_bonus = np.zeros((len(self.classes), len(SLOT_KEYS), len(self.grades), max_level + 1, len(CORE_KEYS)))
+        for (class_name, slot, grade), level_stats in item_table.items():
+            if class_name not in self._class_index or slot not in SLOT_KEYS or grade not in self._grade_index:
+                continue
+            ci, si, gi = self._class_index[class_name], SLOT_KEYS.index(slot), self._grade_index[grade]
+            for level, stats in enumerate(level_stats[:max_level + 1]):
+                self.core_bonus[ci, si, gi, level] = [stats.get(key, 0) for key in CORE_KEYS]
+
+        self.ids: Dict[str, int] = {}
+        self.user_ids: List[str] = []
+        self.pending: set = set()
+        self._allocate(initial_capacity)
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.attributes = np.zeros((capacity, len(ATTR_KEYS)))
+        self.resources = np.zeros((capacity, len(RESOURCE_KEYS)))
+        self.active_class = np.zeros(capacity, dtype=np.int16)
+        self.slot_grade = np.full((capacity, len(SLOT_KEYS)), -1, dtype=np.int16)  # -1 表示未装备
+        self.slot_level = np.zeros((capacity, len(SLOT_KEYS)), dtype=np.int32)
+
+    def _grow(self):
+        """容量翻倍，保证追加新玩家的均摊开销为 O(1)。"""
+        old = (self.valid, self.attributes, self.resources, self.active_class, self.slot_grade, self.slot_level)
+        size = self.capacity
+        self._allocate(size * 2)
+        for new_arr, old_arr in zip((self.valid, self.attributes, self.resources, self.active_class, self.slot_grade, self.slot_level), old):
+            new_arr[:size] = old_arr
+
+    def mark(self, user_id: str):
+        """玩家记录发生变更，待下次查询前同步。"""
+        self.pending.add(user_id)
+
+    def sync(self, user_data: Dict):
+        """把所有待同步玩家的记录写入列式数组。"""
+        for user_id in self.pending:
+            record = user_data.get(user_id)
+            row = self.ids.get(user_id)
+            if record is None:
+                if row is not None:
+                    self.valid[row] = False
+                continue
+            if row is None:
+                if len(self.user_ids) >= self.capacity:
+                    self._grow()
+                row = self.ids[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+            self._write_row(row, record)
+        self.pending.clear()
+
+    def _write_row(self, row: int, record: Dict):
+        # 记录已由 schema 模块补全为完整结构
+        attributes = record["attributes"]
+        resources = record["resources"]
+        self.valid[row] = True
+        self.attributes[row] = [attributes[key] for key in ATTR_KEYS]
+        self.resources[row] = [record["rp"], resources["enhancement_stones"], resources["draw_tickets"]]
+
+        active_class = record["active_class"]
+        self.active_class[row] = self._class_index.get(active_class, 0)
+        equipped = record["equipment_sets"][active_class]
+        for si, slot in enumerate(SLOT_KEYS):
+            item = equipped.get(slot)
+            if item and item.get("grade") in self._grade_index:
+                self.slot_grade[row, si] = self._grade_index[item["grade"]]
+                self.slot_level[row, si] = min(item.get("success_count", 0), self.core_bonus.shape[3] - 1)
+            else:
+                self.slot_grade[row, si] = -1
+                self.slot_level[row, si] = 0
+
+    # ---------- 向量化查询 ----------
+
+    @property
+    def size(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def player_count(self) -> int:
+        return int(self.valid_mask().sum())
+
+    def final_core_attributes(self) -> np.ndarray:
+        """计算全服玩家装备加成后的最终五维，形状为 (玩家数, 5)。"""
+        n = self.size
+        grade = self.slot_grade[:n]
+        equipped = grade >= 0
+        bonus = self.core_bonus[
+            self.active_class[:n, None],
+            np.arange(len(SLOT_KEYS))[None, :],
+            np.where(equipped, grade, 0),
+            self.slot_level[:n],
+        ]
+        bonus = np.where(equipped[:, :, None], bonus, 0.0).sum(axis=1)
+        base = self.attributes[:n]
+        return base + base * bonus
+
+    def energy_levels(self, formula_config: Dict) -> np.ndarray:
+        """与 utils.calculate_energy_level 相同的公式，一次性计算所有玩家的能级。"""
+        core = self.final_core_attributes()
+        linear = formula_config.get("linear_coefficient", 1.2)
+        square = formula_config.get("square_coefficient", 0.04)
+        return np.round(core.sum(axis=1) * linear + (core ** 2).sum(axis=1) * square, 2)
+
+    @staticmethod
+    def rank_indices(levels: np.ndarray, ranks: utils.RankTable) -> Tuple[np.ndarray, List[str]]:
+        """
+        与 RankTable.index_of 语义一致的向量化段位划分。
+        返回每名玩家的段位下标以及按阈值从低到高排列的段位名；低于所有阈值的玩家下标为 -1（即默认的 F 级）。
+        """
+        thresholds = np.array(ranks.thresholds, dtype=float)
+        return np.searchsorted(thresholds, levels, side="right") - 1, list(ranks.names)
+
+    def rank_counts(self, rank_idx: np.ndarray, rank_count: int) -> List[int]:
+        """统计每个段位的人数，返回列表第0项为低于所有阈值的人数，其后按段位从低到高排列。"""
+        counts = np.bincount(rank_idx[self.valid_mask()] + 1, minlength=rank_count + 1)
+        return [int(c) for c in counts]
+
+    def rows_at_or_above(self, rank_idx: np.ndarray, min_rank_index: int, levels: np.ndarray) -> List[int]:
+        """筛选段位不低于指定段位的玩家编号，按能级从高到低排序。"""
+        rows = np.nonzero(self.valid_mask() & (rank_idx >= min_rank_index))[0]
+        return [int(r) for r in rows[np.argsort(-levels[rows], kind="stable")]]
+
+    def rows_in_rank_band(self, rank_idx: np.ndarray, low: int, high: int) -> List[int]:
+        """筛选段位下标落在 [low, high] 内的玩家编号（-1 为低于所有阈值）。"""
+        rows = np.nonzero(self.valid_mask() & (rank_idx >= low) & (rank_idx <= high))[0]
+        return [int(r) for r in rows]
+
+    def level_summary(self, levels: np.ndarray) -> Optional[Tuple[float, float, float]]:
+        """返回有效玩家能级的 (平均值, 中位数, 最大值)。"""
+        valid_levels = levels[self.valid_mask()]
+        if not valid_levels.size:
+            return None
+        return float(valid_levels.mean()), float(np.median(valid_levels)), float(valid_levels.max())
+
+    def valid_mask(self) -> np.ndarray:
+        return self.valid[:self.size]
+
+    def class_counts(self) -> Dict[str, int]:
+        mask = self.valid_mask()
+        counts = np.bincount(self.active_class[:self.size][mask], minlength=len(self.classes))
+        return {name: int(counts[i]) for i, name in enumerate(self.classes)}
+
+    def user_id_at(self, row: int) -> Optional[str]:
+        return self.user_ids[row] if 0 <= row < self.size else None
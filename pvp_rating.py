@@ -0,0 +1,67 @@
+"""
+PVP 天梯积分（Elo）与每位玩家的近期战绩。
+战绩保存在玩家记录的 "pvp" 字段中：积分、胜负平场次，以及一个固定容量的环形缓冲区，
+每条记录为紧凑列表 [对手ID, 结果(W/L/D), 积分变化, 时间戳]，查看战绩时无需扫描任何全局历史。
+"""
+import time
+from typing import Dict, List
+
+RESULT_WIN = "W"
+RESULT_LOSS = "L"
+RESULT_DRAW = "D"
+
+# 从本方视角看的得分
+_SCORES = {RESULT_WIN: 1.0, RESULT_DRAW: 0.5, RESULT_LOSS: 0.0}
+_OPPOSITE = {RESULT_WIN: RESULT_LOSS, RESULT_LOSS: RESULT_WIN, RESULT_DRAW: RESULT_DRAW}
+_COUNTERS = {RESULT_WIN: "wins", RESULT_LOSS: "losses", RESULT_DRAW: "draws"}
+
+
+def new_record(initial_rating: float) -> Dict:
+    return {"rating": initial_rating, "wins": 0, "losses": 0, "draws": 0, "history": [], "cursor": 0}
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """Elo 期望得分。"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def apply_result(record_a: Dict, record_b: Dict, user_a: str, user_b: str, result_a: str, k_factor: float, history_size: int) -> tuple:
+    """
+    结算一场对战：更新双方积分、场次并写入各自的战绩缓冲区。
+    result_a 为 A 方视角的结果，返回 (A 的积分变化, B 的积分变化)。
+    """
+    expected_a = expected_score(record_a["rating"], record_b["rating"])
+    delta_a = round(k_factor * (_SCORES[result_a] - expected_a))
+    delta_b = -delta_a
+    now = int(time.time())
+    for record, opponent, result, delta in ((record_a, user_b, result_a, delta_a), (record_b, user_a, _OPPOSITE[result_a], delta_b)):
+        record["rating"] += delta
+        record[_COUNTERS[result]] += 1
+        _push_history(record, [opponent, result, delta, now], history_size)
+    return delta_a, delta_b
+
+
+def _push_history(record: Dict, entry: List, history_size: int):
+    """写入环形缓冲区：未满时追加，写满后覆盖最旧的一条。"""
+    history = record["history"]
+    if len(history) != history_size:
+        # 缓冲区未写满或容量配置发生变化：按时间顺序整理并只保留最近的记录
+        history[:] = recent_history(record)[:history_size][::-1]
+        record["cursor"] = len(history) % history_size
+    if len(history) < history_size:
+        history.append(entry)
+        record["cursor"] = len(history) % history_size
+    else:
+        history[record["cursor"]] = entry
+        record["cursor"] = (record["cursor"] + 1) % history_size
+
+
+def recent_history(record: Dict) -> List[List]:
+    """按时间从新到旧返回战绩缓冲区中的记录。"""
+    history = record.get("history", [])
+    cursor = record.get("cursor", 0)
+    return (history[cursor:] + history[:cursor])[::-1] if history else []
+
+
+def games_played(record: Dict) -> int:
+    return record["wins"] + record["losses"] + record["draws"]
@@ -0,0 +1,109 @@
+"""
+按分值排序的玩家索引。
+以 (分值, 玩家ID) 有序列表保存，按分值区间查找和随机抽取只需两次二分查找，无需遍历全服玩家。
+与列式镜像一样采用延迟同步：玩家记录变更时只标记待同步，之后分批重算这些玩家的分值
+（能级索引由后台任务分批同步，查询路径只需二分查找）。
+"""
+import itertools
+import bisect
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class SortedScoreIndex:
+    """玩家分值的有序索引。"""
+
+    def __init__(self):
+        self.entries: List[Tuple[float, str]] = []  # 按 (分值, 玩家ID) 升序排列
+        self.scores: Dict[str, float] = {}
+        self.pending: set = set()
+
+    def mark(self, user_id: str):
+        """玩家记录发生变更，待下次查询前重新计算分值。"""
+        self.pending.add(user_id)
+
+    def sync(self, score_fn: Callable[[str], Optional[float]], limit: Optional[int] = None) -> int:
+        """
+        重新计算至多 limit 名待同步玩家的分值（None 表示全部），返回仍待同步的玩家数。
+        score_fn 返回 None 表示该玩家不进入索引。
+        """
+        if limit is None or limit >= len(self.pending):
+            batch, self.pending = self.pending, set()
+        else:
+            batch = set(itertools.islice(self.pending, limit))
+            self.pending -= batch
+        for user_id in batch:
+            self.update(user_id, score_fn(user_id))
+        return len(self.pending)
+
+    def refresh(self, user_id: str, score_fn: Callable[[str], Optional[float]]) -> Optional[float]:
+        """立即重新计算单个玩家的分值并返回。"""
+        self.pending.discard(user_id)
+        score = score_fn(user_id)
+        self.update(user_id, score)
+        return score
+
+    def update(self, user_id: str, score: Optional[float]):
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            pos = bisect.bisect_left(self.entries, (old, user_id))
+            del self.entries[pos]
+            del self.scores[user_id]
+        if score is not None:
+            bisect.insort(self.entries, (score, user_id))
+            self.scores[user_id] = score
+
+    def update_many(self, items):
+        """批量写入 (玩家ID, 分值)，新条目追加后统一排序，避免逐个插入的 O(n) 移动。"""
+        added = False
+        for user_id, score in items:
+            if user_id in self.scores:
+                self.update(user_id, score)
+            elif score is not None:
+                self.entries.append((score, user_id))
+                self.scores[user_id] = score
+                added = True
+        if added:
+            self.entries.sort()
+
+    def range_bounds(self, low: float, high: float) -> Tuple[int, int]:
+        """返回分值落在 [low, high] 内的条目下标区间 [起点, 终点)。"""
+        start = bisect.bisect_left(self.entries, (low, ""))
+        end = bisect.bisect_right(self.entries, (high, chr(0x10FFFF)), lo=start)
+        return start, end
+
+    def random_in_range(self, low: float, high: float, exclude: Optional[str] = None, rng=random) -> Optional[Tuple[float, str]]:
+        """在分值区间内等概率随机抽取一名玩家（可排除指定玩家），区间内无人时返回 None。"""
+        start, end = self.range_bounds(low, high)
+        excluded_pos = None
+        if exclude is not None and exclude in self.scores:
+            pos = bisect.bisect_left(self.entries, (self.scores[exclude], exclude))
+            if start <= pos < end:
+                excluded_pos = pos
+        count = end - start - (excluded_pos is not None)
+        if count <= 0:
+            return None
+        pos = start + rng.randrange(count)
+        if excluded_pos is not None and pos >= excluded_pos:
+            pos += 1
+        return self.entries[pos]
+
+    def descending_slice(self, start: int, count: int) -> List[Tuple[float, str]]:
+        """按分值从高到低取第 start 名起（从0开始）的 count 个条目。"""
+        end = len(self.entries) - start
+        return self.entries[max(0, end - count):max(0, end)][::-1]
+
+    def rank_of(self, user_id: str) -> Optional[int]:
+        """玩家按分值从高到低的名次（从1开始），不在索引中时返回 None。"""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return len(self.entries) - bisect.bisect_left(self.entries, (score, user_id))
+
+    def score_of(self, user_id: str) -> Optional[float]:
+        return self.scores.get(user_id)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,125 @@
+"""
+战报回放存储。
+每场战斗只记录随机种子和双方的属性快照，需要查看完整战报时用同一种子重新运行 simulate_battle 即可逐字复现，
+因此无需保存或发送动辄数KB的完整日志。
+"""
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from . import battle
+
+
+def snapshot_stats(stats: Dict) -> List:
+    """将战斗属性压缩为 [名字, HP, ATK, ...] 形式的紧凑列表。"""
+    return [stats["name"]] + [stats[key]["final"] for key in battle.BATTLE_STAT_KEYS]
+
+
+def restore_stats(snapshot: List) -> Dict:
+    """将紧凑快照还原为战斗引擎可用的属性块。"""
+    stats = {"name": snapshot[0]}
+    for key, value in zip(battle.BATTLE_STAT_KEYS, snapshot[1:]):
+        stats[key] = {"final": value}
+    return stats
+
+
+def new_seed() -> int:
+    """生成一场战斗的随机种子。"""
+    return random.getrandbits(32)
+
+
+def run_battle(p1_stats: Dict, p2_stats: Dict, seed: int) -> Tuple[str, str, Dict]:
+    """用指定种子运行一场可复现的战斗。"""
+    return battle.simulate_battle(p1_stats, p2_stats, rng=random.Random(seed))
+
+
+class ReplayStore:
+    """
+    按玩家分组、容量有限的战报存储。
+    一条战报可同时属于多名玩家（PVP双方），当所有持有者都将其挤出各自的队列后才真正删除。
+    """
+
+    def __init__(self, max_per_user: int = 20):
+        self.max_per_user = max_per_user
+        self.records: Dict[str, Dict] = {}
+        self.user_index: Dict[str, Deque[str]] = {}
+        self.next_id = 1
+
+    def add(self, owners: List[str], kind: str, seed: int, p1_stats: Dict, p2_stats: Dict, winner: str) -> str:
+        """记录一场战斗并返回战报编号。"""
+        replay_id = _to_base36(self.next_id)
+        self.next_id += 1
+        self.records[replay_id] = {
+            "kind": kind,
+            "seed": seed,
+            "p1": snapshot_stats(p1_stats),
+            "p2": snapshot_stats(p2_stats),
+            "winner": winner,
+            "time": int(time.time()),
+            "owners": list(owners),
+        }
+        for uid in owners:
+            queue = self.user_index.setdefault(uid, deque())
+            queue.append(replay_id)
+            self._trim(uid, queue)
+        return replay_id
+
+    def _trim(self, uid: str, queue: Deque[str]):
+        while len(queue) > self.max_per_user:
+            self._release(queue.popleft(), uid)
+
+    def set_max_per_user(self, max_per_user: int):
+        """调整每名玩家保留的战报数量，缩小时立即裁剪。"""
+        self.max_per_user = max_per_user
+        for uid, queue in self.user_index.items():
+            self._trim(uid, queue)
+
+    def _release(self, replay_id: str, uid: str):
+        record = self.records.get(replay_id)
+        if not record:
+            return
+        if uid in record["owners"]:
+            record["owners"].remove(uid)
+        if not record["owners"]:
+            del self.records[replay_id]
+
+    def get(self, replay_id: str) -> Optional[Dict]:
+        return self.records.get(replay_id.lower())
+
+    def list_for_user(self, uid: str) -> List[Tuple[str, Dict]]:
+        """返回玩家最近的战报，按时间从新到旧排列。"""
+        return [(rid, self.records[rid]) for rid in reversed(self.user_index.get(uid, ())) if rid in self.records]
+
+    def regenerate(self, record: Dict) -> Tuple[str, str, Dict]:
+        """按记录的种子和快照重新生成完整战斗日志。"""
+        return run_battle(restore_stats(record["p1"]), restore_stats(record["p2"]), record["seed"])
+
+    def to_dict(self) -> Dict:
+        return {
+            "next_id": self.next_id,
+            "records": self.records,
+            "user_index": {uid: list(queue) for uid, queue in self.user_index.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_per_user: int = 20) -> "ReplayStore":
+        store = cls(max_per_user)
+        store.next_id = data.get("next_id", 1)
+        store.records = data.get("records", {})
+        for uid, ids in data.get("user_index", {}).items():
+            queue = store.user_index.setdefault(uid, deque())
+            for rid in ids:
+                queue.append(rid)
+                # 配置的容量变小时，加载阶段顺带裁剪
+                store._trim(uid, queue)
+        return store
+
+
+def _to_base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    result = ""
+    while number:
+        number, rem = divmod(number, 36)
+        result = digits[rem] + result
+    return result or "0"
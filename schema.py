@@ -0,0 +1,82 @@
+"""
+玩家记录的结构版本与迁移。
+每条玩家记录带有 schema_version 字段，载入（或从其他实例同步、从备份恢复）时按版本依次执行迁移，
+把记录补全为当前版本的完整结构。此后的指令代码可以直接按键访问，不必再层层 .get(..., 默认值)。
+调整记录结构时：在 MIGRATIONS 末尾追加一个迁移函数，并把 SCHEMA_VERSION 加一。
+"""
+from typing import Callable, Dict, Iterable, List, Tuple
+
+SCHEMA_VERSION = 1
+VERSION_KEY = "schema_version"
+DEFAULT_CLASS = "均衡使者"
+
+INITIAL_ATTRIBUTES = {
+    "strength": 1.0, "agility": 1.0, "stamina": 1.0,
+    "intelligence": 1.0, "charisma": 1.0
+}
+
+
+def new_player(class_names: Iterable[str]) -> Dict:
+    """创建一条当前版本的完整玩家记录。"""
+    return {
+        VERSION_KEY: SCHEMA_VERSION,
+        "nickname": None,
+        "rp": 0,
+        "resources": {"enhancement_stones": 0, "draw_tickets": 0},
+        "attributes": INITIAL_ATTRIBUTES.copy(),
+        "check_in": {"continuous_days": 0, "last_date": ""},
+        "active_class": DEFAULT_CLASS,
+        "equipment_sets": {class_name: {} for class_name in class_names},
+    }
+
+
+def _fill_base_fields(user: Dict):
+    """版本 0 -> 1：补齐早期记录可能缺少的基础字段。"""
+    user.setdefault("nickname", None)
+    user.setdefault("rp", 0)
+    resources = user.setdefault("resources", {})
+    resources.setdefault("enhancement_stones", 0)
+    resources.setdefault("draw_tickets", 0)
+    attributes = user.setdefault("attributes", {})
+    for key, value in INITIAL_ATTRIBUTES.items():
+        attributes.setdefault(key, value)
+    check_in = user.setdefault("check_in", {})
+    check_in.setdefault("continuous_days", 0)
+    check_in.setdefault("last_date", "")
+    user.setdefault("active_class", DEFAULT_CLASS)
+    user.setdefault("equipment_sets", {})
+
+
+# MIGRATIONS[i] 把版本 i 的记录升级到版本 i + 1
+MIGRATIONS: List[Callable[[Dict], None]] = [
+    _fill_base_fields,
+]
+
+
+def upgrade(user: Dict, class_names: Tuple[str, ...]) -> bool:
+    """
+    把一条记录就地升级到当前版本，返回记录是否被修改。
+    职业列表来自配置，可能在记录写入之后才新增职业，因此无论版本如何都会为缺少的职业补上空装备栏。
+    版本号高于本插件的记录（由更新的插件写入）只补装备栏，不做迁移。
+    """
+    changed = False
+    version = user.get(VERSION_KEY, 0)
+    if version < SCHEMA_VERSION:
+        for migrate in MIGRATIONS[version:]:
+            migrate(user)
+        user[VERSION_KEY] = SCHEMA_VERSION
+        changed = True
+    equipment_sets = user["equipment_sets"]
+    for class_name in class_names:
+        if class_name not in equipment_sets:
+            equipment_sets[class_name] = {}
+            changed = True
+    if user["active_class"] not in equipment_sets:
+        equipment_sets[user["active_class"]] = {}
+        changed = True
+    return changed
+
+
+def upgrade_batch(batch: List[Tuple[str, Dict]], class_names: Tuple[str, ...]) -> Tuple[List[Tuple[str, Dict]], int]:
+    """升级一批 (玩家ID, 记录)，返回 (原批次, 被修改的记录数)；可在线程池中执行。"""
+    return batch, sum(upgrade(user, class_names) for _user_id, user in batch)
@@ -0,0 +1,240 @@
+"""
+插件配置的编译快照。
+AstrBot 配置是可变的嵌套字典，各指令里层层 .get() 取值既慢又无法发现填错的配置。
+插件加载时把配置一次性编译为不可变的 Settings 对象：补齐默认值、校验取值范围，
+能级等级表按阈值排序后编译为二分查找表；配置不合法时直接抛出 ValueError，拒绝加载。
+"""
+import json
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from . import utils
+
+
+@dataclass(frozen=True)
+class CheckInSettings:
+    base_rp_min: int = 1
+    base_rp_max: int = 100
+    bonus_per_day: float = 0.02
+    max_continuous_days: int = 15
+
+
+@dataclass(frozen=True)
+class ShopSettings:
+    base_price: int = 50
+    price_fluctuation: float = 0.5
+    daily_purchase_limit: int = 10
+    draw_ticket_base_price: int = 300
+    attribute_increment: float = 0.1
+
+
+@dataclass(frozen=True)
+class LevelFormula:
+    linear_coefficient: float = 1.2
+    square_coefficient: float = 0.04
+
+
+@dataclass(frozen=True)
+class SystemSettings:
+    auto_save_interval_seconds: int = 1800
+    render_cache_size: int = 512
+    nickname_page_size: int = 20
+    nickname_list_show_stats: bool = True
+    storage_mode: str = "single"
+    shared_sync_interval_seconds: float = 2.0
+    worker_id: str = ""
+
+
+@dataclass(frozen=True)
+class ThrottleSettings:
+    read_rate_per_second: float = 1.0
+    read_burst: int = 5
+    mutate_rate_per_second: float = 0.5
+    mutate_burst: int = 3
+    duplicate_window_seconds: float = 2.0
+
+
+@dataclass(frozen=True)
+class LedgerSettings:
+    flush_batch_size: int = 200
+    max_file_mb: float = 8.0
+    max_files: int = 10
+
+
+@dataclass(frozen=True)
+class TournamentSettings:
+    max_workers: int = 0
+    max_entrants: int = 64
+    boss_estimate_trials: int = 20
+
+
+@dataclass(frozen=True)
+class ReplaySettings:
+    max_replays_per_user: int = 20
+
+
+@dataclass(frozen=True)
+class MatchmakingSettings:
+    energy_band_ratio: float = 0.15
+    min_energy_band: float = 10.0
+
+
+@dataclass(frozen=True)
+class PvpSettings:
+    initial_rating: float = 1500.0
+    k_factor: float = 32.0
+    history_size: int = 10
+    ladder_page_size: int = 10
+
+
+@dataclass(frozen=True)
+class BackupSettings:
+    enabled: bool = True
+    interval_seconds: int = 3600
+    deltas_per_base: int = 24
+    retained_chains: int = 7
+
+
+@dataclass(frozen=True)
+class Settings:
+    check_in: CheckInSettings
+    shop: ShopSettings
+    level_formula: LevelFormula
+    ranks: utils.RankTable
+    system: SystemSettings
+    throttle: ThrottleSettings
+    ledger: LedgerSettings
+    tournament: TournamentSettings
+    replay: ReplaySettings
+    matchmaking: MatchmakingSettings
+    pvp: PvpSettings
+    backup: BackupSettings
+    # 供 utils.get_detailed_player_stats 使用的只读配置映射（能级公式 + 预编译的等级表）
+    stats_config: Mapping[str, Any]
+    fingerprint: str
+
+
+def fingerprint(config: Mapping) -> str:
+    """配置内容的指纹，用于判断配置是否发生变化。"""
+    return json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _section(config: Mapping, key: str, cls):
+    """按 dataclass 字段读取一个配置分组，缺失的字段使用默认值，类型不符时报错。"""
+    raw = config.get(key) or {}
+    if not isinstance(raw, Mapping):
+        raise ValueError(f"配置项 {key} 应为对象，实际为 {type(raw).__name__}")
+    values = {}
+    for name, field in cls.__dataclass_fields__.items():
+        if name not in raw or raw[name] is None:
+            continue
+        value, expected = raw[name], type(field.default)
+        if expected is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"配置项 {key}.{name} 应为布尔值，实际为 {value!r}")
+        elif expected is str:
+            if not isinstance(value, str):
+                raise ValueError(f"配置项 {key}.{name} 应为字符串，实际为 {value!r}")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"配置项 {key}.{name} 应为数字，实际为 {value!r}")
+        elif expected is int:
+            if value != int(value):
+                raise ValueError(f"配置项 {key}.{name} 应为整数，实际为 {value!r}")
+            value = int(value)
+        else:
+            value = float(value)
+        values[name] = value
+    return cls(**values)
+
+
+def _require(condition: bool, message: str):
+    if not condition:
+        raise ValueError(message)
+
+
+def _compile_ranks(ranks_config: Any) -> utils.RankTable:
+    _require(isinstance(ranks_config, list) and ranks_config, "配置项 level_ranks 应为非空列表")
+    entries = []
+    for i, rank_info in enumerate(ranks_config):
+        _require(isinstance(rank_info, Mapping), f"level_ranks[{i}] 应为对象")
+        name, threshold = rank_info.get("rank"), rank_info.get("threshold")
+        _require(isinstance(name, str) and name, f"level_ranks[{i}].rank 应为非空字符串")
+        _require(isinstance(threshold, (int, float)) and not isinstance(threshold, bool), f"level_ranks[{i}].threshold 应为数字")
+        entries.append((float(threshold), name))
+    names = [name for _, name in entries]
+    thresholds = [threshold for threshold, _ in entries]
+    _require(len(set(names)) == len(names), "level_ranks 中存在重复的等级名称")
+    _require(len(set(thresholds)) == len(thresholds), "level_ranks 中存在重复的阈值")
+    return utils.RankTable(entries)
+
+
+def compile_settings(config: Mapping) -> Settings:
+    """把 AstrBot 配置编译为经过校验的不可变快照，配置不合法时抛出 ValueError。"""
+    check_in = _section(config, "check_in_settings", CheckInSettings)
+    _require(0 <= check_in.base_rp_min <= check_in.base_rp_max, "check_in_settings: 需满足 0 <= base_rp_min <= base_rp_max")
+    _require(check_in.max_continuous_days >= 1, "check_in_settings.max_continuous_days 至少为 1")
+    _require(check_in.bonus_per_day >= 0, "check_in_settings.bonus_per_day 不能为负数")
+
+    shop = _section(config, "shop_settings", ShopSettings)
+    _require(shop.base_price > 0 and shop.draw_ticket_base_price > 0, "shop_settings: 价格必须大于 0")
+    _require(0 <= shop.price_fluctuation < 1, "shop_settings.price_fluctuation 需在 [0, 1) 之间")
+    _require(shop.daily_purchase_limit >= 0, "shop_settings.daily_purchase_limit 不能为负数")
+    _require(shop.attribute_increment > 0, "shop_settings.attribute_increment 必须大于 0")
+
+    level_formula = _section(config, "level_formula", LevelFormula)
+    _require(level_formula.linear_coefficient >= 0 and level_formula.square_coefficient >= 0, "level_formula: 系数不能为负数")
+
+    ranks = _compile_ranks(config.get("level_ranks", []))
+
+    system = _section(config, "system_settings", SystemSettings)
+    _require(system.auto_save_interval_seconds > 0, "system_settings.auto_save_interval_seconds 必须大于 0")
+    _require(system.render_cache_size > 0, "system_settings.render_cache_size 必须大于 0")
+    _require(system.nickname_page_size > 0, "system_settings.nickname_page_size 必须大于 0")
+    _require(system.storage_mode in ("single", "shared"), "system_settings.storage_mode 只能是 single 或 shared")
+    _require(system.shared_sync_interval_seconds > 0, "system_settings.shared_sync_interval_seconds 必须大于 0")
+    if system.storage_mode == "shared":
+        _require(re.fullmatch(r"[A-Za-z0-9_-]+", system.worker_id) is not None,
+                 "system_settings.worker_id: 共享模式下每个实例都需要设置唯一的标识（字母、数字、下划线或短横线）")
+
+    throttle = _section(config, "throttle_settings", ThrottleSettings)
+    _require(throttle.read_rate_per_second > 0 and throttle.mutate_rate_per_second > 0, "throttle_settings: 恢复速率必须大于 0")
+    _require(throttle.read_burst >= 1 and throttle.mutate_burst >= 1, "throttle_settings: 最大连续请求数至少为 1")
+    _require(throttle.duplicate_window_seconds >= 0, "throttle_settings.duplicate_window_seconds 不能为负数")
+
+    ledger = _section(config, "ledger_settings", LedgerSettings)
+    _require(ledger.flush_batch_size >= 1 and ledger.max_files >= 1 and ledger.max_file_mb > 0, "ledger_settings: 取值必须为正数")
+
+    tournament = _section(config, "tournament_settings", TournamentSettings)
+    _require(tournament.max_workers >= 0, "tournament_settings.max_workers 不能为负数")
+    _require(tournament.max_entrants >= 2, "tournament_settings.max_entrants 至少为 2")
+    _require(tournament.boss_estimate_trials >= 1, "tournament_settings.boss_estimate_trials 至少为 1")
+
+    replay = _section(config, "replay_settings", ReplaySettings)
+    _require(replay.max_replays_per_user >= 1, "replay_settings.max_replays_per_user 至少为 1")
+
+    matchmaking = _section(config, "matchmaking_settings", MatchmakingSettings)
+    _require(matchmaking.energy_band_ratio >= 0 and matchmaking.min_energy_band >= 0, "matchmaking_settings: 匹配范围不能为负数")
+
+    pvp = _section(config, "pvp_settings", PvpSettings)
+    _require(pvp.k_factor > 0, "pvp_settings.k_factor 必须大于 0")
+    _require(pvp.history_size >= 1 and pvp.ladder_page_size >= 1, "pvp_settings: 战绩条数和天梯每页人数至少为 1")
+
+    backup = _section(config, "backup_settings", BackupSettings)
+    _require(backup.interval_seconds > 0, "backup_settings.interval_seconds 必须大于 0")
+    _require(backup.deltas_per_base >= 0 and backup.retained_chains >= 1, "backup_settings: 增量数不能为负数，保留链数至少为 1")
+
+    stats_config = MappingProxyType({
+        "level_formula": MappingProxyType({
+            "linear_coefficient": level_formula.linear_coefficient,
+            "square_coefficient": level_formula.square_coefficient,
+        }),
+        "level_ranks": ranks,
+    })
+    return Settings(
+        check_in=check_in, shop=shop, level_formula=level_formula, ranks=ranks,
+        system=system, throttle=throttle, ledger=ledger, tournament=tournament, replay=replay,
+        matchmaking=matchmaking, pvp=pvp, backup=backup,
+        stats_config=stats_config, fingerprint=fingerprint(config),
+    )
@@ -0,0 +1,293 @@
+"""
+多进程共享存储。
+多个 AstrBot 实例（例如每个平台一个）共用同一个数据目录时，整文件覆盖写入会让最后写入者静默覆盖其他进程的进度。
+共享模式下：
+- 所有读写都在 user_data.lock 上的 fcntl 建议锁内进行，数据文件通过临时文件 + 原子替换写入；
+- 每条玩家记录带有修订号，保存在 user_data.revs.json 中，文件本身的代数（generation）每次提交加一；
+- 提交时只写入本进程改动过的玩家：若磁盘上该玩家的修订号在本进程上次同步之后被其他进程推进过，
+  说明发生了冲突，本进程的修改被拒绝并改为载入磁盘上的版本；用 link 登记的成对变更（如 PVP 双方）一并被拒绝，
+  与其他进程刚提交的记录唯一值（昵称）重复的变更同样被拒绝；
+- 其他进程通过比较修订文件的修改时间发现变化，只重新载入修订号前进了的玩家记录；
+  修订号前进而数据文件中已没有该玩家表示记录被删除（墓碑），其他进程同步时同样删除；
+- 商店、活动等整份存储的小文件同样带修订号：写入前若磁盘版本已被其他进程推进，
+  先以上次同步时的版本为基准做三方合并（见 merge_shop / merge_event），再写回合并结果。
+"""
+import copy
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 等不支持 fcntl 的平台
+    fcntl = None
+
+
+def _atomic_write_json(path: Path, data: Any, **dump_kwargs):
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SharedStore:
+    """基于文件锁和逐玩家修订号的共享玩家数据存储。"""
+
+    def __init__(self, data_path: Path, unique_key: Optional[Callable[[Dict], Optional[str]]] = None):
+        """unique_key 从玩家记录中取出须在所有进程间唯一的值（如昵称），返回空值表示不参与检查。"""
+        if fcntl is None:
+            raise ValueError("当前系统不支持 fcntl 文件锁，无法使用共享存储模式 (storage_mode = shared)")
+        self.data_path = Path(data_path)
+        self.revs_path = self.data_path.with_name(self.data_path.stem + ".revs.json")
+        self.lock_path = self.data_path.with_name(self.data_path.stem + ".lock")
+        self.generation = 0
+        self.known_revs: Dict[str, int] = {}  # 本进程上次同步时各玩家的修订号
+        self.dirty: set = set()
+        self.unique_key = unique_key
+        self.links: Dict[str, set] = {}  # 必须一起提交的玩家（如一场 PVP 的双方），同组玩家共享同一个集合
+        # 整份存储的数据文件：上次同步时的磁盘修订号、内容（三方合并的基准）以及合并函数
+        self.known_blob_revs: Dict[str, int] = {}
+        self.blob_bases: Dict[str, Any] = {}
+        self.blob_mergers: Dict[str, Callable[[Any, Any, Any], Any]] = {}
+        self._manifest_mtime: Optional[int] = None
+        self.counters = {"commits": 0, "conflicts": 0, "reloaded": 0}
+
+    @contextmanager
+    def locked(self, exclusive: bool):
+        """进程间文件锁，其他需要在实例之间共享的文件（如活动归档）也可使用。"""
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+        try:
+            with open(self.revs_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self._manifest_mtime = os.stat(self.revs_path).st_mtime_ns
+            return manifest.get("generation", 0), manifest.get("revs", {}), manifest.get("blobs", {})
+        except FileNotFoundError:
+            return 0, {}, {}
+
+    @staticmethod
+    def _read_json(path: Path) -> Dict:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _read_data(self) -> Dict:
+        return self._read_json(self.data_path)
+
+    def load(self) -> Dict:
+        """在共享锁内读取全部玩家数据，并记录当前的代数和修订号。"""
+        with self.locked(exclusive=False):
+            self.generation, revs, _ = self._read_manifest()
+            data = self._read_data()
+        self.known_revs = dict(revs)
+        self.dirty.clear()
+        return data
+
+    def load_blob(self, path: Path, merge: Optional[Callable[[Any, Any, Any], Any]] = None) -> Dict:
+        """
+        在共享锁内读取一个整份存储的数据文件（不存在时为空字典），并把它登记为之后 sync 的合并基准。
+        merge(基准, 本地, 磁盘) 在本地和其他进程都改动过该文件时调用，返回合并结果；未提供时以磁盘版本为准。
+        """
+        path = Path(path)
+        with self.locked(exclusive=False):
+            _, _, blob_revs = self._read_manifest()
+            data = self._read_json(path)
+        self.known_blob_revs[path.name] = blob_revs.get(path.name, 0)
+        self.blob_bases[path.name] = copy.deepcopy(data)
+        if merge is not None:
+            self.blob_mergers[path.name] = merge
+        return data
+
+    def _blobs_changed(self, blobs: Dict[Path, Any]) -> bool:
+        return any(data != self.blob_bases.get(Path(path).name) for path, data in blobs.items())
+
+    def mark(self, user_id: str):
+        """玩家记录在本进程内发生变更，下次同步时提交。"""
+        self.dirty.add(user_id)
+
+    def link(self, *user_ids: str):
+        """这些玩家的变更必须一起提交：任意一方因冲突被拒绝时，其余各方本次的改动也一并放弃。"""
+        group = set(user_ids)
+        for user_id in user_ids:
+            self.mark(user_id)
+            group |= self.links.get(user_id, set())
+        for user_id in group:
+            self.links[user_id] = group
+
+    def has_remote_changes(self) -> bool:
+        """通过修订文件的修改时间判断其他进程是否提交过，开销仅为一次 stat。"""
+        try:
+            return os.stat(self.revs_path).st_mtime_ns != self._manifest_mtime
+        except FileNotFoundError:
+            return False
+
+    def sync(self, user_data: Dict, blobs: Optional[Dict[Path, Any]] = None) -> Tuple[List[str], List[str], Dict[Path, Any]]:
+        """
+        提交本进程的变更并载入其他进程的变更（原地更新 user_data）。
+        blobs 为需要在同一把锁内同步的整份数据文件（如商店、活动）及其本地内容，须先用 load_blob 登记。
+        删除玩家时把其ID标记为变更即可，提交时会留下墓碑。
+        返回 (从磁盘载入或被其他进程删除的玩家ID列表, 因冲突被拒绝的玩家ID列表, 内容被其他进程改变的数据文件 {路径: 合并后的内容})。
+        """
+        blobs = blobs or {}
+        if not self.dirty and not self._blobs_changed(blobs) and not self.has_remote_changes():
+            return [], [], {}
+
+        reloaded, rejected, blob_updates = [], [], {}
+        with self.locked(exclusive=True):
+            generation, revs, blob_revs = self._read_manifest()
+            if generation != self.generation:
+                disk = self._read_data()
+                for user_id, rev in revs.items():
+                    if rev <= self.known_revs.get(user_id, 0):
+                        continue
+                    # 其他进程在本进程上次同步之后提交过该玩家（修订号前进而数据文件中没有记录表示被删除）
+                    if user_id in self.dirty:
+                        self.dirty.discard(user_id)
+                        rejected.append(user_id)
+                    if user_id in disk:
+                        user_data[user_id] = disk[user_id]
+                    else:
+                        user_data.pop(user_id, None)
+                    self.known_revs[user_id] = rev
+                    reloaded.append(user_id)
+
+                def reject(user_id: str):
+                    # 放弃本进程对该玩家的改动，恢复为磁盘上的版本
+                    self.dirty.discard(user_id)
+                    rejected.append(user_id)
+                    if user_id in disk:
+                        user_data[user_id] = disk[user_id]
+                    else:
+                        user_data.pop(user_id, None)
+                    reloaded.append(user_id)
+
+                if self.unique_key and self.dirty:
+                    # 唯一值与其他进程刚提交的记录重复（例如两个实例同时把同一个昵称分给了不同玩家）：先提交者生效
+                    taken = {}
+                    for user_id in reloaded:
+                        key = self.unique_key(user_data[user_id]) if user_id in user_data else None
+                        if key:
+                            taken[key] = user_id
+                    for user_id in list(self.dirty):
+                        key = self.unique_key(user_data[user_id]) if user_id in user_data else None
+                        if key and taken.get(key, user_id) != user_id:
+                            reject(user_id)
+                pending = list(rejected)
+                while pending:
+                    for partner in self.links.get(pending.pop(), ()):
+                        if partner in self.dirty:
+                            reject(partner)
+                            pending.append(partner)
+
+            manifest_changed = False
+            if self.dirty:
+                for user_id in self.dirty:
+                    # 本进程删除的玩家同样推进修订号，作为墓碑让其他进程在同步时一并删除
+                    if user_id in user_data or user_id in revs:
+                        revs[user_id] = revs.get(user_id, 0) + 1
+                        self.known_revs[user_id] = revs[user_id]
+                generation += 1
+                # 此时内存中未改动的记录与磁盘一致，直接整份写出即可
+                _atomic_write_json(self.data_path, user_data, indent=4)
+                self.dirty.clear()
+                self.counters["commits"] += 1
+                manifest_changed = True
+
+            for path, local in blobs.items():
+                path = Path(path)
+                name = path.name
+                base = self.blob_bases.get(name, {})
+                disk_rev = blob_revs.get(name, 0)
+                on_disk = base
+                merged = local
+                if disk_rev > self.known_blob_revs.get(name, 0):
+                    # 其他进程在本进程上次同步之后写过该文件：本地未改动时直接载入，否则三方合并
+                    on_disk = self._read_json(path)
+                    if local == base:
+                        merged = on_disk
+                    else:
+                        merger = self.blob_mergers.get(name)
+                        merged = merger(base, local, on_disk) if merger else on_disk
+                    if merged is not local:
+                        blob_updates[path] = merged
+                if merged != on_disk:
+                    _atomic_write_json(path, merged, indent=4)
+                    disk_rev += 1
+                    blob_revs[name] = disk_rev
+                    manifest_changed = True
+                self.known_blob_revs[name] = disk_rev
+                self.blob_bases[name] = copy.deepcopy(merged)
+
+            self.links.clear()
+
+            if manifest_changed:
+                _atomic_write_json(self.revs_path, {"generation": generation, "revs": revs, "blobs": blob_revs}, separators=(",", ":"))
+                self._manifest_mtime = os.stat(self.revs_path).st_mtime_ns
+            self.generation = generation
+
+        self.counters["conflicts"] += len(rejected)
+        self.counters["reloaded"] += len(reloaded)
+        return reloaded, rejected, blob_updates
+
+
+def merge_shop(base: Dict, local: Dict, remote: Dict) -> Dict:
+    """
+    商店数据的三方合并。两边是同一次刷新（日期和价格相同）时，把本进程在基准之后用掉的购买次数
+    从磁盘上的剩余次数中扣除；两边各自刷新过时以日期较新的为准，同一天则以先提交的磁盘版本为准。
+    """
+    def same_refresh(a: Dict, b: Dict) -> bool:
+        return a.get("last_refresh_date") == b.get("last_refresh_date") and a.get("prices") == b.get("prices")
+
+    if not same_refresh(local, remote):
+        return local if local.get("last_refresh_date", "") > remote.get("last_refresh_date", "") else remote
+    used = base.get("remaining_purchases", 0) - local.get("remaining_purchases", 0) if same_refresh(base, local) else 0
+    merged = dict(remote)
+    merged["remaining_purchases"] = max(0, remote.get("remaining_purchases", 0) - max(0, used))
+    return merged
+
+
+def _event_identity(event: Dict) -> Tuple:
+    return (event.get("event_name"), event.get("start_time")) if event else ()
+
+
+def merge_event(base: Dict, local: Dict, remote: Dict) -> Dict:
+    """
+    活动数据的三方合并，参与者按玩家各自合并，Boss 血量按合并进来的伤害增量扣减。
+    - 活动本身被创建、删除或结算过（名称 + 开始时间变了）：只有本进程改了时用本地版本，否则以磁盘版本为准；
+    - 同一个活动：本进程改动过、而其他进程没有改动的参与者记录采用本地版本，双方都改动过的以磁盘版本为准（与玩家记录的冲突处理一致）。
+    """
+    if _event_identity(local) != _event_identity(remote):
+        if _event_identity(remote) == _event_identity(base) and _event_identity(local) != _event_identity(base):
+            return local
+        return remote
+    if not remote:
+        return remote
+
+    merged = copy.deepcopy(remote)
+    base_participants = base.get("participants", {}) if _event_identity(base) == _event_identity(local) else {}
+    remote_participants = remote.get("participants", {})
+    damage_delta = 0
+    for user_id, info in local.get("participants", {}).items():
+        base_info = base_participants.get(user_id)
+        if info == base_info or remote_participants.get(user_id) != base_info:
+            continue
+        merged["participants"][user_id] = copy.deepcopy(info)
+        damage_delta += info.get("total_damage", 0) - (base_info or {}).get("total_damage", 0)
+
+    details = merged.get("event_details", {})
+    if "current_hp" in details:
+        details["current_hp"] = max(0, details["current_hp"] - damage_delta)
+    merged["is_active"] = bool(remote.get("is_active")) and bool(local.get("is_active"))
+    return merged
@@ -0,0 +1,75 @@
+"""
+插件启动辅助。
+- PhaseTimer：按阶段记录启动耗时，便于定位插件重载慢在哪一步；
+- iter_object_items：逐个玩家解析顶层为对象的 JSON 文件（如 user_data.json），
+  每解析出一批玩家即可交给插件使用，不必等整个文件解析完毕。
+"""
+import itertools
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class PhaseTimer:
+    """记录各启动阶段的耗时。"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def summary(self) -> str:
+        parts = [f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.phases]
+        return f"{' | '.join(parts)} | 总计 {(time.perf_counter() - self.started) * 1000:.1f}ms"
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _expect(text: str, pos: int, chars: str) -> str:
+    if pos >= len(text) or text[pos] not in chars:
+        found = repr(text[pos]) if pos < len(text) else "文件结尾"
+        raise ValueError(f"JSON 格式错误：位置 {pos} 处应为 {' 或 '.join(chars)}，实际为 {found}")
+    return text[pos]
+
+
+def iter_object_items(text: str) -> Iterator[Tuple[str, Any]]:
+    """按顺序逐项解析顶层 JSON 对象，产出 (键, 值)；格式错误时抛出 ValueError。"""
+    pos = _skip_whitespace(text, 0)
+    _expect(text, pos, "{")
+    pos = _skip_whitespace(text, pos + 1)
+    if pos >= len(text) or text[pos] != "}":
+        while True:
+            _expect(text, pos, '"')
+            key, pos = _decoder.raw_decode(text, pos)
+            pos = _skip_whitespace(text, pos)
+            _expect(text, pos, ":")
+            value, pos = _decoder.raw_decode(text, _skip_whitespace(text, pos + 1))
+            yield key, value
+            pos = _skip_whitespace(text, pos)
+            if _expect(text, pos, ",}") == "}":
+                break
+            pos = _skip_whitespace(text, pos + 1)
+    # 与 json.loads 一致：对象结束后只允许空白
+    pos = _skip_whitespace(text, pos + 1)
+    if pos < len(text):
+        raise ValueError(f"JSON 格式错误：位置 {pos} 处在对象结束后仍有多余内容")
+
+
+def take(items: Iterator, count: int) -> List:
+    """从迭代器中取出至多 count 项。"""
+    return list(itertools.islice(items, count))
@@ -0,0 +1,13 @@
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 插件目录本身不是可安装的包，测试直接导入其中不依赖 AstrBot 的模块
+sys.path.insert(0, str(ROOT))
+
+# 使用相对导入的模块（如 transfer、grants）需要以包的形式导入：把插件目录注册为 daily_checkin 包
+_package = types.ModuleType("daily_checkin")
+_package.__path__ = [str(ROOT)]
+sys.modules.setdefault("daily_checkin", _package)
@@ -0,0 +1,122 @@
+import pytest
+
+import backup
+
+SHOP = {"last_refresh_date": "2026-10-19", "remaining_purchases": 10}
+
+
+def take(manager, users, shop=SHOP, event=None, full=False):
+    kind, payload, _ = manager.prepare(users, shop, event or {}, full=full)
+    return manager.write(kind, payload)
+
+
+def restored_users(manager, point):
+    return manager.restore(point)["users"]
+
+
+def test_restore_each_point_of_a_chain(tmp_path):
+    manager = backup.BackupManager(tmp_path, deltas_per_base=5, retained_chains=2)
+    users = {"u1": {"rp": 1}, "u2": {"rp": 2}}
+    expected = {take(manager, users): {"u1": {"rp": 1}, "u2": {"rp": 2}}}
+
+    users["u1"]["rp"] = 10
+    manager.mark("u1")
+    expected[take(manager, users)] = {"u1": {"rp": 10}, "u2": {"rp": 2}}
+
+    users["u3"] = {"rp": 3}
+    manager.mark("u3")
+    del users["u2"]
+    manager.mark("u2")
+    shop = dict(SHOP, remaining_purchases=7)
+    expected[take(manager, users, shop=shop)] = {"u1": {"rp": 10}, "u3": {"rp": 3}}
+
+    assert list(expected) == ["1.0", "1.1", "1.2"]
+    assert [(point, is_base) for point, _, _, is_base in manager.list_points()] == [("1.0", True), ("1.1", False), ("1.2", False)]
+    for point, users_at_point in expected.items():
+        assert restored_users(manager, point) == users_at_point
+    assert manager.restore("1.1")["shop"] == SHOP
+    assert manager.restore("1.2")["shop"] == shop
+    assert manager.restore("1.3") is None and manager.restore("2.0") is None and manager.restore("abc") is None
+
+
+def test_full_chain_starts_after_deltas_per_base(tmp_path):
+    manager = backup.BackupManager(tmp_path, deltas_per_base=2, retained_chains=3)
+    users = {"u1": {"rp": 0}}
+    points = []
+    for rp in range(5):
+        users["u1"]["rp"] = rp
+        manager.mark("u1")
+        points.append(take(manager, users))
+
+    assert points == ["1.0", "1.1", "1.2", "2.0", "2.1"]
+    for rp, point in enumerate(points):
+        assert restored_users(manager, point) == {"u1": {"rp": rp}}
+
+
+def test_prune_removes_whole_old_chains_and_keeps_retained_ones_restorable(tmp_path):
+    manager = backup.BackupManager(tmp_path, deltas_per_base=1, retained_chains=2)
+    users = {"u1": {"rp": 0}}
+    for rp in range(6):
+        users["u1"]["rp"] = rp
+        manager.mark("u1")
+        take(manager, users)
+
+    # 链 1 被整条删除，保留的两条链各自的基准和增量都还在
+    assert manager._chains() == [2, 3]
+    assert [point for point, *_ in manager.list_points()] == ["2.0", "2.1", "3.0", "3.1"]
+    assert restored_users(manager, "2.0") == {"u1": {"rp": 2}}
+    assert restored_users(manager, "2.1") == {"u1": {"rp": 3}}
+    assert restored_users(manager, "3.1") == {"u1": {"rp": 5}}
+    assert manager.restore("1.0") is None
+
+
+def test_failed_write_forces_a_full_backup_next(tmp_path, monkeypatch):
+    manager = backup.BackupManager(tmp_path, deltas_per_base=5, retained_chains=2)
+    users = {"u1": {"rp": 1}, "u2": {"rp": 2}}
+    take(manager, users)
+
+    users["u1"]["rp"] = 10
+    manager.mark("u1")
+    kind, payload, _ = manager.prepare(users, SHOP, {})
+
+    def fail(path, payload):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backup, "_write_gz", fail)
+    with pytest.raises(OSError):
+        manager.write(kind, payload)
+    monkeypatch.undo()
+    # 变更集已在 prepare 中清空，调用方（插件的 _run_backup）在写入失败时要求下次做全量备份
+    assert not manager.dirty
+    manager.force_base = True
+
+    users["u2"]["rp"] = 20
+    manager.mark("u2")
+    point = take(manager, users)
+
+    assert point == "2.0"
+    assert restored_users(manager, point) == {"u1": {"rp": 10}, "u2": {"rp": 20}}
+    # 失败的增量没有在旧链中留下文件，旧链仍可完整恢复
+    assert [p for p, *_ in manager.list_points()] == ["1.0", "2.0"]
+    assert restored_users(manager, "1.0") == {"u1": {"rp": 1}, "u2": {"rp": 2}}
+
+
+def test_failed_full_backup_does_not_count_as_a_retained_chain(tmp_path, monkeypatch):
+    manager = backup.BackupManager(tmp_path, deltas_per_base=5, retained_chains=2)
+    users = {"u1": {"rp": 1}}
+    take(manager, users)
+
+    def fail(path, payload):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backup, "_write_gz", fail)
+    with pytest.raises(OSError):
+        take(manager, users, full=True)
+    monkeypatch.undo()
+
+    users["u1"]["rp"] = 2
+    take(manager, users, full=True)
+
+    # 写入失败的链没有留下空目录，裁剪时不会把仍完整的旧链挤掉
+    assert [p for p, *_ in manager.list_points()] == ["1.0", "2.0"]
+    assert restored_users(manager, "1.0") == {"u1": {"rp": 1}}
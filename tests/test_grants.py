@@ -0,0 +1,24 @@
+import pytest
+
+from daily_checkin import grants
+
+
+def test_parse_rewards_sums_repeated_names():
+    assert grants.parse_rewards("人品:100,力量:0.5,人品:20") == {"rp": 120, "strength": 0.5}
+
+
+@pytest.mark.parametrize("text", ["力量:nan", "力量:inf", "力量:-inf", "人品:0", "强化石:-3"])
+def test_parse_rewards_rejects_non_finite_or_non_positive(text):
+    with pytest.raises(ValueError, match="正数"):
+        grants.parse_rewards(text)
+
+
+@pytest.mark.parametrize("text, name", [("人品:abc", "人品"), ("力量:", "力量"), ("抽奖券:1.5", "抽奖券")])
+def test_parse_rewards_names_malformed_reward(text, name):
+    with pytest.raises(ValueError, match=f"奖励 “{name}” 的数量"):
+        grants.parse_rewards(text)
+
+
+def test_parse_rewards_rejects_unknown_name():
+    with pytest.raises(ValueError, match="未知的奖励"):
+        grants.parse_rewards("金币:10")
@@ -0,0 +1,76 @@
+import pytest
+
+import nickname_index
+from nickname_index import NicknameIndex
+
+
+@pytest.fixture
+def index():
+    return NicknameIndex.build({
+        "u1": {"nickname": "小猫咪"},
+        "u2": {"nickname": "小狗狗"},
+        "u3": {"nickname": "玩家一号"},
+        "u4": {"nickname": "大魔王"},
+        "u5": {"nickname": "Ｍｉｋｕ"},
+        "u6": {"nickname": None},
+    })
+
+
+def test_suggests_close_cjk_names(index):
+    names = [name for name, _ in index.suggest("小猫")]
+    assert names[0] == "小猫咪"
+    assert [name for name, _ in index.suggest("玩家一")][0] == "玩家一号"
+    assert [name for name, _ in index.suggest("大魔玉")][0] == "大魔王"
+
+
+def test_normalizes_width_and_case(index):
+    assert index.suggest("miku")[0] == ("Ｍｉｋｕ", 1.0)
+
+
+def test_single_character_query_uses_unigrams(index):
+    assert "大魔王" in [name for name, _ in index.suggest("魔", min_score=0.1)]
+
+
+def test_exclude_and_unknown(index):
+    assert "小猫咪" not in [name for name, _ in index.suggest("小猫咪", exclude="u1", min_score=0.1)]
+    assert index.suggest("完全无关") == []
+    assert index.suggest("") == []
+
+
+def test_rename_updates_all_indexes(index):
+    index.set("u1", "老虎")
+
+    assert index.lookup("小猫咪") is None
+    assert index.lookup("老虎") == "u1"
+    assert "小猫咪" not in [name for name, _ in index.suggest("小猫", min_score=0.1)]
+    assert [name for name, _ in index.suggest("老虎")][0] == "老虎"
+    assert "小猫咪" not in index.sorted_names and "老虎" in index.sorted_names
+    assert index.sorted_names == sorted(index.sorted_names)
+    # 改名后旧昵称独有的 n-gram 不应残留在倒排表中
+    assert "猫" not in index.postings
+
+    index.remove("u1")
+    assert index.lookup("老虎") is None and len(index) == 4
+
+
+def test_common_character_does_not_scan_every_player(monkeypatch):
+    monkeypatch.setattr(nickname_index, "MAX_CANDIDATES", 20)
+    index = NicknameIndex.build({f"u{i}": {"nickname": f"小{chr(0x4E00 + i)}{chr(0x4F00 + i)}"} for i in range(1000)})
+    index.set("target", "小明同学")
+
+    scored = []
+
+    class CountingDict(dict):
+        def __getitem__(self, key):
+            scored.append(key)
+            return dict.__getitem__(self, key)
+
+    index.grams = CountingDict(index.grams)
+    assert index.suggest("小明同")[0][0] == "小明同学"
+    # 1001 名玩家都含有 “小”，但只有至多 MAX_CANDIDATES 名被打分
+    assert len(set(scored)) <= 20
+
+
+def test_prefix_page(index):
+    total, page = index.prefix_page("小", 1, 1)
+    assert total == 2 and page == [("小狗狗", "u2")]
@@ -0,0 +1,266 @@
+import json
+
+import pytest
+
+import shared_store
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """同一数据目录上的两个实例。"""
+    path = tmp_path / "user_data.json"
+    a, b = shared_store.SharedStore(path), shared_store.SharedStore(path)
+    return (a, a.load()), (b, b.load())
+
+
+def test_commit_writes_dirty_players_and_bumps_revision(workers, tmp_path):
+    (a, data_a), _ = workers
+    data_a["u1"] = {"rp": 10}
+    a.mark("u1")
+
+    assert a.sync(data_a) == ([], [], {})
+
+    manifest = json.loads((tmp_path / "user_data.revs.json").read_text(encoding="utf-8"))
+    assert manifest["generation"] == 1
+    assert manifest["revs"] == {"u1": 1}
+    assert json.loads((tmp_path / "user_data.json").read_text(encoding="utf-8")) == {"u1": {"rp": 10}}
+    assert a.counters["commits"] == 1
+    assert not a.dirty
+
+
+def test_remote_changes_are_reloaded(workers):
+    (a, data_a), (b, data_b) = workers
+    data_a["u1"] = {"rp": 10}
+    a.mark("u1")
+    a.sync(data_a)
+
+    reloaded, rejected, _ = b.sync(data_b)
+
+    assert reloaded == ["u1"] and rejected == []
+    assert data_b["u1"] == {"rp": 10}
+    assert b.known_revs["u1"] == 1
+
+    data_a["u1"]["rp"] = 20
+    a.mark("u1")
+    a.sync(data_a)
+    assert b.sync(data_b)[0] == ["u1"]
+    assert data_b["u1"] == {"rp": 20}
+
+
+def test_new_player_on_one_worker_reaches_the_other(workers):
+    (a, data_a), (b, data_b) = workers
+    data_b["existing"] = {"rp": 1}
+    b.mark("existing")
+    b.sync(data_b)
+    a.sync(data_a)
+
+    data_a["newbie"] = {"rp": 5}
+    a.mark("newbie")
+    a.sync(data_a)
+    reloaded, _, _ = b.sync(data_b)
+
+    assert reloaded == ["newbie"]
+    assert data_b == {"existing": {"rp": 1}, "newbie": {"rp": 5}}
+
+
+def test_conflicting_change_is_rejected_and_disk_version_loaded(workers):
+    (a, data_a), (b, data_b) = workers
+    data_a["u1"] = {"rp": 10}
+    a.mark("u1")
+    a.sync(data_a)
+    b.sync(data_b)
+
+    data_a["u1"]["rp"] = 11
+    a.mark("u1")
+    a.sync(data_a)
+    data_b["u1"] = {"rp": 99}
+    b.mark("u1")
+
+    reloaded, rejected, _ = b.sync(data_b)
+
+    assert rejected == ["u1"] and reloaded == ["u1"]
+    assert data_b["u1"] == {"rp": 11}
+    assert b.counters["conflicts"] == 1
+    # 被拒绝的改动不会再被提交
+    assert not b.dirty
+
+
+def test_non_conflicting_changes_from_both_workers_are_kept(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    data_a["u1"] = {"rp": 1}
+    a.mark("u1")
+    data_b["u2"] = {"rp": 2}
+    b.mark("u2")
+
+    a.sync(data_a)
+    b.sync(data_b)
+    a.sync(data_a)
+
+    expected = {"u1": {"rp": 1}, "u2": {"rp": 2}}
+    assert data_a == expected and data_b == expected
+    assert json.loads((tmp_path / "user_data.json").read_text(encoding="utf-8")) == expected
+
+
+
+def test_deleted_player_is_removed_on_other_worker(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    data_a.update(u1={"rp": 1}, u2={"rp": 2})
+    a.mark("u1")
+    a.mark("u2")
+    a.sync(data_a)
+    b.sync(data_b)
+
+    # 例如恢复了不含 u2 的备份：删除后同样标记为变更
+    del data_a["u2"]
+    a.mark("u2")
+    a.sync(data_a)
+    reloaded, rejected, _ = b.sync(data_b)
+
+    assert reloaded == ["u2"] and rejected == []
+    assert data_b == {"u1": {"rp": 1}}
+    manifest = json.loads((tmp_path / "user_data.revs.json").read_text(encoding="utf-8"))
+    assert manifest["revs"]["u2"] == 2
+
+    # 持有旧记录的实例不会再把被删除的玩家写回来
+    data_b["u1"]["rp"] = 5
+    b.mark("u1")
+    b.sync(data_b)
+    assert json.loads((tmp_path / "user_data.json").read_text(encoding="utf-8")) == {"u1": {"rp": 5}}
+
+
+def test_mtime_fast_path_skips_locking_when_nothing_changed(workers, monkeypatch):
+    (a, data_a), (b, data_b) = workers
+    data_a["u1"] = {"rp": 1}
+    a.mark("u1")
+    a.sync(data_a)
+    b.sync(data_b)
+
+    assert not a.has_remote_changes() and not b.has_remote_changes()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("没有任何变化时不应获取文件锁")
+
+    monkeypatch.setattr(b, "locked", fail)
+    assert b.sync(data_b) == ([], [], {})
+
+    monkeypatch.undo()
+    data_a["u1"]["rp"] = 2
+    a.mark("u1")
+    a.sync(data_a)
+    assert b.has_remote_changes()
+
+
+def test_shop_purchases_from_both_workers_add_up(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    shop_path = tmp_path / "shop_data.json"
+    shop = {"last_refresh_date": "2026-10-19", "remaining_purchases": 10, "prices": {"strength": 50}}
+    shop_path.write_text(json.dumps(shop), encoding="utf-8")
+    shop_a = a.load_blob(shop_path, merge=shared_store.merge_shop)
+    shop_b = b.load_blob(shop_path, merge=shared_store.merge_shop)
+
+    shop_a["remaining_purchases"] -= 3
+    a.sync(data_a, {shop_path: shop_a})
+    shop_b["remaining_purchases"] -= 2
+    _, _, updates = b.sync(data_b, {shop_path: shop_b})
+
+    assert updates[shop_path]["remaining_purchases"] == 5
+    assert json.loads(shop_path.read_text(encoding="utf-8"))["remaining_purchases"] == 5
+    _, _, updates = a.sync(data_a, {shop_path: shop_a})
+    assert updates[shop_path]["remaining_purchases"] == 5
+
+
+def test_event_damage_from_both_workers_is_merged(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    event_path = tmp_path / "active_event.json"
+    event_a = a.load_blob(event_path, merge=shared_store.merge_event)
+    event_b = b.load_blob(event_path, merge=shared_store.merge_event)
+    assert event_a == event_b == {}
+
+    event_a = {
+        "event_name": "boss", "start_time": "t0", "is_active": True,
+        "event_details": {"current_hp": 1000}, "participants": {},
+    }
+    a.sync(data_a, {event_path: event_a})
+    # 本地未改动时直接载入其他实例创建的活动，而不是用空活动覆盖它
+    event_b = b.sync(data_b, {event_path: event_b})[2][event_path]
+    assert event_b["event_name"] == "boss"
+
+    event_a["participants"]["u1"] = {"total_damage": 100}
+    event_a["event_details"]["current_hp"] -= 100
+    event_b["participants"]["u2"] = {"total_damage": 250}
+    event_b["event_details"]["current_hp"] -= 250
+    a.sync(data_a, {event_path: event_a})
+    merged = b.sync(data_b, {event_path: event_b})[2][event_path]
+
+    assert merged["participants"] == {"u1": {"total_damage": 100}, "u2": {"total_damage": 250}}
+    assert merged["event_details"]["current_hp"] == 650
+    assert json.loads(event_path.read_text(encoding="utf-8")) == merged
+
+
+def test_settled_event_is_not_resurrected_by_stale_worker(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    event_path = tmp_path / "active_event.json"
+    event = {"event_name": "boss", "start_time": "t0", "is_active": True, "event_details": {"current_hp": 10}, "participants": {}}
+    event_path.write_text(json.dumps(event), encoding="utf-8")
+    a.load_blob(event_path, merge=shared_store.merge_event)
+    event_b = b.load_blob(event_path, merge=shared_store.merge_event)
+
+    # 实例 A 结算了活动，实例 B 还在旧活动上记录伤害
+    a.sync(data_a, {event_path: {}})
+    event_b["participants"]["u2"] = {"total_damage": 5}
+    merged = b.sync(data_b, {event_path: event_b})[2][event_path]
+
+    assert merged == {}
+    assert json.loads(event_path.read_text(encoding="utf-8")) == {}
+
+
+def test_linked_changes_are_rejected_together(workers, tmp_path):
+    (a, data_a), (b, data_b) = workers
+    data_a.update(u1={"rating": 1500}, u2={"rating": 1500})
+    a.mark("u1")
+    a.mark("u2")
+    a.sync(data_a)
+    b.sync(data_b)
+
+    data_a["u1"]["rating"] = 1490
+    a.mark("u1")
+    a.sync(data_a)
+    # 实例 B 上 u1 挑战 u2：u1 冲突被拒绝，u2 的积分变化也不能单独提交
+    data_b["u1"]["rating"] = 1516
+    data_b["u2"]["rating"] = 1484
+    b.link("u1", "u2")
+
+    reloaded, rejected, _ = b.sync(data_b)
+
+    assert sorted(rejected) == ["u1", "u2"] and sorted(reloaded) == ["u1", "u2"]
+    assert data_b == {"u1": {"rating": 1490}, "u2": {"rating": 1500}}
+    assert json.loads((tmp_path / "user_data.json").read_text(encoding="utf-8")) == data_b
+    assert not b.dirty and not b.links
+
+
+def test_duplicate_unique_key_from_other_worker_is_rejected(tmp_path):
+    path = tmp_path / "user_data.json"
+    a = shared_store.SharedStore(path, unique_key=lambda user: user.get("nickname"))
+    b = shared_store.SharedStore(path, unique_key=lambda user: user.get("nickname"))
+    data_a, data_b = a.load(), b.load()
+    data_a["u1"] = {"nickname": ""}
+    data_b["u2"] = {"nickname": ""}
+    a.mark("u1")
+    a.sync(data_a)
+    b.mark("u2")
+    b.sync(data_b)
+    a.sync(data_a)
+
+    # 两个实例各自检查本地索引后把同一个昵称分给了不同玩家，先提交的生效
+    data_a["u1"]["nickname"] = "喵喵"
+    a.mark("u1")
+    a.sync(data_a)
+    data_b["u2"]["nickname"] = "喵喵"
+    b.mark("u2")
+
+    reloaded, rejected, _ = b.sync(data_b)
+
+    assert rejected == ["u2"] and sorted(reloaded) == ["u1", "u2"]
+    assert data_b == {"u1": {"nickname": "喵喵"}, "u2": {"nickname": ""}}
+    on_disk = json.loads(path.read_text(encoding="utf-8"))
+    assert [uid for uid, user in on_disk.items() if user["nickname"] == "喵喵"] == ["u1"]
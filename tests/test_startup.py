@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import startup
+
+
+def parse(text):
+    return list(startup.iter_object_items(text))
+
+
+@pytest.mark.parametrize("text", [
+    "{}",
+    " \n\t{ \r\n } \n",
+    '{"a": 1}',
+    '{\n    "a" : {"nested": [1, 2, {"x": null}]},\n\t"b":true , "c" :"str"\n}\n',
+    '{"esc\\"aped": 1, "back\\\\slash": 2, "uni\\u4e2d": 3, "中文": "值", "": 0}',
+    '{"brace}in key": "value with } and {", "comma,key": ","}',
+    '{"dup": 1, "dup": 2}',
+])
+def test_items_match_json_loads(text):
+    assert dict(parse(text)) == json.loads(text)
+
+
+def test_items_are_yielded_in_file_order():
+    players = {f"user{i}": {"rp": i, "nickname": f"昵称{i}"} for i in range(50)}
+    text = json.dumps(players, ensure_ascii=False, indent=4)
+    assert parse(text) == list(players.items())
+
+
+def test_items_are_produced_before_the_rest_of_the_file_is_parsed():
+    items = startup.iter_object_items('{"a": 1, "b": 2, oops')
+    assert startup.take(items, 2) == [("a", 1), ("b", 2)]
+    with pytest.raises(ValueError):
+        next(items)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "{",
+    '{"a"',
+    '{"a": ',
+    '{"a": 1',
+    '{"a": 1,',
+    '{"a": {"b": [1, 2',
+    '{"a": "unterminated',
+    "{a: 1}",
+    '{"a": 1,}',
+    '{"a" 1}',
+    '{"a": 1 "b": 2}',
+])
+def test_malformed_or_truncated_text_raises_value_error(text):
+    with pytest.raises(ValueError):
+        json.loads(text)
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+@pytest.mark.parametrize("text", ["[]", '"just a string"', "1"])
+def test_top_level_must_be_an_object(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+@pytest.mark.parametrize("text", ['{"a": 1} x', "{}{}", '{"a": 1}}', '{} ,'])
+def test_trailing_garbage_raises_value_error(text):
+    with pytest.raises(ValueError):
+        json.loads(text)
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_take_returns_at_most_count_items():
+    items = iter(range(5))
+    assert startup.take(items, 3) == [0, 1, 2]
+    assert startup.take(items, 3) == [3, 4]
+    assert startup.take(items, 3) == []
@@ -0,0 +1,120 @@
+import copy
+import gzip
+import json
+
+import pytest
+
+from daily_checkin import pvp_rating, schema, transfer
+
+CLASS_NAMES = ("均衡使者", "狂刃战士", "磐石守卫", "迅捷术师")
+GRADE_NAMES = ("凡品", "良品", "精品", "极品", "神品")
+
+
+def make_player(nickname="喵喵"):
+    user = schema.new_player(CLASS_NAMES)
+    user.update(nickname=nickname, rp=120)
+    user["check_in"] = {"continuous_days": 3, "last_date": "2026-10-18"}
+    user["equipment_sets"]["均衡使者"]["weapon"] = {"grade": "良品", "success_count": 2}
+    user["pvp"] = pvp_rating.new_record(1500.0)
+    pvp_rating.apply_result(user["pvp"], pvp_rating.new_record(1500.0), "u1", "u2", pvp_rating.RESULT_WIN, 32, 10)
+    return user
+
+
+def validate(record):
+    return transfer.validate_record(record, CLASS_NAMES, GRADE_NAMES)
+
+
+def test_complete_record_is_valid():
+    assert validate(make_player()) is None
+
+
+def test_legacy_record_is_migrated():
+    legacy = {"nickname": "老玩家", "rp": 5, "attributes": {"strength": 2.0}}
+    assert validate(legacy) is None
+    assert legacy[schema.VERSION_KEY] == schema.SCHEMA_VERSION
+    assert set(legacy["equipment_sets"]) == set(CLASS_NAMES)
+
+
+@pytest.mark.parametrize("record", [
+    {"schema_version": 2},
+    {"schema_version": 1, "equipment_sets": {}},
+    {"schema_version": 1, "nickname": None, "rp": 0, "resources": {}, "attributes": {}, "check_in": {},
+     "active_class": "均衡使者", "equipment_sets": {}},
+    {"schema_version": "1"},
+    "not a dict",
+])
+def test_structurally_broken_records_are_rejected(record):
+    assert validate(record)
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda r: r["equipment_sets"]["均衡使者"].update(weapon={}),
+    lambda r: r["equipment_sets"]["均衡使者"]["weapon"].update(grade="仙品"),
+    lambda r: r["equipment_sets"]["均衡使者"]["weapon"].update(success_count=-1),
+    lambda r: r["equipment_sets"]["均衡使者"]["weapon"].update(success_count=1.5),
+    lambda r: r.update(active_class="法师"),
+    lambda r: r["check_in"].update(last_date="10/18/2026"),
+    lambda r: r["check_in"].update(continuous_days=-2),
+    lambda r: r.update(rp="很多"),
+    lambda r: r.update(nickname=""),
+    lambda r: r["resources"].update(draw_tickets=None),
+    lambda r: r.update(pvp={"rating": 1500}),
+    lambda r: r["pvp"].update(rating=float("nan")),
+    lambda r: r["pvp"].update(wins=-1),
+    lambda r: r["pvp"].update(history="[]"),
+    lambda r: r["pvp"].update(history=[["u2", "W"]]),
+    lambda r: r["pvp"].update(cursor=5),
+])
+def test_invalid_values_are_rejected(mutate):
+    record = make_player()
+    mutate(record)
+    assert validate(record)
+
+
+def test_export_import_round_trip(tmp_path):
+    user_data = {f"user{i}": make_player(f"玩家{i}") for i in range(7)}
+    path = transfer.export_path(tmp_path)
+    writer = transfer.ExportWriter(path)
+    ids = list(user_data)
+    for start in range(0, len(ids), 3):
+        writer.write(transfer.serialize_batch(user_data, ids[start:start + 3] + ["deleted"]))
+    assert writer.close() > 0
+    assert transfer.list_exports(tmp_path)[0][0] == path.name
+    assert transfer.resolve_export(tmp_path, path.name[:-len(transfer.FILE_SUFFIX)]) == path
+
+    reader = transfer.ImportReader(path, CLASS_NAMES, GRADE_NAMES, batch_size=4)
+    imported = []
+    while True:
+        batch = reader.next_batch()
+        if not batch:
+            break
+        assert len(batch) <= 4
+        imported.extend(batch)
+    reader.close()
+
+    assert dict(imported) == user_data
+    assert reader.rejected == 0
+
+
+def test_import_rejects_bad_lines_individually(tmp_path):
+    good = make_player()
+    lines = [
+        json.dumps({"user_id": "ok1", "record": good}, ensure_ascii=False),
+        "{not json",
+        json.dumps({"record": good}, ensure_ascii=False),
+        json.dumps({"user_id": "v2", "record": {"schema_version": 2}}),
+        json.dumps({"user_id": "pvp", "record": dict(copy.deepcopy(good), pvp={"rating": 1500})}, ensure_ascii=False),
+        "",
+        json.dumps({"user_id": "ok2", "record": good}, ensure_ascii=False),
+    ]
+    path = tmp_path / f"players{transfer.FILE_SUFFIX}"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    reader = transfer.ImportReader(path, CLASS_NAMES, GRADE_NAMES)
+    batch = reader.next_batch()
+    reader.close()
+
+    assert [user_id for user_id, _ in batch] == ["ok1", "ok2"]
+    assert reader.rejected == 4
+    assert [error.split(":")[0] for error in reader.errors] == ["第2行", "第3行", "第4行", "第5行"]
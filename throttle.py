@@ -0,0 +1,152 @@
+"""
+指令调度层的防刷保护。
+- 同一玩家完全相同的指令正在执行时，重复请求不再执行，而是等待并共享首个请求的回复；
+- 每位玩家按指令类别（只读 / 写入）拥有独立的令牌桶，超出频率的请求被丢弃，
+  令牌桶放在 LRU 缓存中，长期不活跃玩家的桶会被淘汰（再次出现时按满桶重新开始）；
+- 只读指令的回复在短时间窗口内缓存，重复请求直接复用。
+"""
+import asyncio
+import functools
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .cache import LRUCache
+
+READ_ONLY = "read"
+MUTATING = "mutate"
+
+
+class TokenBucket:
+    """经典令牌桶：以固定速率补充令牌，容量即允许的突发请求数。"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "notified")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.notified = False  # 本轮限流是否已经提醒过玩家
+
+    def try_take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.notified = False
+            return True
+        return False
+
+
+class CommandGuard:
+    """按玩家维度合并重复指令并限制指令频率。"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], duplicate_window: float = 2.0, cache_size: int = 512):
+        self.limits = limits  # {指令类别: (每秒补充令牌数, 桶容量)}
+        self.duplicate_window = duplicate_window
+        self.buckets = LRUCache(cache_size * 2)  # (user_id, 指令类别) -> TokenBucket，每位玩家两类指令各一个桶
+        self.inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.reply_cache = LRUCache(cache_size)  # user_id -> {指令文本: (过期时间, 回复列表)}
+        self.counters = {"dropped": 0, "coalesced": 0, "throttled": 0}
+        # 准入检查：返回提示文本时拒绝执行该玩家的指令（例如玩家数据尚未加载）
+        self.admission: Optional[Callable[[str], Optional[str]]] = None
+
+    def configure(self, limits: Dict[str, Tuple[float, float]], duplicate_window: float, cache_size: int):
+        """配置变更后调整限流参数，已有的令牌桶立即按新的速率和容量计算。"""
+        self.limits = limits
+        self.duplicate_window = duplicate_window
+        self.reply_cache.resize(cache_size)
+        self.buckets.resize(cache_size * 2)
+        for (_user_id, command_class), bucket in self.buckets.items():
+            bucket.rate, bucket.capacity = limits.get(command_class, (1.0, 5.0))
+            bucket.tokens = min(bucket.tokens, bucket.capacity)
+
+    def _take_token(self, user_id: str, command_class: str) -> TokenBucket:
+        bucket = self.buckets.get((user_id, command_class))
+        if bucket is None:
+            rate, capacity = self.limits.get(command_class, (1.0, 5.0))
+            bucket = TokenBucket(rate, capacity)
+            self.buckets.put((user_id, command_class), bucket)
+        return bucket
+
+    async def run(self, command_class: str, user_id: str, message: str, handler: Callable[[], AsyncIterator], on_throttled: Callable[[], Any]) -> AsyncIterator:
+        key = (user_id, message.strip())
+        now = time.monotonic()
+
+        # 1. 只读指令：窗口期内的重复请求直接复用缓存回复
+        if command_class == READ_ONLY:
+            user_replies = self.reply_cache.get(user_id)
+            cached = user_replies.get(key[1]) if user_replies else None
+            if cached and cached[0] > now:
+                self.counters["coalesced"] += 1
+                for result in cached[1]:
+                    yield result
+                return
+
+        # 2. 相同指令仍在执行：等待并共享其结果，写入类指令因此不会被重复执行
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            for result in await asyncio.shield(pending):
+                yield result
+            return
+
+        # 3. 令牌桶限流，每轮限流只提醒一次，避免提醒本身刷屏
+        bucket = self._take_token(user_id, command_class)
+        if not bucket.try_take():
+            self.counters["dropped"] += 1
+            self.counters["throttled"] += 1
+            if not bucket.notified:
+                bucket.notified = True
+                yield on_throttled()
+            return
+
+        # 4. 作为首个请求真正执行指令，并把结果分享给等待中的重复请求
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        results: List = []
+        completed = False
+        try:
+            async for result in handler():
+                results.append(result)
+                yield result
+            completed = True
+        finally:
+            del self.inflight[key]
+            if not future.done():
+                future.set_result(results)
+            if command_class == READ_ONLY:
+                if completed:
+                    self._cache_reply(user_id, key[1], results)
+            else:
+                # 写入类指令可能改变只读指令的结果，清空该玩家的回复缓存
+                self.reply_cache.pop(user_id)
+
+    def _cache_reply(self, user_id: str, message: str, results: List):
+        """缓存只读指令的回复，顺带清理该玩家已过期的缓存条目。"""
+        now = time.monotonic()
+        user_replies = {k: v for k, v in (self.reply_cache.get(user_id) or {}).items() if v[0] > now}
+        user_replies[message] = (now + self.duplicate_window, results)
+        self.reply_cache.put(user_id, user_replies)
+
+
+def guard_command(command_class: str):
+    """
+    指令处理函数装饰器，需放在 @filter.command 的内侧。
+    被装饰的插件实例需提供 command_guard 属性。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, event, *args, **kwargs):
+            guard = self.command_guard
+            notice = guard.admission(event.get_sender_id()) if guard.admission else None
+            if notice:
+                yield event.plain_result(notice)
+                return
+            handler = lambda: func(self, event, *args, **kwargs)
+            on_throttled = lambda: event.plain_result("操作太频繁啦，请稍后再试喵~")
+            async for result in guard.run(command_class, event.get_sender_id(), event.message_str, handler, on_throttled):
+                yield result
+        return wrapper
+    return decorator
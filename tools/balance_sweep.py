@@ -0,0 +1,201 @@
+"""
+离线职业平衡扫描工具。
+
+加载装备预设与游戏常量，为每个职业在若干成长阶段生成虚拟玩家，
+对参数网格中的每个取值组合，使用 utils / battle 的真实规则在全部CPU核心上模拟大量跨职业对战，
+并输出胜率矩阵 CSV，便于在修改线上配置前检查职业平衡。
+
+示例:
+    python tools/balance_sweep.py --battles 20000 \\
+        --grid "class_bonus_multipliers.狂刃战士.ATK%=0.8,1.0,1.2" \\
+        --grid "enhancement_k_values.精品=0.12,0.16" \\
+        --out sweep_output
+"""
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+import battle  # noqa: E402
+import utils  # noqa: E402
+
+CLASSES = ["均衡使者", "狂刃战士", "磐石守卫", "迅捷术师"]
+SLOTS = ["weapon", "head", "chest", "legs", "feet"]
+ATTR_KEYS = {"S": "strength", "T": "stamina", "A": "agility", "C": "charisma", "I": "intelligence"}
+
+# 成长阶段: (阶段名, 五维总点数, 装备品级, 强化等级)
+STAGES = [
+    ("新手", 10, "凡品", 2),
+    ("进阶", 40, "良品", 5),
+    ("中期", 100, "精品", 8),
+    ("后期", 200, "极品", 12),
+    ("毕业", 350, "神品", 10),
+]
+
+# 每个子进程任务模拟的战斗场次上限，保证各核心负载均衡
+BATTLES_PER_TASK = 5000
+
+
+def parse_grid(specs: List[str]) -> List[Tuple[str, List[float]]]:
+    """解析 `路径=值1,值2,...` 形式的网格参数。"""
+    grid = []
+    for spec in specs:
+        if "=" not in spec:
+            raise ValueError(f"无法解析网格参数: {spec}（格式应为 路径=值1,值2）")
+        path, values = spec.split("=", 1)
+        grid.append((path.strip(), [float(v) for v in values.split(",") if v.strip()]))
+    return grid
+
+
+def apply_override(constants: Dict, path: str, value: float):
+    """按 `a.b.c` 路径修改常量字典中的单个数值，路径必须已存在。"""
+    keys = path.split(".")
+    node = constants
+    for key in keys[:-1]:
+        if key not in node:
+            raise KeyError(f"常量中不存在路径: {path}")
+        node = node[key]
+    if keys[-1] not in node:
+        raise KeyError(f"常量中不存在路径: {path}")
+    node[keys[-1]] = value
+
+
+def build_player(class_name: str, stage: Tuple[str, int, str, int], constants: Dict, attr_profile: str) -> Dict:
+    """生成某职业在某成长阶段的虚拟玩家记录。"""
+    _stage_name, total_points, grade, level = stage
+    if attr_profile == "class":
+        # 按职业对五维的偏好系数分配属性点
+        multipliers = constants["class_bonus_multipliers"][class_name]
+        weights = {k: multipliers.get(k, 0.5) for k in ATTR_KEYS}
+    else:
+        weights = {k: 1.0 for k in ATTR_KEYS}
+    weight_sum = sum(weights.values())
+    attributes = {ATTR_KEYS[k]: round(total_points * w / weight_sum, 1) for k, w in weights.items()}
+
+    return {
+        "attributes": attributes,
+        "active_class": class_name,
+        "equipment_sets": {class_name: {slot: {"grade": grade, "success_count": level} for slot in SLOTS}},
+    }
+
+
+def build_stats(player: Dict, name: str, presets: Dict, constants: Dict) -> Dict:
+    """计算虚拟玩家的战斗属性，只保留战斗引擎需要的字段。"""
+    stats = utils.get_detailed_player_stats(player, presets, constants, {})
+    compact = {"name": name}
+    for key in battle.BATTLE_STAT_KEYS:
+        compact[key] = {"final": stats[key]["final"]}
+    return compact
+
+
+def simulate_chunk(task: Tuple) -> Tuple:
+    """[子进程入口] 模拟一批对战，返回 (任务键, A胜场, B胜场, 平局)。"""
+    key, stats_a, stats_b, battles, seed = task
+    random.seed(seed)
+    wins_a = wins_b = draws = 0
+    for _ in range(battles):
+        winner_name, _log, _damage = battle.simulate_battle(stats_a, stats_b)
+        if winner_name == stats_a["name"]:
+            wins_a += 1
+        elif winner_name == stats_b["name"]:
+            wins_b += 1
+        else:
+            draws += 1
+    return key, wins_a, wins_b, draws
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线职业平衡扫描：输出各参数组合下的跨职业胜率矩阵。")
+    parser.add_argument("--grid", action="append", default=[], help="网格参数，格式 路径=值1,值2（可重复）")
+    parser.add_argument("--battles", type=int, default=2000, help="每组职业对阵的模拟场次")
+    parser.add_argument("--stages", default=",".join(s[0] for s in STAGES), help="参与扫描的成长阶段（逗号分隔）")
+    parser.add_argument("--attr-profile", choices=["uniform", "class"], default="uniform", help="五维分配方式：平均分配或按职业偏好分配")
+    parser.add_argument("--constants", default=str(PLUGIN_DIR / "game_constants.json"), help="游戏常量文件路径")
+    parser.add_argument("--presets", default=str(PLUGIN_DIR / "equipment_presets.json"), help="装备预设文件路径")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（用于复现结果）")
+    parser.add_argument("--out", default="balance_sweep_output", help="CSV 输出目录")
+    args = parser.parse_args()
+
+    with open(args.constants, "r", encoding="utf-8") as f:
+        base_constants = json.load(f)
+    with open(args.presets, "r", encoding="utf-8") as f:
+        presets = json.load(f)
+
+    grid = parse_grid(args.grid)
+    stage_names = [s.strip() for s in args.stages.split(",") if s.strip()]
+    stages = [s for s in STAGES if s[0] in stage_names]
+    if not stages:
+        parser.error(f"没有可用的成长阶段，可选: {', '.join(s[0] for s in STAGES)}")
+
+    grid_points = list(itertools.product(*[values for _path, values in grid])) if grid else [()]
+    rng = random.Random(args.seed)
+
+    # 1. 在主进程中一次性生成所有虚拟玩家的战斗属性
+    tasks = []
+    for grid_id, point in enumerate(grid_points):
+        constants = copy.deepcopy(base_constants)
+        for (path, _values), value in zip(grid, point):
+            apply_override(constants, path, value)
+        for stage in stages:
+            stats_by_class = {
+                cls: build_player(cls, stage, constants, args.attr_profile) for cls in CLASSES
+            }
+            for cls_a, cls_b in itertools.product(CLASSES, CLASSES):
+                # 镜像对局需要不同的名字，战斗引擎按名字区分双方
+                stats_a = build_stats(stats_by_class[cls_a], f"A·{cls_a}", presets, constants)
+                stats_b = build_stats(stats_by_class[cls_b], f"B·{cls_b}", presets, constants)
+                remaining = args.battles
+                while remaining > 0:
+                    chunk = min(remaining, BATTLES_PER_TASK)
+                    tasks.append(((grid_id, stage[0], cls_a, cls_b), stats_a, stats_b, chunk, rng.getrandbits(64)))
+                    remaining -= chunk
+
+    # 2. 在进程池中并行模拟，按任务键汇总
+    totals: Dict[Tuple, List[int]] = {}
+    started = time.perf_counter()
+    with Pool(processes=args.workers) as pool:
+        for key, wins_a, wins_b, draws in pool.imap_unordered(simulate_chunk, tasks, chunksize=4):
+            acc = totals.setdefault(key, [0, 0, 0])
+            acc[0] += wins_a
+            acc[1] += wins_b
+            acc[2] += draws
+    elapsed = time.perf_counter() - started
+    total_battles = sum(sum(v) for v in totals.values())
+
+    # 3. 输出胜率矩阵与索引文件
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "index.csv", "w", encoding="utf-8-sig", newline="") as index_file:
+        index_writer = csv.writer(index_file)
+        index_writer.writerow(["grid_id", "stage", "file"] + [path for path, _values in grid])
+        for grid_id, point in enumerate(grid_points):
+            for stage in stages:
+                file_name = f"winrate_g{grid_id}_{stage[0]}.csv"
+                index_writer.writerow([grid_id, stage[0], file_name] + list(point))
+                with open(out_dir / file_name, "w", encoding="utf-8-sig", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["攻方\\守方"] + CLASSES)
+                    for cls_a in CLASSES:
+                        row = [cls_a]
+                        for cls_b in CLASSES:
+                            wins_a, wins_b, draws = totals[(grid_id, stage[0], cls_a, cls_b)]
+                            row.append(f"{wins_a / max(wins_a + wins_b + draws, 1):.4f}")
+                        writer.writerow(row)
+
+    print(f"完成 {total_battles} 场模拟，用时 {elapsed:.1f} 秒 ({total_battles / max(elapsed, 1e-9):.0f} 场/秒)，结果已写入 {out_dir}/")
+
+
+if __name__ == "__main__":
+    main()
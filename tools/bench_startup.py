@@ -0,0 +1,131 @@
+"""
+插件冷启动基准测试。
+
+按不同的玩家规模生成模拟的 user_data.json，分别测量：
+- 旧流程：json.load 整个文件后一次性建立昵称 / 天梯索引，期间插件无法响应；
+- 新流程：逐个玩家解析、每批载入后增量建立索引，记录第一批玩家可用的时间和全部载入的时间；
+- 静态数据（签文、游戏常量、装备预设）与装备属性表的解析耗时，这部分现已推迟到首次使用。
+不依赖 AstrBot，直接复用插件的 startup / nickname_index / rating_index / utils 模块。
+
+示例:
+    python tools/bench_startup.py --sizes 1000,10000,50000 --batch 500
+"""
+import argparse
+import importlib
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+# 插件模块使用包内相对导入，需要以插件包的形式加载
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+startup = importlib.import_module(f"{PLUGIN_DIR.name}.startup")
+nickname_index = importlib.import_module(f"{PLUGIN_DIR.name}.nickname_index")
+rating_index = importlib.import_module(f"{PLUGIN_DIR.name}.rating_index")
+utils = importlib.import_module(f"{PLUGIN_DIR.name}.utils")
+
+CLASSES = ["均衡使者", "狂刃战士", "磐石守卫", "迅捷术师"]
+SLOTS = ["weapon", "head", "chest", "legs", "feet"]
+GRADES = ["凡品", "良品", "精品", "极品", "神品"]
+
+
+def make_player(i: int, rng: random.Random) -> dict:
+    """生成一名形状与真实存档一致的模拟玩家。"""
+    player = {
+        "nickname": f"玩家{i:06d}",
+        "rp": rng.randint(0, 5000),
+        "resources": {"enhancement_stones": rng.randint(0, 200), "draw_tickets": rng.randint(0, 10)},
+        "attributes": {key: round(rng.uniform(1, 60), 1) for key in ("strength", "agility", "stamina", "intelligence", "charisma")},
+        "check_in": {"continuous_days": rng.randint(0, 15), "last_date": "2026-01-01"},
+        "active_class": rng.choice(CLASSES),
+        "equipment_sets": {
+            cls: {slot: {"grade": rng.choice(GRADES), "success_count": rng.randint(0, 12)} for slot in SLOTS if rng.random() < 0.6}
+            for cls in CLASSES
+        },
+    }
+    if rng.random() < 0.4:
+        player["pvp"] = {"rating": 1500 + rng.randint(-300, 300), "wins": 3, "losses": 2, "draws": 0, "history": [], "cursor": 0}
+    return player
+
+
+def index_batch(names, ratings, batch):
+    names.add_many((uid, user["nickname"]) for uid, user in batch if user.get("nickname"))
+    ratings.update_many((uid, user["pvp"]["rating"]) for uid, user in batch if "pvp" in user)
+
+
+def bench_size(size: int, batch_size: int, directory: Path, rng: random.Random):
+    path = directory / f"user_data_{size}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({str(100000 + i): make_player(i, rng) for i in range(size)}, f, ensure_ascii=False, indent=4)
+    file_mb = path.stat().st_size / 1024 / 1024
+
+    # 旧流程：整文件解析 + 一次性建索引
+    started = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    names = nickname_index.NicknameIndex.build(data)
+    ratings = rating_index.SortedScoreIndex()
+    for uid, user in data.items():
+        if "pvp" in user:
+            ratings.update(uid, user["pvp"]["rating"])
+    eager_ms = (time.perf_counter() - started) * 1000
+
+    # 新流程：读取文本后分批解析并增量建索引
+    started = time.perf_counter()
+    text = path.read_text("utf-8")
+    items = startup.iter_object_items(text)
+    names = nickname_index.NicknameIndex()
+    ratings = rating_index.SortedScoreIndex()
+    loaded = {}
+    first_batch_ms = None
+    while True:
+        batch = startup.take(items, batch_size)
+        if not batch:
+            break
+        loaded.update(batch)
+        index_batch(names, ratings, batch)
+        if first_batch_ms is None:
+            first_batch_ms = (time.perf_counter() - started) * 1000
+    streamed_ms = (time.perf_counter() - started) * 1000
+    assert loaded == data and names.sorted_names == sorted(names.exact)
+    return file_mb, eager_ms, first_batch_ms or 0.0, streamed_ms
+
+
+def bench_static():
+    started = time.perf_counter()
+    with open(PLUGIN_DIR / "fortunes.json", "r", encoding="utf-8") as f:
+        json.load(f)
+    with open(PLUGIN_DIR / "game_constants.json", "r", encoding="utf-8") as f:
+        constants = json.load(f)
+    with open(PLUGIN_DIR / "equipment_presets.json", "r", encoding="utf-8") as f:
+        presets = json.load(f)
+    parse_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    table = utils.build_item_stat_table(presets, constants)
+    utils.build_item_delta_table(table, constants)
+    table_ms = (time.perf_counter() - started) * 1000
+    return parse_ms, table_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量不同玩家规模下的插件冷启动耗时。")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="玩家规模（逗号分隔）")
+    parser.add_argument("--batch", type=int, default=500, help="分批载入时每批的玩家数（与插件的 LOAD_BATCH_SIZE 对应）")
+    parser.add_argument("--seed", type=int, default=1, help="生成模拟玩家的随机种子")
+    args = parser.parse_args()
+
+    parse_ms, table_ms = bench_static()
+    print(f"静态数据解析 {parse_ms:.1f}ms，装备属性表预计算 {table_ms:.1f}ms（现推迟到首次使用）")
+    print(f"{'玩家数':>8} {'文件MB':>8} {'整体加载ms':>11} {'首批可用ms':>11} {'分批载入ms':>11}")
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            file_mb, eager_ms, first_ms, streamed_ms = bench_size(size, args.batch, Path(tmp), rng)
+            print(f"{size:>8} {file_mb:>8.1f} {eager_ms:>11.1f} {first_ms:>11.1f} {streamed_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
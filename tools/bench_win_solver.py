@@ -0,0 +1,114 @@
+"""
+胜率求解器基准测试。
+
+对若干代表性的对阵（同阶段各职业互打、跨阶段的一边倒对局），分别用
+win_solver 的精确求解、HP量化近似求解和 simulate_battle 抽样估计胜率，
+比较三者的结果偏差与耗时。抽样的偏差以精确解为基准，并给出抽样的标准误差作参考。
+
+示例:
+    python tools/bench_win_solver.py --samples 20000 --buckets 100 --seed 1
+"""
+import argparse
+import importlib
+import json
+import math
+import random
+import sys
+import time
+
+from balance_sweep import CLASSES, PLUGIN_DIR, STAGES, build_player, build_stats
+
+import battle
+
+# win_solver 使用包内相对导入，需要以插件包的形式加载
+sys.path.insert(0, str(PLUGIN_DIR.parent))
+win_solver = importlib.import_module(f"{PLUGIN_DIR.name}.win_solver")
+
+
+def representative_pairs(presets, constants):
+    """生成代表性对阵：各阶段的跨职业对局，以及相邻与悬殊阶段之间的一边倒对局。"""
+    stages = {stage[0]: stage for stage in STAGES}
+
+    def stats(class_name, stage_name, label):
+        player = build_player(class_name, stages[stage_name], constants, "class")
+        return build_stats(player, f"{label}·{class_name}·{stage_name}", presets, constants)
+
+    pairs = []
+    for stage_name in stages:
+        for cls_a, cls_b in ((CLASSES[0], CLASSES[1]), (CLASSES[2], CLASSES[3]), (CLASSES[1], CLASSES[2])):
+            pairs.append((f"{stage_name} {cls_a} vs {cls_b}", stats(cls_a, stage_name, "A"), stats(cls_b, stage_name, "B")))
+    for stage_a, stage_b in (("进阶", "新手"), ("后期", "中期"), ("毕业", "新手")):
+        cls_a, cls_b = CLASSES[1], CLASSES[2]
+        pairs.append((f"{stage_a}{cls_a} vs {stage_b}{cls_b}", stats(cls_a, stage_a, "A"), stats(cls_b, stage_b, "B")))
+    return pairs
+
+
+def sample(stats_a, stats_b, samples, rng):
+    wins = draws = 0
+    for _ in range(samples):
+        winner_name, _log, _damage = battle.simulate_battle(stats_a, stats_b, rng)
+        if winner_name == stats_a["name"]:
+            wins += 1
+        elif winner_name == "平局":
+            draws += 1
+    return wins / samples, draws / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较胜率精确求解、HP量化近似求解与抽样估计的准确度和速度。")
+    parser.add_argument("--samples", type=int, default=10000, help="每组对阵的抽样场次")
+    parser.add_argument("--buckets", type=int, default=100, help="近似求解时每方HP的量化档数")
+    parser.add_argument("--constants", default=str(PLUGIN_DIR / "game_constants.json"), help="游戏常量文件路径")
+    parser.add_argument("--presets", default=str(PLUGIN_DIR / "equipment_presets.json"), help="装备预设文件路径")
+    parser.add_argument("--seed", type=int, default=None, help="抽样随机种子")
+    args = parser.parse_args()
+
+    with open(args.constants, "r", encoding="utf-8") as f:
+        constants = json.load(f)
+    with open(args.presets, "r", encoding="utf-8") as f:
+        presets = json.load(f)
+    rng = random.Random(args.seed)
+
+    header = f"{'对阵':<28} {'精确胜率':>9} {'状态数':>8} {'耗时ms':>8} | {'量化胜率':>9} {'偏差':>8} {'耗时ms':>8} | {'抽样胜率':>9} {'偏差':>8} {'标准误':>7} {'耗时ms':>9}"
+    print(header)
+    print("-" * len(header))
+    totals = {"exact": 0.0, "bucket": 0.0, "sample": 0.0}
+    max_error = {"bucket": 0.0, "sample": 0.0}
+    max_residual = 0.0
+    for label, stats_a, stats_b in representative_pairs(presets, constants):
+        started = time.perf_counter()
+        exact = win_solver.solve(stats_a, stats_b)
+        exact_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        approx = win_solver.solve(stats_a, stats_b, hp_buckets=args.buckets)
+        bucket_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        sampled_win, _sampled_draw = sample(stats_a, stats_b, args.samples, rng)
+        sample_ms = (time.perf_counter() - started) * 1000
+
+        stderr = math.sqrt(max(sampled_win * (1 - sampled_win), 1e-12) / args.samples)
+        bucket_error = approx["win"] - exact["win"]
+        sample_error = sampled_win - exact["win"]
+        totals["exact"] += exact_ms
+        totals["bucket"] += bucket_ms
+        totals["sample"] += sample_ms
+        max_error["bucket"] = max(max_error["bucket"], abs(bucket_error))
+        max_error["sample"] = max(max_error["sample"], abs(sample_error))
+        max_residual = max(max_residual, exact["residual"])
+        print(
+            f"{label:<28} {exact['win']:>9.4%} {exact['states']:>8} {exact_ms:>8.1f} | "
+            f"{approx['win']:>9.4%} {bucket_error:>+8.4f} {bucket_ms:>8.1f} | "
+            f"{sampled_win:>9.4%} {sample_error:>+8.4f} {stderr:>7.4f} {sample_ms:>9.1f}"
+        )
+
+    print("-" * len(header))
+    print(
+        f"总耗时: 精确 {totals['exact']:.0f} ms / 量化({args.buckets}档) {totals['bucket']:.0f} ms / 抽样({args.samples}场) {totals['sample']:.0f} ms；"
+        f"最大偏差: 量化 {max_error['bucket']:.4f} / 抽样 {max_error['sample']:.4f}；精确解剪枝丢弃的概率最多 {max_residual:.1e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+端到端异步压测工具：离线复现零点签到高峰。
+
+用桩对象（Context / AstrBotConfig / AstrMessageEvent 以及 astrbot.api 各模块）替代 AstrBot，
+直接实例化 DailyCheckinPlugin 并调用其指令协程，无需启动机器人。
+预先生成若干虚拟玩家的存档，然后让所有虚拟玩家并发地按给定比例发送
+/jrrp、/抽奖、/强化、/PVP、/PVE 指令，最后报告：
+- 吞吐量与各指令的 p50 / p99 延迟；
+- data_lock 的等待时间；
+- _save_data 的调用次数、耗时与写入字节数（各数据文件整份重写的大小 + 账本追加的增量）。
+
+示例:
+    python tools/loadgen.py --players 2000 --commands 3 --mix "jrrp=50,抽奖=20,强化=15,PVP=10,PVE=5"
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+
+CLASSES = ["均衡使者", "狂刃战士", "磐石守卫", "迅捷术师"]
+
+# 指令名 -> (插件方法名, 生成消息文本与参数的函数)
+COMMANDS = {
+    "jrrp": ("daily_check_in", lambda player, rng, players: ("/jrrp", ())),
+    "抽奖": ("draw_lottery", lambda player, rng, players: ("/抽奖 1", (1,))),
+    "强化": ("enhance_item", lambda player, rng, players: ("/强化 武器", ("武器",))),
+    "PVP": ("pvp_challenge", lambda player, rng, players: _pvp_args(player, rng, players)),
+    "PVE": ("attack_boss", lambda player, rng, players: ("/PVE", ())),
+}
+
+
+def _pvp_args(player: str, rng: random.Random, players: List[str]):
+    target = rng.choice(players)
+    while target == player and len(players) > 1:
+        target = rng.choice(players)
+    nickname = f"压测{target}"
+    return f"/PVP {nickname}", (nickname,)
+
+
+# ---------- AstrBot 桩对象 ----------
+
+class StubContext:
+    """插件只把 Context 传给 Star 基类，桩对象无需任何功能。"""
+
+
+class StubConfig(dict):
+    """AstrBotConfig 是带 schema 的字典，插件只按字典读取。"""
+
+
+class StubEvent:
+    """AstrMessageEvent 的最小实现：发送者、原始消息和纯文本回复。"""
+
+    def __init__(self, sender_id: str, message_str: str):
+        self.sender_id = sender_id
+        self.message_str = message_str
+
+    def get_sender_id(self) -> str:
+        return self.sender_id
+
+    def get_sender_name(self) -> str:
+        return self.sender_id
+
+    def plain_result(self, text: str) -> str:
+        return text
+
+
+class _StubFilter:
+    class PermissionType:
+        ADMIN = "admin"
+        MEMBER = "member"
+
+    @staticmethod
+    def command(name, alias=None, **kwargs):
+        return lambda func: func
+
+    @staticmethod
+    def permission_type(permission, **kwargs):
+        return lambda func: func
+
+
+def install_stub_astrbot(data_dir: Path):
+    """在 sys.modules 中注册 astrbot.api 的桩模块，插件的数据目录指向 data_dir。"""
+
+    class Star:
+        def __init__(self, context):
+            self.context = context
+
+    class StarTools:
+        @staticmethod
+        def get_data_dir(name: str) -> Path:
+            path = data_dir / name
+            path.mkdir(parents=True, exist_ok=True)
+            return path
+
+    logger = logging.getLogger("astrbot")
+    modules = {name: types.ModuleType(name) for name in ("astrbot", "astrbot.api", "astrbot.api.all", "astrbot.api.event", "astrbot.api.star")}
+    modules["astrbot.api"].logger = logger
+    modules["astrbot.api"].AstrBotConfig = StubConfig
+    modules["astrbot.api.all"].__all__ = []
+    modules["astrbot.api.event"].filter = _StubFilter()
+    modules["astrbot.api.event"].AstrMessageEvent = StubEvent
+    star = modules["astrbot.api.star"]
+    star.Context, star.Star, star.StarTools = StubContext, Star, StarTools
+    star.register = lambda *args, **kwargs: (lambda cls: cls)
+    modules["astrbot"].api = modules["astrbot.api"]
+    sys.modules.update(modules)
+
+
+def default_config(overrides: Dict) -> StubConfig:
+    """按 _conf_schema.json 的默认值生成配置，再应用 {分组: {字段: 值}} 形式的覆盖。"""
+    def defaults(schema: Dict) -> Dict:
+        return {key: defaults(item["items"]) if item.get("type") == "object" else item.get("default") for key, item in schema.items()}
+
+    with open(PLUGIN_DIR / "_conf_schema.json", "r", encoding="utf-8") as f:
+        config = defaults(json.load(f))
+    for section, values in overrides.items():
+        config.setdefault(section, {}).update(values)
+    return StubConfig(config)
+
+
+# ---------- 计量 ----------
+
+class TimedLock(asyncio.Lock):
+    """记录每次获取锁之前等待时间的 asyncio.Lock。"""
+
+    def __init__(self):
+        super().__init__()
+        self.waits: List[float] = []
+
+    async def acquire(self):
+        started = time.perf_counter()
+        result = await super().acquire()
+        self.waits.append(time.perf_counter() - started)
+        return result
+
+
+def instrument_saves(plugin) -> Dict:
+    """包装插件的 _save_data，统计调用次数、耗时和写入字节数。"""
+    stats = {"calls": 0, "seconds": 0.0, "bytes": 0}
+    original = plugin._save_data
+    files = [plugin.user_data_path, plugin.shop_data_path, plugin.event_data_path, plugin.replay_data_path, plugin.economy_stats_path]
+    ledger_dir = plugin.ledger.directory
+
+    def ledger_bytes() -> int:
+        return sum(p.stat().st_size for p in ledger_dir.glob("*") if p.is_file())
+
+    async def timed_save():
+        ledger_before = ledger_bytes()
+        started = time.perf_counter()
+        await original()
+        stats["seconds"] += time.perf_counter() - started
+        stats["calls"] += 1
+        # 除账本外的数据文件每次保存都整份重写
+        stats["bytes"] += sum(p.stat().st_size for p in files if p.exists()) + max(ledger_bytes() - ledger_before, 0)
+
+    plugin._save_data = timed_save
+    return stats
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+
+# ---------- 压测流程 ----------
+
+def seed_players(count: int, rng: random.Random) -> Dict:
+    """生成虚拟玩家存档：已设置昵称、昨天签到过，并持有足够的人品、强化石、抽奖券和一把武器。"""
+    yesterday = time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400))
+    players = {}
+    for i in range(count):
+        player_id = f"vp{i:06d}"
+        players[player_id] = {
+            "nickname": f"压测{player_id}",
+            "rp": 100000,
+            "resources": {"enhancement_stones": 1000, "draw_tickets": 100},
+            "attributes": {key: round(rng.uniform(5, 40), 1) for key in ("strength", "agility", "stamina", "intelligence", "charisma")},
+            "check_in": {"continuous_days": rng.randint(1, 10), "last_date": yesterday},
+            "active_class": rng.choice(CLASSES),
+            "equipment_sets": {cls: {"weapon": {"grade": "凡品", "success_count": 0}} for cls in CLASSES},
+        }
+    return players
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, weight = part.split("=", 1)
+        name = name.strip()
+        if name not in COMMANDS:
+            raise ValueError(f"未知指令: {name}（可选: {', '.join(COMMANDS)}）")
+        mix[name] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("指令比例不能为空")
+    return mix
+
+
+async def run_command(plugin, method: str, player: str, message: str, args: tuple) -> List:
+    return [result async for result in getattr(plugin, method)(StubEvent(player, message), *args)]
+
+
+async def virtual_player(plugin, player: str, players: List[str], mix: Dict[str, float], commands: int, think: float, rng: random.Random, latencies: Dict[str, List[float]]):
+    names, weights = list(mix), list(mix.values())
+    for _ in range(commands):
+        if think:
+            await asyncio.sleep(rng.uniform(0, think))
+        name = rng.choices(names, weights)[0]
+        method, make_args = COMMANDS[name]
+        message, args = make_args(player, rng, players)
+        started = time.perf_counter()
+        await run_command(plugin, method, player, message, args)
+        latencies[name].append(time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    main_module = importlib.import_module(f"{PLUGIN_DIR.name}.main")
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    data_dir = Path(args.data_dir) / "daily_checkin"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with open(data_dir / "user_data.json", "w", encoding="utf-8") as f:
+        json.dump(seed_players(args.players, rng), f, ensure_ascii=False, indent=4)
+
+    overrides = {"backup_settings": {"enabled": False}}
+    if not args.keep_throttle:
+        # 虚拟玩家的指令间隔远小于真人，默认放开限流以测量插件本身的处理能力
+        overrides["throttle_settings"] = {"read_burst": 1000, "mutate_burst": 1000, "duplicate_window_seconds": 0}
+    plugin = main_module.DailyCheckinPlugin(StubContext(), default_config(overrides))
+    plugin.data_lock = TimedLock()
+    save_stats = instrument_saves(plugin)
+
+    started = time.perf_counter()
+    await plugin.initialize()
+    await plugin._wait_for_data()
+    load_seconds = time.perf_counter() - started
+
+    players = list(plugin.user_data)
+    mix = parse_mix(args.mix)
+    if "PVE" in mix:
+        await run_command(plugin, "create_event", "admin",
+                          "/创建活动 活动名称=压测Boss 类型=世界Boss 时长=1d 五维=S:500,A:150,T:800,I:200,C:100 奖励=人品:1000,抽奖券:10,强化石:20,属性点:1", ())
+    # 只统计压测阶段
+    plugin.data_lock.waits.clear()
+    save_stats.update(calls=0, seconds=0.0, bytes=0)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        virtual_player(plugin, player, players, mix, args.commands, args.think, random.Random(rng.getrandbits(64)), latencies)
+        for player in players
+    ))
+    elapsed = time.perf_counter() - started
+    await plugin.terminate()
+
+    total = sum(len(v) for v in latencies.values())
+    all_latencies = [x for v in latencies.values() for x in v]
+    waits = plugin.data_lock.waits
+    print(f"虚拟玩家 {len(players)} 名，载入存档 {load_seconds * 1000:.0f}ms")
+    print(f"共执行 {total} 条指令，用时 {elapsed:.2f} 秒，吞吐量 {total / max(elapsed, 1e-9):.1f} 条/秒")
+    print(f"{'指令':<6} {'次数':>7} {'p50 ms':>9} {'p99 ms':>9} {'最大 ms':>9}")
+    for name in list(mix) + ["全部"]:
+        values = all_latencies if name == "全部" else latencies.get(name, [])
+        if values:
+            print(f"{name:<6} {len(values):>7} {percentile(values, 0.5) * 1000:>9.1f} {percentile(values, 0.99) * 1000:>9.1f} {max(values) * 1000:>9.1f}")
+    print(
+        f"data_lock: 获取 {len(waits)} 次，平均等待 {sum(waits) / max(len(waits), 1) * 1000:.1f}ms，"
+        f"p99 {percentile(waits, 0.99) * 1000:.1f}ms，累计 {sum(waits):.2f} 秒"
+    )
+    print(
+        f"_save_data: 调用 {save_stats['calls']} 次，累计 {save_stats['seconds']:.2f} 秒，"
+        f"写入约 {save_stats['bytes'] / 1024 / 1024:.1f} MB（平均每次 {save_stats['bytes'] / max(save_stats['calls'], 1) / 1024:.0f} KB）"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用桩 AstrBot 对象驱动插件指令，离线压测并发签到等高峰场景。")
+    parser.add_argument("--players", type=int, default=1000, help="虚拟玩家数量（全部并发）")
+    parser.add_argument("--commands", type=int, default=3, help="每名虚拟玩家发送的指令数")
+    parser.add_argument("--mix", default="jrrp=50,抽奖=20,强化=15,PVP=10,PVE=5", help="指令比例，格式 指令=权重,...")
+    parser.add_argument("--think", type=float, default=0.0, help="每条指令前的随机思考时间上限（秒）")
+    parser.add_argument("--keep-throttle", action="store_true", help="保留插件默认的指令限流配置")
+    parser.add_argument("--data-dir", default=None, help="数据目录（会覆盖其中的存档；默认使用临时目录，结束后删除）")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--verbose", action="store_true", help="输出插件日志")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data_dir is None:
+            args.data_dir = tmp
+        install_stub_astrbot(Path(args.data_dir))
+        # 插件模块使用包内相对导入，需要以插件包的形式加载
+        sys.path.insert(0, str(PLUGIN_DIR.parent))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+锦标赛引擎：支持循环赛与单败淘汰赛。
+战斗模拟是 CPU 密集型任务，统一交给 ProcessPoolExecutor 在子进程中执行，避免阻塞机器人事件循环。
+"""
+import asyncio
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from . import battle
+
+# 每个子进程任务处理的对局数量，用于摊薄进程间通信的开销
+PAIRINGS_PER_TASK = 32
+# Boss 难度预估时每个子进程任务负责的玩家数量
+BOSS_ENTRANTS_PER_TASK = 16
+
+
+def compact_stats(stats: Dict) -> Dict:
+    """只保留战斗引擎需要的字段，减小跨进程传输的数据量。"""
+    compact = {"name": stats["name"]}
+    for key in battle.BATTLE_STAT_KEYS:
+        compact[key] = {"final": stats[key]["final"]}
+    return compact
+
+
+def play_series(p1_stats: Dict, p2_stats: Dict, best_of: int) -> Tuple[int, int, int]:
+    """进行一场 K 局 N 胜的系列赛，返回 (p1胜局, p2胜局, 平局数)。任一方胜局过半即提前结束。"""
+    wins_needed = best_of // 2 + 1
+    p1_wins = p2_wins = draws = 0
+    for _ in range(best_of):
+        winner_name, _log, _damage = battle.simulate_battle(p1_stats, p2_stats)
+        if winner_name == p1_stats["name"]:
+            p1_wins += 1
+        elif winner_name == p2_stats["name"]:
+            p2_wins += 1
+        else:
+            draws += 1
+        if p1_wins >= wins_needed or p2_wins >= wins_needed:
+            break
+    return p1_wins, p2_wins, draws
+
+
+def run_pairings(entrants: List[Dict], pairings: List[Tuple[int, int]], best_of: int, seed: int) -> List[Tuple[int, int, int, int, int]]:
+    """
+    [子进程入口] 批量执行多组对局。
+    fork 出的子进程会继承父进程的随机数状态，因此每个任务都必须用独立的种子重新播种。
+    """
+    random.seed(seed)
+    results = []
+    for i, j in pairings:
+        p1_wins, p2_wins, draws = play_series(entrants[i], entrants[j], best_of)
+        results.append((i, j, p1_wins, p2_wins, draws))
+    return results
+
+
+def run_boss_trials(entrants: List[Dict], boss_stats: Dict, trials: int, seed: int) -> List[float]:
+    """[子进程入口] 每名玩家对 Boss 模拟 trials 场，返回各自对 Boss 造成的平均伤害。"""
+    random.seed(seed)
+    results = []
+    for stats in entrants:
+        total = 0.0
+        for _ in range(trials):
+            _winner, _log, damage_report = battle.simulate_battle(stats, boss_stats)
+            total += damage_report.get(stats["name"], 0)
+        results.append(total / trials)
+    return results
+
+
+class TournamentEngine:
+    """管理进程池并调度循环赛 / 淘汰赛的全部对局。"""
+
+    def __init__(self, max_workers: int = 0):
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 进程池按需创建，避免插件加载时就拉起子进程
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _play_all(self, entrants: List[Dict], pairings: List[Tuple[int, int]], best_of: int) -> List[Tuple[int, int, int, int, int]]:
+        """将对局切分成批次并行提交到进程池，汇总全部结果。"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        futures = []
+        for start in range(0, len(pairings), PAIRINGS_PER_TASK):
+            batch = pairings[start:start + PAIRINGS_PER_TASK]
+            seed = random.getrandbits(64)
+            futures.append(loop.run_in_executor(executor, run_pairings, entrants, batch, best_of, seed))
+
+        results = []
+        for batch_result in await asyncio.gather(*futures):
+            results.extend(batch_result)
+        return results
+
+    async def estimate_boss_damage(self, entrants: List[Dict], boss_stats: Dict, trials: int) -> List[float]:
+        """用同一个进程池估计每名玩家单次挑战 Boss 的期望伤害，顺序与 entrants 一致。"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        futures = []
+        for start in range(0, len(entrants), BOSS_ENTRANTS_PER_TASK):
+            batch = entrants[start:start + BOSS_ENTRANTS_PER_TASK]
+            futures.append(loop.run_in_executor(executor, run_boss_trials, batch, boss_stats, trials, random.getrandbits(64)))
+
+        results = []
+        for batch_result in await asyncio.gather(*futures):
+            results.extend(batch_result)
+        return results
+
+    async def run_round_robin(self, entrants: List[Dict], best_of: int) -> Dict:
+        """
+        循环赛：每两名选手之间进行一场 K 局系列赛。
+        系列赛胜者积2分，打平各积1分；同分按净胜局排序。
+        """
+        n = len(entrants)
+        pairings = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        results = await self._play_all(entrants, pairings, best_of)
+
+        table = [{"name": e["name"], "points": 0, "won": 0, "drawn": 0, "lost": 0, "games_for": 0, "games_against": 0} for e in entrants]
+        matrix: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for i, j, p1_wins, p2_wins, _draws in results:
+            matrix[(i, j)] = (p1_wins, p2_wins)
+            matrix[(j, i)] = (p2_wins, p1_wins)
+            table[i]["games_for"] += p1_wins
+            table[i]["games_against"] += p2_wins
+            table[j]["games_for"] += p2_wins
+            table[j]["games_against"] += p1_wins
+            if p1_wins > p2_wins:
+                table[i]["won"] += 1; table[i]["points"] += 2; table[j]["lost"] += 1
+            elif p2_wins > p1_wins:
+                table[j]["won"] += 1; table[j]["points"] += 2; table[i]["lost"] += 1
+            else:
+                table[i]["drawn"] += 1; table[j]["drawn"] += 1
+                table[i]["points"] += 1; table[j]["points"] += 1
+
+        order = sorted(range(n), key=lambda k: (table[k]["points"], table[k]["games_for"] - table[k]["games_against"]), reverse=True)
+        return {
+            "mode": "round_robin",
+            "standings": [table[k] for k in order],
+            "order": order,
+            "matrix": matrix,
+            "pairings_played": len(results),
+        }
+
+    async def run_elimination(self, entrants: List[Dict], best_of: int) -> Dict:
+        """
+        单败淘汰赛：entrants 按种子顺序排列（第0位为头号种子）。
+        人数不足2的幂时，高种子轮空直接晋级；系列赛打平时由种子更高的一方晋级。
+        """
+        bracket_size = 1
+        while bracket_size < len(entrants):
+            bracket_size *= 2
+
+        # 标准种子排位：1号与末位种子分处两端，尽量让强者在后期相遇
+        slots: List[Optional[int]] = [0]
+        while len(slots) < bracket_size:
+            size = len(slots) * 2
+            slots = [s for seed in slots for s in (seed, size - 1 - seed)]
+        alive: List[Optional[int]] = [s if s is not None and s < len(entrants) else None for s in slots]
+
+        rounds = []
+        while len(alive) > 1:
+            pairings = []
+            next_alive: List[Optional[int]] = []
+            byes = []
+            for k in range(0, len(alive), 2):
+                a, b = alive[k], alive[k + 1]
+                if a is None or b is None:
+                    survivor = a if b is None else b
+                    next_alive.append(survivor)
+                    if survivor is not None:
+                        byes.append(survivor)
+                else:
+                    pairings.append((a, b))
+                    next_alive.append(None)  # 占位，待结果出来后填充
+
+            results = await self._play_all(entrants, pairings, best_of) if pairings else []
+            result_map = {(i, j): (p1_wins, p2_wins) for i, j, p1_wins, p2_wins, _draws in results}
+
+            matches = []
+            pairing_iter = iter(pairings)
+            for idx in range(len(next_alive)):
+                if alive[idx * 2] is None or alive[idx * 2 + 1] is None:
+                    continue
+                i, j = next(pairing_iter)
+                p1_wins, p2_wins = result_map[(i, j)]
+                if p1_wins == p2_wins:
+                    winner = min(i, j)  # 种子序号越小越强
+                else:
+                    winner = i if p1_wins > p2_wins else j
+                next_alive[idx] = winner
+                matches.append({"p1": i, "p2": j, "score": (p1_wins, p2_wins), "winner": winner})
+
+            rounds.append({"matches": matches, "byes": byes})
+            alive = next_alive
+
+        champion = alive[0] if alive else None
+        return {"mode": "elimination", "rounds": rounds, "champion": champion}
+
+    def resize(self, max_workers: int):
+        """
+        调整进程池大小。已创建的进程池不再接收新任务，但会执行完已提交的任务后自行退出；
+        下次使用时按新的大小重新创建。
+        """
+        max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+        if max_workers == self.max_workers:
+            return
+        self.max_workers = max_workers
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def shutdown(self):
+        """关闭进程池，丢弃尚未开始的任务。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,232 @@
+"""
+玩家数据的流式导出与导入（gzip 压缩的 JSONL，每行一名玩家）。
+导出时由调用方每次在数据锁内序列化一小批玩家，锁外再把这一批压缩写盘；
+导入时逐行读取、解析并校验，调用方每次在锁内把一小批合法记录写入内存。
+两者都不需要一次性持有全部数据，数据量很大时也不会长时间阻塞其他指令。
+
+每行格式: {"user_id": "...", "record": {...玩家记录...}}
+"""
+import gzip
+import json
+import math
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import pvp_rating, schema
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 10
+FILE_SUFFIX = ".jsonl.gz"
+
+_NUMBER = (int, float)
+
+
+def export_path(directory: Path) -> Path:
+    return Path(directory) / time.strftime(f"players_%Y%m%d_%H%M%S{FILE_SUFFIX}")
+
+
+def list_exports(directory: Path) -> List[Tuple[str, int, int]]:
+    """列出目录中的导出文件，返回 [(文件名, 修改时间, 字节数)]，按时间从旧到新。"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    files = [(p.name, int(p.stat().st_mtime), p.stat().st_size) for p in directory.glob(f"*{FILE_SUFFIX}")]
+    return sorted(files, key=lambda item: item[1])
+
+
+def resolve_export(directory: Path, file_name: str) -> Optional[Path]:
+    """把管理员给出的文件名解析为导出目录中的文件，不允许跳出该目录。"""
+    if not file_name.endswith(FILE_SUFFIX):
+        file_name += FILE_SUFFIX
+    path = Path(directory) / file_name
+    if path.parent != Path(directory) or not path.is_file():
+        return None
+    return path
+
+
+def serialize_batch(user_data: Dict, user_ids: List[str]) -> str:
+    """在持有数据锁时调用：把一批玩家序列化为 JSONL 文本（已被删除的玩家跳过）。"""
+    lines = []
+    for user_id in user_ids:
+        record = user_data.get(user_id)
+        if record is not None:
+            lines.append(json.dumps({"user_id": user_id, "record": record}, ensure_ascii=False, separators=(',', ':')))
+    return "".join(line + "\n" for line in lines)
+
+
+class ExportWriter:
+    """分批写入导出文件；先写临时文件，close 时原子替换，中断时不会留下残缺的导出。"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.file = gzip.open(self.tmp_path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, chunk: str):
+        self.file.write(chunk)
+
+    def close(self) -> int:
+        """完成导出，返回文件字节数。"""
+        self.file.close()
+        self.tmp_path.replace(self.path)
+        return self.path.stat().st_size
+
+    def abort(self):
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def _is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _validate_item(item, grade_names: Tuple[str, ...]) -> Optional[str]:
+    if not isinstance(item, dict):
+        return "类型错误"
+    if item.get("grade") not in grade_names:
+        return f"未知的品级 {item.get('grade')!r}"
+    count = item.get("success_count")
+    if not _is_count(count):
+        return "success_count 不是非负整数"
+    return None
+
+
+def _validate_pvp(pvp) -> Optional[str]:
+    """天梯记录须具有 pvp_rating.new_record 的完整结构，结算和查看战绩时会直接按键访问。"""
+    if not isinstance(pvp, dict):
+        return "类型错误"
+    missing = [key for key in pvp_rating.new_record(0) if key not in pvp]
+    if missing:
+        return f"缺少字段 {missing[0]}"
+    rating = pvp["rating"]
+    if isinstance(rating, bool) or not isinstance(rating, _NUMBER) or not math.isfinite(rating):
+        return "rating 不是数字"
+    for key in ("wins", "losses", "draws"):
+        if not _is_count(pvp[key]):
+            return f"{key} 不是非负整数"
+    history = pvp["history"]
+    if not isinstance(history, list) or not all(isinstance(entry, list) and len(entry) == 4 for entry in history):
+        return "history 类型错误"
+    if not _is_count(pvp["cursor"]) or pvp["cursor"] > len(history):
+        return "cursor 超出范围"
+    return None
+
+
+def _missing_fields(record: Dict) -> Optional[str]:
+    """对照新玩家记录的结构，返回第一个缺少的字段名（含一层嵌套）。"""
+    template = schema.new_player(())
+    for key, default in template.items():
+        if key not in record:
+            return key
+        if isinstance(default, dict) and key != "equipment_sets":
+            for sub_key in default:
+                if sub_key not in record[key]:
+                    return f"{key}.{sub_key}"
+    return None
+
+
+def validate_record(record, class_names: Tuple[str, ...], grade_names: Tuple[str, ...]) -> Optional[str]:
+    """
+    把记录迁移到当前结构版本并检查字段类型与取值，不合法时返回原因。
+    装备品级、当前职业和签到日期会被各指令直接使用，须是插件认识的取值。
+    """
+    if not isinstance(record, dict):
+        return "记录不是对象"
+    for key, kind in (("resources", dict), ("attributes", dict), ("check_in", dict), ("equipment_sets", dict)):
+        if key in record and not isinstance(record[key], kind):
+            return f"{key} 类型错误"
+    try:
+        schema.upgrade(record, class_names)
+    except KeyError as e:
+        # 版本号不低于当前版本的记录不经过迁移，缺少字段时 upgrade 本身就会出错
+        return f"缺少字段 {e.args[0]}"
+    except (TypeError, AttributeError) as e:
+        return f"无法迁移: {e}"
+    # 未经迁移补齐的记录缺少的字段须在这里拒绝，而不是留给各指令访问时报错
+    missing = _missing_fields(record)
+    if missing:
+        return f"缺少字段 {missing}"
+    if record["nickname"] is not None and (not isinstance(record["nickname"], str) or not record["nickname"]):
+        return "nickname 类型错误"
+    if not isinstance(record["rp"], _NUMBER):
+        return "rp 不是数字"
+    for section in ("resources", "attributes"):
+        for key, value in record[section].items():
+            if not isinstance(value, _NUMBER):
+                return f"{section}.{key} 不是数字"
+    if record["active_class"] not in class_names:
+        return f"未知的职业 {record['active_class']!r}"
+    check_in = record["check_in"]
+    continuous_days = check_in["continuous_days"]
+    if not _is_count(continuous_days):
+        return "check_in.continuous_days 不是非负整数"
+    last_date = check_in["last_date"]
+    if not isinstance(last_date, str):
+        return "check_in.last_date 类型错误"
+    if last_date:
+        try:
+            date.fromisoformat(last_date)
+        except ValueError:
+            return f"check_in.last_date 不是 ISO 日期: {last_date!r}"
+    for class_name, slots in record["equipment_sets"].items():
+        if not isinstance(slots, dict):
+            return f"equipment_sets.{class_name} 类型错误"
+        for slot, item in slots.items():
+            reason = _validate_item(item, grade_names)
+            if reason:
+                return f"equipment_sets.{class_name}.{slot} {reason}"
+    if "pvp" in record:
+        reason = _validate_pvp(record["pvp"])
+        if reason:
+            return f"pvp {reason}"
+    return None
+
+
+class ImportReader:
+    """逐批读取导出文件并解析、校验，适合在线程池中调用 next_batch。"""
+
+    def __init__(self, path: Path, class_names: Tuple[str, ...], grade_names: Tuple[str, ...], batch_size: int = BATCH_SIZE):
+        self.file = gzip.open(path, "rt", encoding="utf-8")
+        self.class_names = class_names
+        self.grade_names = grade_names
+        self.batch_size = batch_size
+        self.line_no = 0
+        self.errors: List[str] = []  # 前若干条 "第N行: 原因"
+        self.rejected = 0
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"第{self.line_no}行: {reason}")
+
+    def next_batch(self) -> List[Tuple[str, Dict]]:
+        """读取下一批合法记录 [(玩家ID, 记录)]，文件读完时返回空列表。"""
+        batch = []
+        while len(batch) < self.batch_size:
+            line = self.file.readline()
+            if not line:
+                break
+            self.line_no += 1
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                self._reject(f"JSON 格式错误 ({e.msg})")
+                continue
+            user_id = entry.get("user_id") if isinstance(entry, dict) else None
+            if not isinstance(user_id, str) or not user_id:
+                self._reject("缺少 user_id")
+                continue
+            reason = validate_record(entry.get("record"), self.class_names, self.grade_names)
+            if reason:
+                self._reject(reason)
+                continue
+            batch.append((user_id, entry["record"]))
+        return batch
+
+    def close(self):
+        self.file.close()
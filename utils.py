@@ -1,5 +1,6 @@
+import bisect
 import math
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Sequence, Tuple, Union
 
 def calculate_energy_level(attributes: Dict[str, float], formula_config: Dict) -> float:
     """根据属性和公式配置计算能级。"""
@@ -12,13 +13,40 @@ def calculate_energy_level(attributes: Dict[str, float], formula_config: Dict) -
     level = sum_attrs * linear_coeff + sum_sq_attrs * square_coeff
     return round(level, 2)
 
-def get_energy_rank(level: float, ranks_config: List[Dict]) -> str:
-    """根据能级数值和等级配置表返回对应的能级。"""
-    # ranks_config 应该是从高到低排序的
-    for rank_info in ranks_config:
-        if level >= rank_info.get("threshold", 0):
-            return rank_info.get("rank", "Unknown")
-    return "F" # 默认最低等级
+DEFAULT_RANK = "F"  # 低于所有阈值时的默认等级
+
+
+class RankTable:
+    """
+    能级等级的二分查找表。
+    阈值按从低到高排序保存，查找时用 bisect 定位，不再依赖配置本身的排列顺序。
+    """
+
+    __slots__ = ("thresholds", "names")
+
+    def __init__(self, ranks: Sequence[Tuple[float, str]]):
+        ordered = sorted(ranks)
+        self.thresholds: Tuple[float, ...] = tuple(threshold for threshold, _ in ordered)
+        self.names: Tuple[str, ...] = tuple(name for _, name in ordered)
+
+    @classmethod
+    def from_config(cls, ranks_config: List[Dict]) -> "RankTable":
+        return cls([(rank_info.get("threshold", 0), rank_info.get("rank", "Unknown")) for rank_info in ranks_config])
+
+    def index_of(self, level: float) -> int:
+        """返回能级所在等级的下标（按阈值从低到高），低于所有阈值时为 -1。"""
+        return bisect.bisect_right(self.thresholds, level) - 1
+
+    def rank_of(self, level: float) -> str:
+        index = self.index_of(level)
+        return self.names[index] if index >= 0 else DEFAULT_RANK
+
+
+def get_energy_rank(level: float, ranks_config: Union[RankTable, List[Dict]]) -> str:
+    """根据能级数值和等级配置表（预编译的 RankTable 或原始配置列表）返回对应的能级。"""
+    if not isinstance(ranks_config, RankTable):
+        ranks_config = RankTable.from_config(ranks_config)
+    return ranks_config.rank_of(level)
 
 def get_detailed_player_stats(user_data: Dict, presets: Dict, constants: Dict, config: Dict) -> Dict:
     """
@@ -27,26 +55,9 @@ def get_detailed_player_stats(user_data: Dict, presets: Dict, constants: Dict, c
     # 1. 计算装备提供的总属性加成 (百分比形式)
     total_equip_bonus_percent = _calculate_total_equipment_bonus(user_data, presets, constants)
 
-    # 2. 计算最终五维属性
-    base_attrs = user_data.get("attributes", {})
-    final_core_attrs = {}
-    core_bonus_values = {} # 存储实际加成数值
-    for key_upper, key_lower in {"S": "strength", "T": "stamina", "A": "agility", "C": "charisma", "I": "intelligence"}.items():
-        base_val = base_attrs.get(key_lower, 0)
-        bonus_percent = total_equip_bonus_percent.get(key_upper, 0)
-        # [核心修正] 计算实际加成值
-        bonus_val = base_val * bonus_percent
-        final_core_attrs[key_upper] = base_val + bonus_val
-        core_bonus_values[key_upper] = bonus_val
-
-    # 3. 计算基础衍生属性
-    base_derivatives = _calculate_base_derivatives(final_core_attrs)
-
-    # 4. 应用装备百分比加成，得到最终衍生属性
-    final_derivatives = {
-        key: base_val * (1 + total_equip_bonus_percent.get(f"{key}%", 0))
-        for key, base_val in base_derivatives.items()
-    }
+    # 2-4. 计算最终五维、基础衍生属性和最终衍生属性
+    base_attrs = user_data["attributes"]
+    final_core_attrs, core_bonus_values, base_derivatives, final_derivatives = _apply_equipment_bonus(base_attrs, total_equip_bonus_percent)
 
     # [核心修正] 能级计算现在从 config 读取配置
     energy_value = calculate_energy_level(final_core_attrs, config.get("level_formula", {}))
@@ -75,10 +86,60 @@ def get_detailed_player_stats(user_data: Dict, presets: Dict, constants: Dict, c
 
 
 
+CORE_ATTRIBUTE_KEYS = {"S": "strength", "T": "stamina", "A": "agility", "C": "charisma", "I": "intelligence"}
+
+
+def _apply_equipment_bonus(base_attrs: Dict, total_equip_bonus_percent: Dict) -> Tuple[Dict, Dict, Dict, Dict]:
+    """
+    将装备总加成应用到基础五维上。
+    返回 (最终五维, 五维实际加成值, 基础衍生属性, 最终衍生属性)。
+    """
+    final_core_attrs = {}
+    core_bonus_values = {} # 存储实际加成数值
+    for key_upper, key_lower in CORE_ATTRIBUTE_KEYS.items():
+        base_val = base_attrs.get(key_lower, 0)
+        bonus_percent = total_equip_bonus_percent.get(key_upper, 0)
+        # [核心修正] 计算实际加成值
+        bonus_val = base_val * bonus_percent
+        final_core_attrs[key_upper] = base_val + bonus_val
+        core_bonus_values[key_upper] = bonus_val
+
+    # 计算基础衍生属性
+    base_derivatives = _calculate_base_derivatives(final_core_attrs)
+
+    # 应用装备百分比加成，得到最终衍生属性
+    final_derivatives = {
+        key: base_val * (1 + total_equip_bonus_percent.get(f"{key}%", 0))
+        for key, base_val in base_derivatives.items()
+    }
+    return final_core_attrs, core_bonus_values, base_derivatives, final_derivatives
+
+
+def evaluate_stats(base_attrs: Dict, total_equip_bonus_percent: Dict, formula_config: Dict) -> Dict:
+    """
+    由基础五维和装备总加成直接计算最终属性和能级，供需要批量试算的场景使用（不经过装备预设）。
+    返回 {"core": 最终五维, "derived": 最终衍生属性, "energy": 能级}。
+    """
+    final_core_attrs, _, _, final_derivatives = _apply_equipment_bonus(base_attrs, total_equip_bonus_percent)
+    return {"core": final_core_attrs, "derived": final_derivatives, "energy": calculate_energy_level(final_core_attrs, formula_config)}
+
+
+def evaluate_classes(base_attrs: Dict, table: Dict, class_names: List[str], equipment_sets: Dict, formula_config: Dict) -> Dict:
+    """
+    一次性试算玩家在多个职业下的最终属性和能级（不修改玩家数据）。
+    基础五维各职业共用，装备加成从预计算表中查得；返回 {职业: evaluate_stats 的结果}。
+    """
+    results = {}
+    for class_name in class_names:
+        total_bonus = total_bonus_from_table(table, class_name, equipment_sets.get(class_name, {}))
+        results[class_name] = evaluate_stats(base_attrs, total_bonus, formula_config)
+    return results
+
+
 def _calculate_total_equipment_bonus(user_data: Dict, presets: Dict, constants: Dict) -> Dict:
     """计算用户当前激活职业下，所有已穿戴装备提供的属性总和。"""
-    active_class = user_data.get("active_class", "均衡使者")
-    equipped_items = user_data.get("equipment_sets", {}).get(active_class, {})
+    active_class = user_data["active_class"]
+    equipped_items = user_data["equipment_sets"][active_class]
     total_bonus = {}
 
     for slot, item_info in equipped_items.items():
@@ -119,6 +180,77 @@ def _calculate_single_item_stats(item_info: Dict, class_name: str, slot: str, pr
     return item_final_stats
 
 
+# 预计算装备属性表时覆盖的最高强化等级；神品没有进阶上限，更高等级的收益已收敛，查表时截断到此等级
+ITEM_TABLE_MAX_LEVEL = 100
+
+def build_item_stat_table(presets: Dict, constants: Dict, max_level: int = ITEM_TABLE_MAX_LEVEL) -> Dict:
+    """
+    预计算每件装备在各 (职业, 槽位, 品级, 强化等级) 下的属性加成。
+    返回 {(职业, 槽位, 品级): [第0级属性, 第1级属性, ...]}，与 _calculate_single_item_stats 的结果一致。
+    """
+    table = {}
+    for class_name, slots in presets.items():
+        for slot in slots:
+            for grade in constants.get("grade_info", {}):
+                level_stats = [_calculate_single_item_stats({"grade": grade, "success_count": 0}, class_name, slot, presets, constants)]
+                k = constants.get("enhancement_k_values", {}).get(grade, 0.05)
+                grade_caps = _calculate_grade_caps(class_name, slot, grade, presets, constants)
+                # 逐级递推，避免对每个等级都从0级重新模拟
+                for _ in range(max_level):
+                    previous = level_stats[-1]
+                    level_stats.append({stat: value + (grade_caps[stat] - value) * k for stat, value in previous.items()})
+                table[(class_name, slot, grade)] = level_stats
+    return table
+
+
+def lookup_item_stats(table: Dict, class_name: str, slot: str, item_info: Dict) -> Dict:
+    """从预计算表中读取单件装备的属性加成，超出表范围的强化等级按最高等级处理。"""
+    level_stats = table.get((class_name, slot, item_info.get("grade", "凡品")))
+    if not level_stats:
+        return {}
+    return level_stats[min(item_info.get("success_count", 0), len(level_stats) - 1)]
+
+
+def total_bonus_from_table(table: Dict, class_name: str, equipped_items: Dict) -> Dict:
+    """用预计算表汇总某职业下所有已穿戴装备的属性加成，与 _calculate_total_equipment_bonus 结果一致。"""
+    total_bonus = {}
+    for slot, item_info in equipped_items.items():
+        for stat, value in lookup_item_stats(table, class_name, slot, item_info).items():
+            total_bonus[stat] = total_bonus.get(stat, 0) + value
+    return total_bonus
+
+
+def build_item_delta_table(table: Dict, constants: Dict) -> Dict:
+    """
+    预计算每件装备再强化成功一次带来的属性增量。
+    返回 {(职业, 槽位, 品级): [第0级的增量, 第1级的增量, ...]}；
+    达到进阶要求时，增量按进阶后新品级的0级属性计算。
+    """
+    grade_order = list(constants.get("grade_info", {}).keys())
+    delta_table = {}
+    for (class_name, slot, grade), level_stats in table.items():
+        upgrade_req = constants["grade_info"][grade].get("upgrade_req")
+        grade_index = grade_order.index(grade)
+        next_grade_stats = table.get((class_name, slot, grade_order[grade_index + 1])) if grade_index < len(grade_order) - 1 else None
+        deltas = []
+        for level, current in enumerate(level_stats):
+            if upgrade_req and level + 1 >= upgrade_req and next_grade_stats:
+                after = next_grade_stats[0]
+            else:
+                after = level_stats[min(level + 1, len(level_stats) - 1)]
+            deltas.append({stat: after.get(stat, 0) - current.get(stat, 0) for stat in set(current) | set(after)})
+        delta_table[(class_name, slot, grade)] = deltas
+    return delta_table
+
+
+def _calculate_grade_caps(class_name: str, slot: str, grade: str, presets: Dict, constants: Dict) -> Dict:
+    """计算装备在某品级下各属性的收敛上限。"""
+    godly_stats = presets.get(class_name, {}).get(slot, {}).get("base_stats_godly", {})
+    grade_coefficient = constants.get("grade_info", {}).get(grade, {}).get("coefficient", 0.1)
+    class_multipliers = constants.get("class_bonus_multipliers", {}).get(class_name, {})
+    return {stat: godly_value * grade_coefficient * class_multipliers.get(stat, 0.5) for stat, godly_value in godly_stats.items()}
+
+
 def _calculate_base_derivatives(core_attrs: Dict) -> Dict:
     """根据最终五维，计算所有基础衍生属性（应用你的最新公式）。"""
     S = core_attrs.get("S", 0)
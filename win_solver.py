@@ -0,0 +1,236 @@
+"""
+战斗胜率的精确求解器。
+simulate_battle 的每一次随机判定（命中、暴击、格挡、追加回合）都只依赖当前局面，
+整场战斗是一条以 (攻击方, 双方剩余HP, 回合数, 已追加次数) 为状态的马尔可夫链。
+直接在这条链上记忆化递归时，状态数随双方可能的剩余HP组合相乘而爆炸，因此这里利用它的结构把链拆开：
+- 追加回合只取决于双方速度，出手顺序 (攻击方, 回合数, 已追加次数) 本身是一条与HP无关的小马尔可夫链；
+- 一方受到的伤害只取决于对方的命中、暴击与自己的格挡，与另一方的血量互不影响，
+  因此 “第 n 次被攻击后的剩余HP分布” 对每一方只需计算一次，并按 n 缓存供所有出手顺序复用。
+某方在第 k 次出手时击倒对手的概率 = 出手顺序走到这里的概率 × 对手恰好在第 k 次被攻击时倒下的概率 × 自己仍存活的概率；
+打满30回合的状态再按双方剩余HP百分比的分布比较胜负。结果与逐状态展开完全相同，也沿用 battle.py 的全部公式。
+
+一次命中的伤害只有 “暴击与否 × 格挡与否” 四种取值，但双方都难以击杀对方时（高血量、低伤害、打满30回合），
+可达的累计伤害组合仍会很多。此时可指定 hp_buckets，把双方HP各量化为若干档：
+每次伤害按期望不变的方式随机舍入到相邻的整档，分布大小被限制在档数以内，代价是结果变为近似值。
+"""
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from . import battle
+
+# 速度相同时 simulate_battle 以 randint(0, 100) <= 50 决定先手
+_TIE_FIRST_MOVE_CHANCE = 51 / 101
+
+
+def _clamp(p: float) -> float:
+    return min(max(p, 0.0), 1.0)
+
+
+def _hit_outcomes(attacker: Dict, defender: Dict) -> Tuple[float, List[Tuple[float, float]]]:
+    """一次出手的结果分布，返回 (未命中概率, [(概率, 伤害)])，伤害按 暴击 × 格挡 四种情况列出。"""
+    hit = battle.hit_chance(attacker, defender)
+    crit = _clamp(attacker['CRIT']['final'])
+    block = _clamp(defender['BLK']['final'])
+    outcomes = []
+    for is_crit, p_crit in ((True, crit), (False, 1 - crit)):
+        for is_blocked, p_block in ((True, block), (False, 1 - block)):
+            p = hit * p_crit * p_block
+            if p > 0:
+                outcomes.append((p, battle.hit_damage(attacker, defender, is_crit, is_blocked)))
+    return 1 - hit, outcomes
+
+
+class _ExactDamageTrack:
+    """
+    一方在依次受到攻击后的剩余HP分布（精确）。
+    以各种伤害值的命中次数为键保存存活部分的概率，累计伤害由次数直接算出，不受加法顺序的浮点误差影响。
+    """
+
+    def __init__(self, max_hp: float, miss: float, outcomes: List[Tuple[float, float]]):
+        # 伤害相同的结果合并（例如伤害都被压到下限1时），避免出现等价的重复状态
+        merged = defaultdict(float)
+        for p, damage in outcomes:
+            merged[damage] += p
+        self.max_hp = max_hp
+        self.miss = miss
+        self.damages = list(merged.keys())
+        self.probs = list(merged.values())
+        zero = (0,) * len(self.damages)
+        self.damage_of: Dict[Tuple[int, ...], float] = {zero: 0.0}
+        self.alive: List[Dict[Tuple[int, ...], float]] = [{zero: 1.0}]
+        self.alive_mass = [1.0]
+        self.kill = [0.0]  # kill[n]: 恰好在第 n 次被攻击时倒下的概率
+        self._percent_cache = {}
+
+    def ensure(self, n: int):
+        damage_of, steps = self.damage_of, list(enumerate(zip(self.probs, self.damages)))
+        while len(self.alive) <= n:
+            current, following, killed = self.alive[-1], defaultdict(float), 0.0
+            for counts, p in current.items():
+                if self.miss > 0:
+                    following[counts] += p * self.miss
+                base_damage = damage_of[counts]
+                for i, (p_hit, damage) in steps:
+                    if self.max_hp - (base_damage + damage) <= 0:
+                        killed += p * p_hit
+                        continue
+                    new_counts = counts[:i] + (counts[i] + 1,) + counts[i + 1:]
+                    if new_counts not in damage_of:
+                        damage_of[new_counts] = sum(c * d for c, d in zip(new_counts, self.damages))
+                    following[new_counts] += p * p_hit
+            self.alive.append(dict(following))
+            self.alive_mass.append(sum(following.values()))
+            self.kill.append(killed)
+
+    def remaining_percent(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """第 n 次被攻击后仍存活时的 (剩余HP百分比, 概率) 数组。"""
+        if n not in self._percent_cache:
+            self.ensure(n)
+            dist = self.alive[n]
+            damage = np.fromiter((self.damage_of[counts] for counts in dist), float, len(dist))
+            self._percent_cache[n] = ((self.max_hp - damage) / self.max_hp, np.fromiter(dist.values(), float, len(dist)))
+        return self._percent_cache[n]
+
+    def size(self) -> int:
+        return sum(len(dist) for dist in self.alive)
+
+
+class _BucketDamageTrack:
+    """一方在依次受到攻击后的剩余HP分布（HP量化为 buckets 档，下标为剩余档数）。"""
+
+    def __init__(self, max_hp: float, miss: float, outcomes: List[Tuple[float, float]], buckets: int):
+        self.buckets = buckets
+        unit = max_hp / buckets
+        # 把每种伤害随机舍入到相邻的两个整档，保持期望伤害不变
+        kernel = defaultdict(float)
+        kernel[0] += miss
+        for p, damage in outcomes:
+            units = damage / unit
+            low = math.floor(units)
+            frac = units - low
+            kernel[low + 1] += p * frac
+            kernel[low] += p * (1 - frac)
+        self.kernel = [(p, u) for u, p in sorted(kernel.items()) if p > 0]
+        start = np.zeros(buckets + 1)
+        start[buckets] = 1.0
+        self.alive = [start]
+        self.alive_mass = [1.0]
+        self.kill = [0.0]
+
+    def ensure(self, n: int):
+        b = self.buckets
+        while len(self.alive) <= n:
+            current = self.alive[-1]
+            following = np.zeros(b + 1)
+            killed = 0.0
+            for p, u in self.kernel:
+                if u == 0:
+                    following += p * current
+                elif u >= b:
+                    killed += p * current.sum()
+                else:
+                    # 剩余 r 档受到 u 档伤害后剩余 r - u 档，r <= u 时倒下
+                    following[1:b + 1 - u] += p * current[1 + u:]
+                    killed += p * current[1:1 + u].sum()
+            self.alive.append(following)
+            self.alive_mass.append(float(following.sum()))
+            self.kill.append(killed)
+
+    def remaining_percent(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        self.ensure(n)
+        dist = self.alive[n]
+        nonzero = np.nonzero(dist)[0]
+        return nonzero / self.buckets, dist[nonzero]
+
+    def size(self) -> int:
+        return sum(int(np.count_nonzero(dist)) for dist in self.alive)
+
+
+def _compare_remaining(track_1, n_1: int, track_2, n_2: int) -> Tuple[float, float, float]:
+    """回合达到上限时按剩余HP百分比判定：返回双方都存活且 p1 更高 / 相同 / 更低的概率。"""
+    values_1, probs_1 = track_1.remaining_percent(n_1)
+    values_2, probs_2 = track_2.remaining_percent(n_2)
+    if not len(values_1) or not len(values_2):
+        return 0.0, 0.0, 0.0
+    order = np.argsort(values_2)
+    values_2, cumulative = values_2[order], np.concatenate(([0.0], np.cumsum(probs_2[order])))
+    below = cumulative[np.searchsorted(values_2, values_1, side="left")]
+    not_above = cumulative[np.searchsorted(values_2, values_1, side="right")]
+    higher = float(probs_1 @ below)
+    equal = float(probs_1 @ (not_above - below))
+    return higher, equal, float(probs_1.sum() * cumulative[-1]) - higher - equal
+
+
+def solve(p1_stats: Dict, p2_stats: Dict, hp_buckets: int = 0, tolerance: float = 1e-12) -> Dict:
+    """
+    计算 p1 对 p2 的胜、平、负概率（与 simulate_battle 的规则一致）。
+    hp_buckets 为 0 时精确求解，否则把双方HP各量化为 hp_buckets 档近似求解；
+    双方都存活的概率不超过 tolerance 的出手顺序不再展开（传 0 则只剪掉概率恰为0的分支）。
+    返回 {"win", "draw", "loss", "residual", "states"}：概率均为 p1 视角，residual 为剪枝丢弃的概率总和（结果误差的上界），
+    states 为缓存的剩余HP分布条目数与出手顺序状态数之和。
+    """
+    max_hp = (p1_stats['HP']['final'], p2_stats['HP']['final'])
+    if max_hp[0] <= 0 or max_hp[1] <= 0:
+        # 开局即有一方没有血量：与 simulate_battle 一样直接判负
+        win = 0.0 if max_hp[0] <= 0 else 1.0
+        return {"win": win, "draw": 0.0, "loss": 1.0 - win, "residual": 0.0, "states": 0}
+
+    # tracks[i]: 第 i 方受到攻击后的剩余HP分布
+    tracks = []
+    for defender, attacker, hp in ((p1_stats, p2_stats, max_hp[0]), (p2_stats, p1_stats, max_hp[1])):
+        miss, outcomes = _hit_outcomes(attacker, defender)
+        if hp_buckets:
+            tracks.append(_BucketDamageTrack(hp, miss, outcomes, hp_buckets))
+        else:
+            tracks.append(_ExactDamageTrack(hp, miss, outcomes))
+    add_rates = (
+        [_clamp(battle.extra_turn_chance(p1_stats, p2_stats, n)) for n in range(battle.MAX_EXTRA_TURNS)],
+        [_clamp(battle.extra_turn_chance(p2_stats, p1_stats, n)) for n in range(battle.MAX_EXTRA_TURNS)],
+    )
+
+    spd1, spd2 = p1_stats['SPD']['final'], p2_stats['SPD']['final']
+    first_mover_chance = 1.0 if spd1 > spd2 else 0.0 if spd1 < spd2 else _TIE_FIRST_MOVE_CHANCE
+
+    # 出手顺序链：每回合开始时的 (攻击方, p1已出手次数, p2已出手次数) -> 概率（不考虑血量）
+    schedule = {(side, 0, 0): p for side, p in ((0, first_mover_chance), (1, 1 - first_mover_chance)) if p > 0}
+    outcome = [0.0, 0.0]  # outcome[i]: 第 i 方击倒对手获胜的概率
+    residual = 0.0
+    schedule_states = 0
+    for _turn in range(battle.MAX_TURNS):
+        following = defaultdict(float)
+        schedule_states += len(schedule)
+        for (side, n_1, n_2), p in schedule.items():
+            made = [n_1, n_2]  # 各方已出手次数，即对方已被攻击的次数
+            target = 1 - side
+            for extra in range(battle.MAX_EXTRA_TURNS + 1):
+                # 双方仍都存活的概率可忽略时，剪掉这条出手顺序的全部后续
+                both_alive = p * tracks[target].alive_mass[made[side]] * tracks[side].alive_mass[made[target]]
+                if both_alive <= tolerance:
+                    residual += both_alive
+                    break
+                made[side] += 1
+                tracks[target].ensure(made[side])
+                outcome[side] += p * tracks[target].kill[made[side]] * tracks[side].alive_mass[made[target]]
+                rate = add_rates[side][extra] if extra < battle.MAX_EXTRA_TURNS else 0.0
+                following[(target, made[0], made[1])] += p * (1 - rate)
+                p *= rate
+                if p <= 0:
+                    break
+        schedule = following
+    win, loss = outcome
+
+    # 打满回合上限：按双方剩余HP百分比判定
+    draw = 0.0
+    finished = defaultdict(float)
+    for (_side, n_1, n_2), p in schedule.items():
+        finished[(n_1, n_2)] += p
+    for (n_1, n_2), p in finished.items():
+        higher, equal, lower = _compare_remaining(tracks[0], n_2, tracks[1], n_1)
+        win += p * higher
+        draw += p * equal
+        loss += p * lower
+    states = tracks[0].size() + tracks[1].size() + schedule_states
+    return {"win": win, "draw": draw, "loss": loss, "residual": residual, "states": states}